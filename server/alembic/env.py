@@ -10,6 +10,12 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+def include_name(name, type_, parent_names):
+    # FTS5 virtual table and its shadow tables are managed by hand-written migrations
+    if type_ == "table" and name and name.startswith("media_search"):
+        return False
+    return True
+
 def run_migrations_offline() -> None:
     url = config.get_main_option('sqlalchemy.url')
     context.configure(
@@ -18,6 +24,7 @@ def run_migrations_offline() -> None:
         literal_binds=True,
         dialect_opts={'paramstyle': 'named'},
         compare_type=True,
+        include_name=include_name,
     )
     with context.begin_transaction():
         context.run_migrations()
@@ -33,6 +40,9 @@ def run_migrations_online() -> None:
         try:
             connection.exec_driver_sql("PRAGMA journal_mode=WAL;")
             connection.exec_driver_sql("PRAGMA foreign_keys=ON;")
+            # The PRAGMAs autobegin a transaction; close it so begin_transaction()
+            # below owns (and commits) the migration transaction.
+            connection.commit()
         except Exception:
             pass
 
@@ -40,6 +50,7 @@ def run_migrations_online() -> None:
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            include_name=include_name,
         )
         with context.begin_transaction():
             context.run_migrations()
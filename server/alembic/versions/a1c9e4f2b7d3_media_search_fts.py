@@ -0,0 +1,88 @@
+"""media search fts5 index
+
+Revision ID: a1c9e4f2b7d3
+Revises: 700d2e4762a0
+Create Date: 2026-10-19 10:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c9e4f2b7d3'
+down_revision: Union[str, None] = '700d2e4762a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ROW_FROM_FILE = """
+    INSERT INTO media_search(rowid, title, series, path, library_id)
+    SELECT NEW.id, mi.title, COALESCE(s.name, ''), NEW.rel_path, NEW.library_id
+    FROM media_items mi LEFT JOIN series s ON s.id = mi.series_id
+    WHERE mi.id = NEW.item_id;
+"""
+
+TRIGGERS = ('media_search_file_ai', 'media_search_file_ad', 'media_search_file_au',
+            'media_search_item_au', 'media_search_series_au')
+
+
+def upgrade() -> None:
+    # FTS5 virtual table: rowid = media_files.id; triggers keep it in sync
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS media_search USING fts5(
+            title, series, path, library_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS media_search_file_ai AFTER INSERT ON media_files BEGIN
+            {ROW_FROM_FILE}
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS media_search_file_ad AFTER DELETE ON media_files BEGIN
+            DELETE FROM media_search WHERE rowid = OLD.id;
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS media_search_file_au AFTER UPDATE OF item_id, rel_path, library_id ON media_files BEGIN
+            DELETE FROM media_search WHERE rowid = OLD.id;
+            {ROW_FROM_FILE}
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS media_search_item_au AFTER UPDATE OF title, series_id ON media_items BEGIN
+            UPDATE media_search
+            SET title = NEW.title,
+                series = COALESCE((SELECT name FROM series WHERE id = NEW.series_id), '')
+            WHERE rowid IN (SELECT id FROM media_files WHERE item_id = NEW.id);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS media_search_series_au AFTER UPDATE OF name ON series BEGIN
+            UPDATE media_search SET series = NEW.name
+            WHERE rowid IN (
+                SELECT mf.id FROM media_files mf JOIN media_items mi ON mi.id = mf.item_id
+                WHERE mi.series_id = NEW.id
+            );
+        END
+    """)
+    # Backfill existing rows
+    op.execute("DELETE FROM media_search")
+    op.execute("""
+        INSERT INTO media_search(rowid, title, series, path, library_id)
+        SELECT mf.id, mi.title, COALESCE(s.name, ''), mf.rel_path, mf.library_id
+        FROM media_files mf
+        JOIN media_items mi ON mi.id = mf.item_id
+        LEFT JOIN series s ON s.id = mi.series_id
+    """)
+
+
+def downgrade() -> None:
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS media_search")
@@ -0,0 +1,36 @@
+"""leases for single-leader background work
+
+Revision ID: a7c3e9d1f5b2
+Revises: f2d8c4a6b1e3
+Create Date: 2026-10-19 15:40:12.318804
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9d1f5b2'
+down_revision: Union[str, None] = 'f2d8c4a6b1e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'leases',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('owner', sa.String(length=128), nullable=False),
+        sa.Column('acquired_at', sa.BigInteger(), nullable=False),
+        sa.Column('expires_at', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    # Forwarded work requests are polled by (status, type)
+    op.create_index('ix_jobs_status_type', 'jobs', ['status', 'type'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_status_type', table_name='jobs')
+    op.drop_table('leases')
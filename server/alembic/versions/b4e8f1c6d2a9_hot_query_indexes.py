@@ -0,0 +1,31 @@
+"""indexes for hot list/scan queries
+
+Revision ID: b4e8f1c6d2a9
+Revises: a7c3e9d1f5b2
+Create Date: 2026-10-19 16:05:41.772015
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8f1c6d2a9'
+down_revision: Union[str, None] = 'a7c3e9d1f5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # GET /libraries/{id}/items: newest files of one library without a sort step
+    op.create_index('ix_mediafile_library_created', 'media_files', ['library_id', 'created_at', 'id'], unique=False)
+    # GET /libraries/{id}/scans and last-successful-scan lookups
+    op.create_index('ix_libraryscan_library', 'library_scans', ['library_id', 'id'], unique=False)
+    op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_libraryscan_library', table_name='library_scans')
+    op.drop_index('ix_mediafile_library_created', table_name='media_files')
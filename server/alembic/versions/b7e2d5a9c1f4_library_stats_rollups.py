@@ -0,0 +1,62 @@
+"""library stats rollups
+
+Revision ID: b7e2d5a9c1f4
+Revises: a1c9e4f2b7d3
+Create Date: 2026-10-19 11:02:17.540331
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d5a9c1f4'
+down_revision: Union[str, None] = 'a1c9e4f2b7d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'library_stats',
+        sa.Column('library_id', sa.Integer(), nullable=False),
+        sa.Column('files', sa.Integer(), nullable=False),
+        sa.Column('movies', sa.Integer(), nullable=False),
+        sa.Column('episodes', sa.Integer(), nullable=False),
+        sa.Column('total_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('series_count', sa.Integer(), nullable=False),
+        sa.Column('last_scan_at', sa.BigInteger(), nullable=True),
+        sa.Column('last_scan_status', sa.String(length=32), nullable=True),
+        sa.Column('updated_at', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['library_id'], ['libraries.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('library_id'),
+    )
+    # Backfill from existing rows; afterwards the scanner maintains it incrementally
+    op.execute("""
+        INSERT INTO library_stats(library_id, files, movies, episodes, total_bytes, series_count,
+                                  last_scan_at, last_scan_status, updated_at)
+        SELECT l.id,
+               COALESCE(a.files, 0), COALESCE(a.movies, 0), COALESCE(a.episodes, 0),
+               COALESCE(a.total_bytes, 0), COALESCE(a.series_count, 0),
+               ls.finished_at, ls.status, CAST(strftime('%s', 'now') AS INTEGER)
+        FROM libraries l
+        LEFT JOIN (
+            SELECT mf.library_id,
+                   COUNT(mf.id) AS files,
+                   SUM(CASE WHEN mi.kind = 'movie' THEN 1 ELSE 0 END) AS movies,
+                   SUM(CASE WHEN mi.kind = 'episode' THEN 1 ELSE 0 END) AS episodes,
+                   SUM(mf.size) AS total_bytes,
+                   COUNT(DISTINCT mi.series_id) AS series_count
+            FROM media_files mf JOIN media_items mi ON mi.id = mf.item_id
+            GROUP BY mf.library_id
+        ) a ON a.library_id = l.id
+        LEFT JOIN library_scans ls ON ls.id = (
+            SELECT MAX(id) FROM library_scans WHERE library_id = l.id AND finished_at IS NOT NULL
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('library_stats')
@@ -0,0 +1,50 @@
+"""sab history
+
+Revision ID: c3f8a6d1e2b5
+Revises: b7e2d5a9c1f4
+Create Date: 2026-10-19 13:41:08.215903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a6d1e2b5'
+down_revision: Union[str, None] = 'b7e2d5a9c1f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sab_history',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('nzo_id', sa.String(length=64), nullable=False),
+        sa.Column('name', sa.String(length=512), nullable=False),
+        sa.Column('category', sa.String(length=64), nullable=True),
+        sa.Column('status', sa.String(length=32), nullable=False),
+        sa.Column('completed', sa.BigInteger(), nullable=False),
+        sa.Column('bytes', sa.BigInteger(), nullable=False),
+        sa.Column('storage', sa.String(length=1024), nullable=True),
+        sa.Column('fail_message', sa.String(), nullable=True),
+        sa.Column('raw_json', sa.String(), nullable=False),
+        sa.Column('seq', sa.BigInteger(), nullable=False),
+        sa.Column('synced_at', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('nzo_id'),
+    )
+    op.create_index('ix_sab_history_completed', 'sab_history', ['completed'], unique=False)
+    op.create_index('ix_sab_history_category_completed', 'sab_history', ['category', 'completed'], unique=False)
+    op.create_index('ix_sab_history_status', 'sab_history', ['status'], unique=False)
+    op.create_index('ix_sab_history_seq', 'sab_history', ['seq'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sab_history_seq', table_name='sab_history')
+    op.drop_index('ix_sab_history_status', table_name='sab_history')
+    op.drop_index('ix_sab_history_category_completed', table_name='sab_history')
+    op.drop_index('ix_sab_history_completed', table_name='sab_history')
+    op.drop_table('sab_history')
@@ -0,0 +1,44 @@
+"""unmatched files with retry backoff
+
+Revision ID: c6a2f9e4d8b1
+Revises: b4e8f1c6d2a9
+Create Date: 2026-10-19 16:48:03.519274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a2f9e4d8b1'
+down_revision: Union[str, None] = 'b4e8f1c6d2a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'unmatched_files',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('library_id', sa.Integer(), nullable=False),
+        sa.Column('rel_path', sa.String(length=1024), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('mtime', sa.BigInteger(), nullable=True),
+        sa.Column('guess_json', sa.String(), nullable=False),
+        sa.Column('reason', sa.String(length=32), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('first_seen_at', sa.BigInteger(), nullable=False),
+        sa.Column('last_attempt_at', sa.BigInteger(), nullable=False),
+        sa.Column('next_retry_at', sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(['library_id'], ['libraries.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('library_id', 'rel_path', name='uq_unmatched_per_library'),
+    )
+    op.create_index('ix_unmatched_next_retry', 'unmatched_files', ['next_retry_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_unmatched_next_retry', table_name='unmatched_files')
+    op.drop_table('unmatched_files')
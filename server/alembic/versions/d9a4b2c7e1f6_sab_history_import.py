@@ -0,0 +1,38 @@
+"""sab history import state
+
+Revision ID: d9a4b2c7e1f6
+Revises: c3f8a6d1e2b5
+Create Date: 2026-10-19 14:20:44.903117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a4b2c7e1f6'
+down_revision: Union[str, None] = 'c3f8a6d1e2b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('sab_history') as batch:
+        batch.add_column(sa.Column('import_status', sa.String(length=16), nullable=True))
+        batch.add_column(sa.Column('import_library_id', sa.Integer(), nullable=True))
+        batch.add_column(sa.Column('imported_at', sa.BigInteger(), nullable=True))
+        batch.add_column(sa.Column('import_error', sa.String(), nullable=True))
+    op.create_index('ix_sab_history_import', 'sab_history', ['status', 'import_status'], unique=False)
+    # History synced before this revision was already picked up by library scans
+    op.execute("UPDATE sab_history SET import_status = 'skipped'")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sab_history_import', table_name='sab_history')
+    with op.batch_alter_table('sab_history') as batch:
+        batch.drop_column('import_error')
+        batch.drop_column('imported_at')
+        batch.drop_column('import_library_id')
+        batch.drop_column('import_status')
@@ -0,0 +1,67 @@
+"""rss sync state, wanted items, release matches
+
+Revision ID: e5c1f7a3b9d2
+Revises: d9a4b2c7e1f6
+Create Date: 2026-10-19 14:31:52.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c1f7a3b9d2'
+down_revision: Union[str, None] = 'd9a4b2c7e1f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'indexer_rss_state',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('last_guid', sa.String(length=512), nullable=True),
+        sa.Column('last_pub_ts', sa.BigInteger(), nullable=True),
+        sa.Column('polled_at', sa.BigInteger(), nullable=True),
+        sa.Column('new_items', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.create_table(
+        'wanted_items',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('title', sa.String(length=512), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=True),
+        sa.Column('tmdb_id', sa.Integer(), nullable=True),
+        sa.Column('season', sa.Integer(), nullable=True),
+        sa.Column('episode', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('added_at', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_wanted_status', 'wanted_items', ['status'], unique=False)
+    op.create_table(
+        'release_matches',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('wanted_id', sa.Integer(), nullable=False),
+        sa.Column('indexer', sa.String(length=64), nullable=False),
+        sa.Column('guid', sa.String(length=512), nullable=False),
+        sa.Column('title', sa.String(length=512), nullable=False),
+        sa.Column('link', sa.String(length=1024), nullable=True),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('pub_ts', sa.BigInteger(), nullable=True),
+        sa.Column('found_at', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['wanted_id'], ['wanted_items.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('wanted_id', 'guid', name='uq_release_match'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('release_matches')
+    op.drop_index('ix_wanted_status', table_name='wanted_items')
+    op.drop_table('wanted_items')
+    op.drop_table('indexer_rss_state')
@@ -0,0 +1,34 @@
+"""scan progress snapshots for SSE viewers on non-leader workers
+
+Revision ID: e8b3d6f1a4c7
+Revises: c6a2f9e4d8b1
+Create Date: 2026-10-19 19:12:40.207113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3d6f1a4c7'
+down_revision: Union[str, None] = 'c6a2f9e4d8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scan_progress',
+        sa.Column('library_id', sa.Integer(), nullable=False),
+        sa.Column('scan_id', sa.Integer(), nullable=False),
+        sa.Column('event_json', sa.String(), nullable=False),
+        sa.Column('updated_at', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['library_id'], ['libraries.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('library_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('scan_progress')
@@ -0,0 +1,61 @@
+"""generation counters for etags
+
+Revision ID: f2d8c4a6b1e3
+Revises: e5c1f7a3b9d2
+Create Date: 2026-10-19 14:52:30.640271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2d8c4a6b1e3'
+down_revision: Union[str, None] = 'e5c1f7a3b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _bump(scope_sql: str) -> str:
+    return (
+        f"INSERT INTO generations(scope, gen) VALUES ({scope_sql}, 1) "
+        f"ON CONFLICT(scope) DO UPDATE SET gen = gen + 1;"
+    )
+
+
+TRIGGERS = [
+    ("gen_disks_ai", "AFTER INSERT ON disks", ["'disks'"]),
+    ("gen_disks_au", "AFTER UPDATE ON disks", ["'disks'"]),
+    ("gen_disks_ad", "AFTER DELETE ON disks", ["'disks'"]),
+    ("gen_libraries_ai", "AFTER INSERT ON libraries", ["'libraries'"]),
+    ("gen_libraries_au", "AFTER UPDATE ON libraries", ["'libraries'"]),
+    ("gen_libraries_ad", "AFTER DELETE ON libraries", ["'libraries'"]),
+    ("gen_files_ai", "AFTER INSERT ON media_files", ["'files:' || NEW.library_id"]),
+    ("gen_files_au", "AFTER UPDATE ON media_files", ["'files:' || OLD.library_id", "'files:' || NEW.library_id"]),
+    ("gen_files_ad", "AFTER DELETE ON media_files", ["'files:' || OLD.library_id"]),
+    ("gen_scans_ai", "AFTER INSERT ON library_scans", ["'scans:' || NEW.library_id"]),
+    ("gen_scans_au", "AFTER UPDATE ON library_scans", ["'scans:' || NEW.library_id"]),
+    ("gen_scans_ad", "AFTER DELETE ON library_scans", ["'scans:' || OLD.library_id"]),
+    ("gen_items_au", "AFTER UPDATE ON media_items", ["'items'"]),
+    ("gen_series_au", "AFTER UPDATE ON series", ["'items'"]),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'generations',
+        sa.Column('scope', sa.String(length=64), nullable=False),
+        sa.Column('gen', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('scope'),
+    )
+    for name, on, scopes in TRIGGERS:
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {on} BEGIN {' '.join(_bump(s) for s in scopes)} END")
+    op.execute("INSERT OR IGNORE INTO generations(scope, gen) VALUES ('epoch', abs(random()) % 1000000000)")
+
+
+def downgrade() -> None:
+    for name, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_table('generations')
@@ -0,0 +1,4 @@
+import sys
+from lhmm.startup import main
+
+sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,101 @@
+import gzip
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # optional: Content-Encoding: br when the brotli package is installed
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Compresses complete JSON/text responses above `minimum_size`. Streamed bodies
+# (SSE, anything sent with more_body) and non-text types (images from the
+# cache, FileResponse/pathsend) pass through untouched, so event streams are
+# never held in a compressor buffer. Brotli is preferred when available and the
+# client rates it at least as high as gzip; a coding with q=0 is never used.
+# Every response of a compressible type carries Vary: Accept-Encoding, compressed
+# or not, so a shared cache never hands one client's encoding to another.
+
+COMPRESSIBLE = ("application/json", "text/plain", "text/html", "text/csv", "application/xml")
+
+
+def _qvalues(accept: str) -> dict[str, float]:
+    """Accept-Encoding as {coding: q}; a malformed q counts as 0."""
+    out = {}
+    for part in accept.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        out[coding] = q
+    return out
+
+
+def choose_encoding(accept: str) -> str | None:
+    """br or gzip per the client's q-values (br wins ties), or None."""
+    q = _qvalues(accept)
+    star = q.get("*", 0.0)
+    offers = [("br", q.get("br", star))] if brotli is not None else []
+    offers.append(("gzip", q.get("gzip", star)))
+    best = max(offers, key=lambda o: o[1])  # first (br) on a tie
+    return best[0] if best[1] > 0 else None
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start: Message | None = None
+        passthrough = False
+
+        async def wrapped(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                ctype = headers.get("content-type", "")
+                if "content-encoding" in headers or not ctype.startswith(COMPRESSIBLE):
+                    passthrough = True
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                if encoding is None:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            if encoding == "br":
+                body = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                body = gzip.compress(body, compresslevel=self.gzip_level)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, wrapped)
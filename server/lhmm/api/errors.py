@@ -7,3 +7,15 @@ def bad_request(message: str, details: dict | None = None) -> HTTPException:
 
 def not_found(message: str = "Not found") -> HTTPException:
     return HTTPException(status_code=404, detail={"error": {"code": "not_found", "message": message, "details": {}}})
+
+
+def conflict(message: str, details: dict | None = None) -> HTTPException:
+    return HTTPException(status_code=409, detail={"error": {"code": "conflict", "message": message, "details": details or {}}})
+
+
+def unavailable(message: str, retry_after: int, details: dict | None = None) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail={"error": {"code": "unavailable", "message": message, "details": details or {}}},
+        headers={"Retry-After": str(retry_after)},
+    )
@@ -0,0 +1,45 @@
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from lhmm.db.models import Generation
+
+# Conditional GET for polled list endpoints. The ETag is built from the write
+# counters in `generations` (bumped by triggers, see lhmm.db.generations), so an
+# unchanged resource is answered with 304 after one primary-key lookup and before
+# the endpoint runs its real query. Counters are read before the data, so a write
+# racing the request can only make the ETag older than the body, never newer.
+
+REVALIDATE = "private, no-cache"
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def etag_for(db: Session, *scopes: str) -> str:
+    rows = dict(db.execute(select(Generation.scope, Generation.gen).where(Generation.scope.in_(("epoch", *scopes)))).all())
+    return 'W/"' + ".".join(str(rows.get(s, 0)) for s in ("epoch", *scopes)) + '"'
+
+
+def _matches(header: str, tag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    want = tag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == want for t in header.split(","))
+
+
+def check_etag(request: Request, response: Response, db: Session, *scopes: str) -> str:
+    """Raise NotModified when If-None-Match matches; otherwise set ETag on the response."""
+    tag = etag_for(db, *scopes)
+    inm = request.headers.get("if-none-match")
+    if inm and _matches(inm, tag):
+        raise NotModified(tag)
+    response.headers["ETag"] = tag
+    response.headers["Cache-Control"] = REVALIDATE
+    return tag
+
+
+def not_modified_response(request: Request, exc: NotModified) -> Response:
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": REVALIDATE})
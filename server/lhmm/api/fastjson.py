@@ -0,0 +1,27 @@
+from typing import Any
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.engine import Result
+
+# Fast path for read-heavy list endpoints. Returning a dict from a route sends it
+# through jsonable_encoder (a recursive walk that copies every value) before the
+# response class encodes it; returning a Response skips that step. Rows come
+# straight from column selects (Row tuples zipped with the result keys), so no ORM
+# objects are built and no pydantic model runs, and orjson encodes the result.
+#
+# Only plain JSON types may be passed in: str, int, float, bool, None, list and
+# dict. orjson also handles datetime and UUID natively.
+
+
+def rows(result: Result) -> list[dict]:
+    """Materialise a column select as dicts keyed by column label."""
+    keys = list(result.keys())
+    return [dict(zip(keys, r)) for r in result]
+
+
+def fast_json(content: Any, response: Response | None = None, status_code: int = 200) -> ORJSONResponse:
+    """Encode content with orjson, keeping headers set on the injected Response (e.g. ETag)."""
+    out = ORJSONResponse(content, status_code=status_code)
+    if response is not None:
+        out.headers.raw.extend(response.headers.raw)
+    return out
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import FileResponse
+from lhmm.api.errors import bad_request, not_found, conflict
+from lhmm.services import db_backup
+
+router = APIRouter(prefix="/db/backups", tags=["db"])
+
+
+def _path(name: str):
+    try:
+        return db_backup.backup_path(name)
+    except db_backup.BackupError as e:
+        raise bad_request(str(e))
+    except FileNotFoundError:
+        raise not_found("Backup not found")
+
+
+@router.get("")
+def list_backups():
+    return {"dir": str(db_backup.backup_dir()), "backups": db_backup.list_backups()}
+
+
+@router.post("", status_code=201)
+def create_backup(compress: bool | None = Query(None, description="default: db.backup.compress")):
+    """Online backup of the live database (writers are only paused between page steps)."""
+    try:
+        return db_backup.create_backup("manual", compress=compress)
+    except db_backup.BackupError as e:
+        raise conflict(str(e))
+
+
+@router.get("/{name}")
+def download_backup(name: str):
+    path = _path(name)
+    media_type = "application/gzip" if path.suffix == ".gz" else "application/vnd.sqlite3"
+    return FileResponse(path, media_type=media_type, filename=name)
+
+
+@router.post("/{name}/verify")
+def verify_backup(name: str):
+    _path(name)
+    return db_backup.verify_backup(name)
+
+
+@router.post("/{name}/restore")
+def restore_backup(name: str, force: bool = Query(False, description="skip the schema-revision and running-scan checks")):
+    """Replace the live database with this backup; a pre-restore backup is taken first."""
+    _path(name)
+    try:
+        return db_backup.restore_backup(name, force=force)
+    except db_backup.BackupError as e:
+        raise conflict(str(e))
+
+
+@router.delete("/{name}", status_code=204)
+def delete_backup(name: str):
+    _path(name).unlink()
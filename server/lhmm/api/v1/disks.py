@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from pydantic import BaseModel, Field
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session
@@ -6,6 +6,8 @@ from lhmm.db.models import Disk, Library
 from lhmm.api.deps import get_db
 from lhmm.api.pagination import parse_pagination
 from lhmm.api.errors import bad_request, not_found
+from lhmm.api.etag import check_etag
+from lhmm.api.fastjson import fast_json, rows
 
 router = APIRouter(prefix="/disks", tags=["disks"])
 
@@ -26,21 +28,19 @@ class DiskOut(BaseModel):
 
 @router.get("")
 def list_disks(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=100),
     sort: str = Query("name"),
     db: Session = Depends(get_db),
 ):
+    check_etag(request, response, db, "disks")
     offset, limit = parse_pagination(page, per_page)
     order = Disk.name.asc() if sort == "name" else Disk.name.desc() if sort == "-name" else Disk.id.asc()
     total = db.scalar(select(func.count()).select_from(Disk)) or 0
-    items = db.execute(select(Disk).order_by(order).offset(offset).limit(limit)).scalars().all()
-    return {
-        "total": total,
-        "page": page,
-        "per_page": limit,
-        "items": [DiskOut.model_validate(i).model_dump() for i in items],
-    }
+    items = rows(db.execute(select(Disk.id, Disk.name, Disk.mount_path).order_by(order).offset(offset).limit(limit)))
+    return fast_json({"total": total, "page": page, "per_page": limit, "items": items}, response)
 
 
 @router.post("")
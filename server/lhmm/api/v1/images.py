@@ -0,0 +1,78 @@
+import asyncio
+import json
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import FileResponse
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import Job, Library
+from lhmm.api.errors import bad_request, not_found
+from lhmm.services import images
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+_tasks: set[asyncio.Task] = set()
+
+
+@router.get("/stats")
+def image_cache_stats():
+    return images.cache.stats()
+
+
+@router.post("/prewarm", status_code=202)
+async def prewarm(
+    library_id: int | None = Query(None, description="default: every library"),
+    sizes: list[str] = Query(["w342"]),
+):
+    """Fetch all missing posters/backdrops of a library in the background; poll the job."""
+    bad = [s for s in sizes if s not in images.allowed_sizes()]
+    if bad:
+        raise bad_request("Unknown image size", {"sizes": bad})
+    if library_id is not None:
+        with SessionLocal() as db:
+            if not db.get(Library, library_id):
+                raise not_found("Library not found")
+    job_id = await asyncio.to_thread(images.create_prewarm_job, library_id, sizes)
+    task = asyncio.create_task(images.prewarm(job_id, library_id, sizes))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return {"job_id": job_id}
+
+
+@router.get("/prewarm/{job_id}")
+def prewarm_status(job_id: int):
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        if not job or job.type != "images.prewarm":
+            raise not_found()
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            **json.loads(job.payload_json or "{}"),
+        }
+
+
+@router.get("/{size}/{name}")
+async def image(size: str, name: str, request: Request):
+    """Serve a TMDB image (e.g. /images/w342/abc.jpg for poster_path "/abc.jpg") from the local cache."""
+    if not images.valid(size, name):
+        raise not_found()
+    hit = images.cache.lookup(size, name)
+    if hit is None:
+        import httpx
+
+        try:
+            hit = await images.cache.get(size, name)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                raise not_found()
+            return Response(status_code=502)
+        except httpx.HTTPError:
+            return Response(status_code=502)
+    path, st = hit
+    tag = images.etag(size, name, st)
+    if tag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": tag, "Cache-Control": IMMUTABLE})
+    # FileResponse uses the ASGI pathsend extension (zero-copy) when the server offers it
+    return FileResponse(path, stat_result=st, headers={"ETag": tag, "Cache-Control": IMMUTABLE})
@@ -0,0 +1,144 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+from lhmm.db.models import Indexer, IndexerRssState
+from lhmm.api.deps import get_db
+from lhmm.api.errors import bad_request, not_found
+from lhmm.services.indexers import SearchQuery, load_indexers, search, search_stream
+from lhmm.services.rss_sync import sync_rss
+
+router = APIRouter(prefix="/indexers", tags=["indexers"])
+
+
+class IndexerIn(BaseModel):
+    name: str = Field(min_length=1, max_length=64)
+    url: str = Field(min_length=1, max_length=512)
+    api_key: str | None = None
+    capabilities: dict = Field(default_factory=dict)
+
+
+def _out(ix) -> dict:
+    return {
+        "id": ix.id,
+        "name": ix.name,
+        "url": ix.url,
+        "api_key": "***" if ix.api_key else None,
+        "capabilities": ix.caps,
+        "source": "db" if ix.id is not None else "settings",
+    }
+
+
+@router.get("")
+def list_indexers():
+    return {"items": [_out(ix) for ix in load_indexers()]}
+
+
+@router.post("", status_code=201)
+def create_indexer(payload: IndexerIn, db: Session = Depends(get_db)):
+    if db.query(Indexer).filter(Indexer.name == payload.name).first():
+        raise bad_request("Indexer name already exists")
+    ix = Indexer(
+        name=payload.name,
+        url=payload.url.rstrip("/"),
+        api_key=payload.api_key,
+        capabilities_json=json.dumps(payload.capabilities),
+    )
+    db.add(ix)
+    db.commit()
+    return {"id": ix.id, "name": ix.name}
+
+
+@router.get("/rss")
+def rss_state(db: Session = Depends(get_db)):
+    """RSS watermark and last poll result per indexer."""
+    states = {st.name: st for st in db.query(IndexerRssState).all()}
+    items = []
+    for ix in load_indexers():
+        st = states.get(ix.name)
+        items.append({
+            "indexer": ix.name,
+            "last_guid": st.last_guid if st else None,
+            "last_pub_ts": st.last_pub_ts if st else None,
+            "polled_at": st.polled_at if st else None,
+            "new_items": st.new_items if st else 0,
+            "last_error": st.last_error if st else None,
+        })
+    return {"items": items}
+
+
+@router.post("/rss/sync")
+async def rss_sync(indexer: list[str] | None = Query(None)):
+    """Poll RSS now (all indexers, or the named ones) instead of waiting for the job."""
+    return await sync_rss(_selected(indexer))
+
+
+@router.delete("/{indexer_id}")
+def delete_indexer(indexer_id: int, db: Session = Depends(get_db)):
+    ix = db.get(Indexer, indexer_id)
+    if not ix:
+        raise not_found()
+    db.delete(ix)
+    db.commit()
+    return {"deleted": indexer_id}
+
+
+def _query(
+    q: str = Query("", max_length=256),
+    type: str = Query("search", pattern="^(search|movie|tv)$"),
+    year: int | None = None,
+    tmdbid: int | None = None,
+    imdbid: str | None = None,
+    tvdbid: int | None = None,
+    season: int | None = Query(None, ge=0),
+    ep: int | None = Query(None, ge=0),
+    cat: str | None = None,
+    limit: int = Query(100, ge=1, le=500),
+) -> SearchQuery:
+    if not (q.strip() or tmdbid or imdbid or tvdbid):
+        raise bad_request("q or an id (tmdbid/imdbid/tvdbid) is required")
+    return SearchQuery(q=q, type=type, year=year, tmdbid=tmdbid, imdbid=imdbid, tvdbid=tvdbid,
+                       season=season, ep=ep, cat=cat, limit=limit)
+
+
+def _selected(indexer: list[str] | None):
+    ixs = load_indexers(indexer)
+    if not ixs:
+        raise bad_request("No indexers configured")
+    return ixs
+
+
+@router.get("/search")
+async def search_all(sq: SearchQuery = Depends(_query), indexer: list[str] | None = Query(None)):
+    """Fan out to every indexer and return once all have answered or timed out."""
+    return await search(sq, _selected(indexer))
+
+
+@router.get("/search/stream")
+async def search_all_stream(
+    request: Request,
+    sq: SearchQuery = Depends(_query),
+    indexer: list[str] | None = Query(None),
+):
+    """Server-sent events: a `results` event per indexer as it answers, then `done`."""
+    ixs = _selected(indexer)
+
+    async def stream():
+        gen = search_stream(sq, ixs)
+        try:
+            async for ev in gen:
+                if await request.is_disconnected():
+                    break
+                yield f"event: {ev.pop('event')}\ndata: {json.dumps(ev)}\n\n"
+        except asyncio.CancelledError:
+            raise
+        finally:
+            await gen.aclose()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
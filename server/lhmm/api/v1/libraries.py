@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, Query, Request, Response
 from pydantic import BaseModel, Field
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session
-from lhmm.db.models import Library, Disk
+from lhmm.db.models import Library, Disk, LibraryStats
+from lhmm.services.rollups import recompute
+from lhmm.services.scan_scheduler import request_scan, request_scans, scan_status
+from lhmm.services import periodic_scans, scan_control, scan_progress
 from lhmm.api.deps import get_db
+from lhmm.db.session import SessionLocal
 from lhmm.api.pagination import parse_pagination
-from lhmm.api.errors import bad_request, not_found
+from lhmm.api.errors import bad_request, conflict, not_found, unavailable
+from lhmm.api.etag import check_etag
+from lhmm.api.fastjson import fast_json, rows
+from lhmm.db.query_plans import hot_query
 
 router = APIRouter(prefix="/libraries", tags=["libraries"])
 
@@ -41,21 +48,63 @@ def _validate_path_under_disk(db: Session, disk_id: int, root_subdir: str):
 
 @router.get("")
 def list_libraries(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=100),
     sort: str = Query("name"),
     db: Session = Depends(get_db),
 ):
+    check_etag(request, response, db, "libraries")
     offset, limit = parse_pagination(page, per_page)
     order = Library.name.asc() if sort == "name" else Library.name.desc() if sort == "-name" else Library.id.asc()
     total = db.scalar(select(func.count()).select_from(Library)) or 0
-    items = db.execute(select(Library).order_by(order).offset(offset).limit(limit)).scalars().all()
-    return {
-        "total": total,
-        "page": page,
-        "per_page": limit,
-        "items": [LibraryOut.model_validate(i).model_dump() for i in items],
-    }
+    cols = select(Library.id, Library.name, Library.type, Library.root_disk_id, Library.root_subdir, Library.settings_json)
+    items = rows(db.execute(cols.order_by(order).offset(offset).limit(limit)))
+    return fast_json({"total": total, "page": page, "per_page": limit, "items": items}, response)
+
+
+@router.get("/stats")
+def library_stats(db: Session = Depends(get_db)):
+    """Dashboard rollups for every library in one read of library_stats (PK-joined to libraries)."""
+    stat_rows = db.execute(
+        select(Library.id, Library.name, Library.type, LibraryStats)
+        .outerjoin(LibraryStats, LibraryStats.library_id == Library.id)
+        .order_by(Library.name.asc())
+    ).all()
+    items = []
+    for lid, name, type_, st in stat_rows:
+        items.append({
+            "library_id": lid,
+            "name": name,
+            "type": type_,
+            "files": st.files if st else 0,
+            "movies": st.movies if st else 0,
+            "episodes": st.episodes if st else 0,
+            "total_bytes": st.total_bytes if st else 0,
+            "series_count": st.series_count if st else 0,
+            "last_scan_at": st.last_scan_at if st else None,
+            "last_scan_status": st.last_scan_status if st else None,
+            "updated_at": st.updated_at if st else None,
+        })
+    return {"items": items}
+
+
+@router.post("/stats/recompute")
+def recompute_library_stats(library_id: int | None = None, db: Session = Depends(get_db)):
+    """Rebuild rollups from the base tables (fixes drift)."""
+    return {"ok": True, "libraries": recompute(db, library_id)}
+
+
+@router.post("/scan-all")
+def scan_all():
+    """Queue every library through the per-disk scan scheduler."""
+    return {**request_scans(), "scheduler": scan_status()}
+
+
+@router.get("/scan-queue")
+def scan_queue():
+    return scan_status()
 
 
 @router.post("")
@@ -72,6 +121,7 @@ def create_library(payload: LibraryIn, db: Session = Depends(get_db)):
     )
     db.add(li)
     db.flush()
+    periodic_scans.request_sync(li.id, li.settings_json, db=db)
     return LibraryOut.model_validate(li).model_dump()
 
 
@@ -97,6 +147,7 @@ def update_library(library_id: int, payload: LibraryIn, db: Session = Depends(ge
     li.root_subdir = payload.root_subdir
     li.settings_json = payload.settings_json or "{}"
     db.add(li)
+    periodic_scans.request_sync(li.id, li.settings_json, db=db)
     return LibraryOut.model_validate(li).model_dump()
 
 
@@ -106,68 +157,165 @@ def delete_library(library_id: int, db: Session = Depends(get_db)):
     if not li:
         return
     db.delete(li)
+    periodic_scans.request_sync(library_id, None, db=db)
 
 # --- Media scan & items endpoints ---
 from lhmm.db.models import MediaFile, MediaItem, Series, LibraryScan
-from lhmm.services.scanner import scan_library
+from lhmm.services.scan_events import bus as scan_bus
+from fastapi.responses import StreamingResponse
+import asyncio
 import json as _json
+import orjson
+
+SSE_KEEPALIVE = 15.0  # seconds between comment pings on an idle stream
 
 @router.post("/{library_id}/scan")
-def start_scan(library_id: int, bg: BackgroundTasks, db: Session = Depends(get_db)):
+def start_scan(
+    library_id: int,
+    profile: bool = Query(False, description="capture a cProfile dump under the cache dir"),
+    db: Session = Depends(get_db),
+):
+    li = db.get(Library, library_id)
+    if not li:
+        raise not_found()
+    return {**request_scan(library_id, li.root_disk_id, db=db, profile=profile), "profile": profile}
+
+def _scan_control(db: Session, library_id: int, action: str) -> dict:
     if not db.get(Library, library_id):
         raise not_found()
-    bg.add_task(scan_library, library_id)
-    return {"queued": True}
+    try:
+        out = scan_control.request(library_id, action)
+    except scan_control.Busy:
+        raise unavailable("the scan is mid-batch; retry shortly", scan_control.BUSY_RETRY_AFTER)
+    if out is None:
+        raise conflict("library has no running scan")
+    return out
 
-@router.get("/{library_id}/items")
-def list_items(library_id: int, limit: int = 50, offset: int = 0, db: Session = Depends(get_db)):
+@router.post("/{library_id}/scan/pause")
+def pause_scan(library_id: int, db: Session = Depends(get_db)):
+    """Stop the running scan at the next file, keeping a checkpoint to resume from."""
+    return _scan_control(db, library_id, "pause")
+
+@router.post("/{library_id}/scan/cancel")
+def cancel_scan(library_id: int, db: Session = Depends(get_db)):
+    """Stop the running scan at the next file (or drop a paused or queued one)."""
+    return _scan_control(db, library_id, "cancel")
+
+@router.post("/{library_id}/scan/resume")
+def resume_scan(library_id: int, db: Session = Depends(get_db)):
+    """Queue the paused scan to continue after its checkpoint."""
     if not db.get(Library, library_id):
         raise not_found()
-    stmt = (
-        select(MediaFile, MediaItem, Series)
+    out = scan_control.resume(library_id)
+    if out is None:
+        raise conflict("library has no paused scan")
+    return out
+
+@hot_query("list_items", 1, 50, 0, sorted=True)
+def items_stmt(library_id: int, limit: int, offset: int):
+    # Newest first straight off ix_mediafile_library_created; id breaks ties so pages are stable
+    return (
+        select(
+            MediaFile.id.label("file_id"),
+            MediaFile.rel_path.label("path"),
+            MediaFile.size,
+            MediaItem.kind,
+            MediaItem.title,
+            MediaItem.year,
+            Series.name.label("series"),
+            MediaItem.season,
+            MediaItem.episode,
+        )
         .join(MediaItem, MediaFile.item_id == MediaItem.id)
         .join(Library, MediaFile.library_id == Library.id)
         .outerjoin(Series, MediaItem.series_id == Series.id)
         .where(MediaFile.library_id == library_id)
-        .order_by(MediaFile.created_at.desc())
+        .order_by(MediaFile.created_at.desc(), MediaFile.id.desc())
         .limit(limit)
         .offset(offset)
     )
-    rows = db.execute(stmt).all()
-    items = []
-    for mf, mi, se in rows:
-        items.append({
-            "file_id": mf.id,
-            "path": mf.rel_path,
-            "size": mf.size,
-            "kind": mi.kind,
-            "title": mi.title,
-            "year": mi.year,
-            "series": se.name if se else None,
-            "season": mi.season,
-            "episode": mi.episode,
-        })
-    total = db.scalar(select(func.count()).select_from(MediaFile).where(MediaFile.library_id == library_id)) or 0
-    return {"total": total, "items": items}
 
-@router.get("/{library_id}/scans")
-def list_scans(library_id: int, limit: int = 10, db: Session = Depends(get_db)):
-    if not db.get(Library, library_id):
-        raise not_found()
-    stmt = (
-        select(LibraryScan)
+@hot_query("list_items.count", 1)
+def files_count_stmt(library_id: int):
+    return select(func.count()).select_from(MediaFile).where(MediaFile.library_id == library_id)
+
+@hot_query("list_scans", 1, 10, sorted=True)
+def scans_stmt(library_id: int, limit: int):
+    return (
+        select(LibraryScan.id, LibraryScan.status, LibraryScan.stats_json, LibraryScan.started_at, LibraryScan.finished_at)
         .where(LibraryScan.library_id == library_id)
         .order_by(LibraryScan.id.desc())
         .limit(limit)
     )
+
+@router.get("/{library_id}/items")
+def list_items(
+    library_id: int,
+    request: Request,
+    response: Response,
+    limit: int = 50,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+):
+    # Existence first: a cached (or "*") ETag must not turn a missing library into 304
+    if not db.get(Library, library_id):
+        raise not_found()
+    check_etag(request, response, db, "libraries", f"files:{library_id}", "items")
+    stmt = items_stmt(library_id, limit, offset)
+    items = rows(db.execute(stmt))
+    total = db.scalar(files_count_stmt(library_id)) or 0
+    return fast_json({"total": total, "items": items}, response)
+
+@router.get("/{library_id}/scans")
+def list_scans(
+    library_id: int,
+    request: Request,
+    response: Response,
+    limit: int = 10,
+    db: Session = Depends(get_db),
+):
+    if not db.get(Library, library_id):
+        raise not_found()
+    check_etag(request, response, db, "libraries", f"scans:{library_id}")
+    stmt = scans_stmt(library_id, limit)
     scans = [
-        {
-            "id": s.id,
-            "status": s.status,
-            "stats": (_json.loads(s.stats_json or "{}") if isinstance(s.stats_json, str) else s.stats_json) or {},
-            "started_at": s.started_at,
-            "finished_at": s.finished_at,
-        }
-        for s in db.execute(stmt).scalars().all()
+        {"id": sid, "status": status, "stats": orjson.loads(stats or "{}") or {}, "started_at": started, "finished_at": finished}
+        for sid, status, stats, started, finished in db.execute(stmt)
     ]
-    return {"items": scans}
+    return fast_json({"items": scans}, response)
+
+def _sse(event: dict) -> str:
+    return f"id: {event.get('seq', 0)}\nevent: progress\ndata: {_json.dumps(event)}\n\n"
+
+@router.get("/{library_id}/scans/events")
+async def scan_events(library_id: int, request: Request):
+    """Server-sent events with live scan progress.
+
+    Fed by the scanner's in-process bus on the leader; on any other worker the bus
+    is fed from the leader's scan_progress snapshots (see services.scan_progress).
+    """
+    with SessionLocal() as db:
+        if not db.get(Library, library_id):
+            raise not_found()
+
+    async def stream():
+        with scan_bus.subscribe(library_id) as q:
+            scan_progress.follow(library_id)
+            last = scan_bus.last(library_id)
+            if last:
+                yield _sse(last)
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(q.get(), timeout=SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield _sse(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from lhmm.api.deps import get_db
+from lhmm.api.pagination import parse_pagination
+from lhmm.db.fts import match_query
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+# bm25 column weights: title, series, path (library_id is UNINDEXED)
+_RANK = "bm25(media_search, 10.0, 6.0, 1.0, 0.0)"
+
+_SEARCH_SQL = f"""
+    SELECT ms.rowid AS file_id, mf.library_id, mf.rel_path, mf.size,
+           mi.kind, mi.title, mi.year, s.name AS series, mi.season, mi.episode,
+           {_RANK} AS rank
+    FROM media_search ms
+    JOIN media_files mf ON mf.id = ms.rowid
+    JOIN media_items mi ON mi.id = mf.item_id
+    LEFT JOIN series s ON s.id = mi.series_id
+    WHERE media_search MATCH :q {{lib_filter}}
+    ORDER BY rank, ms.rowid
+    LIMIT :limit OFFSET :offset
+"""
+
+_COUNT_SQL = "SELECT count(*) FROM media_search WHERE media_search MATCH :q {lib_filter}"
+
+
+@router.get("")
+def search(
+    q: str = Query("", description="free text; each word is prefix-matched"),
+    library_id: int | None = Query(None),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=100),
+    with_total: bool | None = Query(None, description="count every match; default only on page 1"),
+    db: Session = Depends(get_db),
+):
+    """Ranked matches. Counting runs the MATCH a second time, so pages after the
+    first skip it unless asked (total is null) and rely on has_more, which costs one
+    extra row; the last page reports the total for free."""
+    offset, limit = parse_pagination(page, per_page)
+    mq = match_query(q)
+    if not mq:
+        return {"query": q, "total": 0, "page": page, "per_page": limit, "has_more": False, "items": []}
+    params = {"q": mq, "limit": limit + 1, "offset": offset}
+    lib_filter = ""
+    if library_id is not None:
+        lib_filter = "AND library_id = :lib"
+        params["lib"] = library_id
+    rows = db.execute(
+        text(_SEARCH_SQL.format(lib_filter=lib_filter.replace("library_id", "ms.library_id"))),
+        params,
+    ).mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    total = None
+    if not has_more and (rows or not offset):
+        total = offset + len(rows)  # the last page: known without counting
+    elif with_total or (with_total is None and page == 1):
+        total = db.execute(text(_COUNT_SQL.format(lib_filter=lib_filter)), params).scalar() or 0
+    return {
+        "query": q,
+        "total": total,
+        "page": page,
+        "per_page": limit,
+        "has_more": has_more,
+        "items": [{**r, "rank": round(r["rank"], 4)} for r in rows],
+    }
@@ -0,0 +1,129 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select, func, distinct
+from sqlalchemy.orm import Session
+from lhmm.db.models import Series, MediaItem, MediaFile
+from lhmm.api.deps import get_db
+from lhmm.api.pagination import parse_pagination
+from lhmm.api.errors import not_found
+from lhmm.api.fastjson import fast_json, rows
+
+router = APIRouter(prefix="/series", tags=["series"])
+
+# Every endpoint here issues a fixed number of queries (aggregates are computed in
+# SQL, episodes+files come back in one join), so cost does not grow with the number
+# of episodes. scripts/test_series_api.py guards this.
+
+
+@router.get("")
+def list_series(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=100),
+    sort: str = Query("name"),
+    library_id: int | None = Query(None, description="only series with files in this library"),
+    db: Session = Depends(get_db),
+):
+    offset, limit = parse_pagination(page, per_page)
+    order = Series.name.asc() if sort == "name" else Series.name.desc() if sort == "-name" else Series.id.asc()
+    stmt = (
+        select(
+            Series.id,
+            Series.tmdb_id,
+            Series.name,
+            Series.year,
+            func.count(distinct(MediaItem.season)).label("seasons"),
+            func.count(distinct(MediaItem.id)).label("episodes"),
+            func.count(MediaFile.id).label("files"),
+            func.coalesce(func.sum(MediaFile.size), 0).label("total_bytes"),
+        )
+        .group_by(Series.id)
+    )
+    total_stmt = select(func.count()).select_from(Series)
+    if library_id is None:
+        stmt = stmt.outerjoin(MediaItem, MediaItem.series_id == Series.id).outerjoin(
+            MediaFile, MediaFile.item_id == MediaItem.id
+        )
+    else:
+        # Inner joins: seasons and episodes count only items with a file in this library
+        stmt = stmt.join(MediaItem, MediaItem.series_id == Series.id).join(
+            MediaFile, (MediaFile.item_id == MediaItem.id) & (MediaFile.library_id == library_id)
+        )
+        total_stmt = (
+            select(func.count(distinct(MediaItem.series_id)))
+            .select_from(MediaFile)
+            .join(MediaItem, MediaFile.item_id == MediaItem.id)
+            .where(MediaFile.library_id == library_id, MediaItem.series_id.is_not(None))
+        )
+    total = db.scalar(total_stmt) or 0
+    items = rows(db.execute(stmt.order_by(order).offset(offset).limit(limit)))
+    return fast_json({"total": total, "page": page, "per_page": limit, "items": items})
+
+
+@router.get("/{series_id}")
+def get_series(series_id: int, db: Session = Depends(get_db)):
+    se = db.get(Series, series_id)
+    if not se:
+        raise not_found()
+    season_rows = db.execute(
+        select(
+            MediaItem.season,
+            func.count(distinct(MediaItem.id)).label("episodes"),
+            func.count(MediaFile.id).label("files"),
+            func.coalesce(func.sum(MediaFile.size), 0).label("total_bytes"),
+        )
+        .outerjoin(MediaFile, MediaFile.item_id == MediaItem.id)
+        .where(MediaItem.series_id == series_id)
+        .group_by(MediaItem.season)
+        .order_by(MediaItem.season.asc())
+    ).mappings().all()
+    seasons = [dict(r) for r in season_rows]
+    return {
+        "id": se.id,
+        "tmdb_id": se.tmdb_id,
+        "name": se.name,
+        "year": se.year,
+        "episodes": sum(s["episodes"] for s in seasons),
+        "files": sum(s["files"] for s in seasons),
+        "total_bytes": sum(s["total_bytes"] for s in seasons),
+        "seasons": seasons,
+    }
+
+
+@router.get("/{series_id}/seasons/{season}")
+def get_season(series_id: int, season: int, db: Session = Depends(get_db)):
+    se = db.get(Series, series_id)
+    if not se:
+        raise not_found()
+    episode_rows = db.execute(
+        select(
+            MediaItem.id,
+            MediaItem.episode,
+            MediaItem.title,
+            MediaFile.id.label("file_id"),
+            MediaFile.library_id,
+            MediaFile.rel_path,
+            MediaFile.size,
+        )
+        .outerjoin(MediaFile, MediaFile.item_id == MediaItem.id)
+        .where(MediaItem.series_id == series_id, MediaItem.season == season)
+        .order_by(MediaItem.episode.asc(), MediaFile.id.asc())
+    ).all()
+    episodes: list[dict] = []
+    by_item: dict[int, dict] = {}
+    for item_id, ep, title, file_id, lib_id, rel_path, size in episode_rows:
+        e = by_item.get(item_id)
+        if e is None:
+            e = by_item[item_id] = {"item_id": item_id, "episode": ep, "title": title, "total_bytes": 0, "files": []}
+            episodes.append(e)
+        if file_id is not None:
+            e["files"].append({"file_id": file_id, "library_id": lib_id, "path": rel_path, "size": size})
+            e["total_bytes"] += size or 0
+    if not episodes:
+        raise not_found("Season not found")
+    return {
+        "series_id": se.id,
+        "series": se.name,
+        "season": season,
+        "episodes": episodes,
+        "files": sum(len(e["files"]) for e in episodes),
+        "total_bytes": sum(e["total_bytes"] for e in episodes),
+    }
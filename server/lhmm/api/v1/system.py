@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import select, func
 from pydantic import BaseModel, conint, confloat, field_validator
 from ...db.session import SessionLocal
 from ...services.config_service import load_config, save_partial
 from ...services.sab import SabClient
+from ...services.sab_sync import sync_history, queue_cache
+from ...services.importer import run_imports
+from ...db.models import SabHistory
+from ..pagination import parse_pagination
 import logging, json
 
 router = APIRouter(prefix="/system", tags=["system"])
@@ -93,7 +98,8 @@ async def sab_test():
         logging.getLogger("lhmm.sab").warning({"event":"sab.test.fail","url":url,"err":str(e)})
         raise HTTPException(status_code=502, detail=f"SAB test failed: {e}")
 
-# Optional: read-only queue and history
+# Read-only queue and history. The UI never hits SAB directly: the queue is
+# served from a short-TTL cache and history from the locally synced table.
 @router.get("/sab/queue")
 async def sab_queue():
     db = SessionLocal()
@@ -105,18 +111,85 @@ async def sab_queue():
     key = (cfg.get("sab_api_key") or "").strip()
     if not url or not key:
         raise HTTPException(status_code=400, detail="SABnzbd URL or API key missing")
-    return await SabClient(url, key).queue()
+    return await queue_cache.get(url, key)
+
+def _history_out(h: SabHistory) -> dict:
+    return {
+        "nzo_id": h.nzo_id,
+        "name": h.name,
+        "category": h.category,
+        "status": h.status,
+        "completed": h.completed,
+        "bytes": h.bytes,
+        "storage": h.storage,
+        "fail_message": h.fail_message,
+        "seq": h.seq,
+        "import_status": h.import_status,
+        "import_library_id": h.import_library_id,
+        "imported_at": h.imported_at,
+        "import_error": h.import_error,
+    }
 
 @router.get("/sab/history")
-async def sab_history(limit: int = 50):
-    db = SessionLocal()
+def sab_history(
+    page: int = Query(1, ge=1),
+    per_page: int | None = Query(None, ge=1, le=200),
+    limit: int = Query(50, ge=1, le=200, description="alias of per_page"),
+    category: str | None = None,
+    status: str | None = None,
+    q: str | None = Query(None, description="substring match on name"),
+    import_status: str | None = Query(None, description="imported | failed | skipped | pending"),
+):
+    offset, per_page = parse_pagination(page, per_page or limit, max_per_page=200)
+    conds = []
+    if category:
+        conds.append(SabHistory.category == category)
+    if status:
+        conds.append(SabHistory.status == status)
+    if q:
+        conds.append(SabHistory.name.contains(q))
+    if import_status:
+        conds.append(
+            SabHistory.import_status.is_(None) if import_status == "pending"
+            else SabHistory.import_status == import_status
+        )
+    with SessionLocal() as db:
+        total = db.scalar(select(func.count()).select_from(SabHistory).where(*conds)) or 0
+        rows = db.execute(
+            select(SabHistory).where(*conds)
+            .order_by(SabHistory.completed.desc(), SabHistory.id.desc())
+            .offset(offset).limit(per_page)
+        ).scalars().all()
+        cursor = db.scalar(select(func.max(SabHistory.seq))) or 0
+        return {
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "cursor": cursor,
+            "items": [_history_out(h) for h in rows],
+        }
+
+@router.get("/sab/history/delta")
+def sab_history_delta(since: int = Query(0, ge=0), limit: int = Query(500, ge=1, le=5000)):
+    """Rows added or changed by syncs after cursor `since`; pass back the returned cursor."""
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(SabHistory).where(SabHistory.seq > since)
+            .order_by(SabHistory.seq.asc(), SabHistory.id.asc())
+            .limit(limit)
+        ).scalars().all()
+        cursor = rows[-1].seq if rows else since
+        return {"cursor": cursor, "items": [_history_out(h) for h in rows]}
+
+@router.post("/sab/history/sync")
+async def sab_history_sync():
     try:
-        cfg = load_config(db)
-    finally:
-        db.close()
-    url = (cfg.get("sab_url") or "").strip()
-    key = (cfg.get("sab_api_key") or "").strip()
-    if not url or not key:
-        raise HTTPException(status_code=400, detail="SABnzbd URL or API key missing")
-    return await SabClient(url, key).history(0, limit)
+        return await sync_history()
+    except Exception as e:
+        logging.getLogger("lhmm.sab").warning({"event": "sab.history.sync.error", "err": str(e)})
+        raise HTTPException(status_code=502, detail=f"SAB history sync failed: {e}")
 
+@router.post("/sab/imports/run")
+async def sab_imports_run(retry_failed: bool = Query(False, description="also retry failed imports")):
+    """Import completed downloads now instead of waiting for the next history poll."""
+    return await run_imports(retry_failed)
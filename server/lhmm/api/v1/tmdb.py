@@ -1,15 +1,33 @@
+from __future__ import annotations
 from fastapi import APIRouter, Query
 from lhmm.settings import settings
-import httpx
+from lhmm.services.circuit import CircuitOpen, breaker
 import asyncio
-from typing import Literal, List, Dict, Any
+from typing import Literal, List, Dict, Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
 
 router = APIRouter(prefix="/tmdb", tags=["tmdb"])
 
-BASE = "https://api.themoviedb.org/3"
+
+@router.get("/status")
+def status():
+    """The tmdb circuit (this process) and how many files wait for it as pending matches."""
+    from sqlalchemy import select, func
+    from lhmm.db.session import SessionLocal
+    from lhmm.db.models import UnmatchedFile
+    from lhmm.services.unmatched import PENDING
+
+    with SessionLocal() as db:
+        pending = db.scalar(select(func.count()).select_from(UnmatchedFile).where(UnmatchedFile.reason == PENDING))
+    return {"configured": bool(settings.tmdb.api_key), "circuit": breaker("tmdb").status(), "pending": pending or 0}
+
 
 async def _search(client: httpx.AsyncClient, path: str, key: str, q: str, page: int) -> List[Dict[str, Any]]:
-    r = await client.get(f"{BASE}{path}", params={"api_key": key, "query": q, "page": page})
+    r = await breaker("tmdb").acall(
+        client.get, f"{settings.tmdb.base_url}{path}", params={"api_key": key, "query": q, "page": page}
+    )
     r.raise_for_status()
     data = r.json()
     return data.get("results", [])
@@ -27,8 +45,10 @@ async def search(
     key = settings.tmdb.api_key
     if not key:
         return {"query": qval, "media_type": media_type, "results": []}
+    import httpx
+
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
+        async with httpx.AsyncClient(timeout=settings.tmdb.timeout_seconds) as client:
             if media_type == "movie":
                 mov = await _search(client, "/search/movie", key, qval, page)
                 results = [{**it, "media_type": "movie"} for it in mov]
@@ -45,5 +65,7 @@ async def search(
                 )
                 results = sorted(merged, key=lambda x: x.get("popularity", 0), reverse=True)
         return {"query": qval, "media_type": media_type, "results": results}
+    except CircuitOpen:
+        return {"query": qval, "media_type": media_type, "results": [], "degraded": True}
     except httpx.HTTPError:
         return {"query": qval, "media_type": media_type, "results": []}
\ No newline at end of file
@@ -0,0 +1,149 @@
+import time
+import orjson
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy import select, func, update
+from sqlalchemy.orm import Session
+from lhmm.db.models import UnmatchedFile
+from lhmm.api.deps import get_db
+from lhmm.api.pagination import parse_pagination
+from lhmm.api.errors import bad_request
+from lhmm.api.fastjson import fast_json
+from lhmm.services import unmatched
+from lhmm.services.rollups import RollupDelta, apply_delta
+
+router = APIRouter(prefix="/unmatched", tags=["unmatched"])
+
+
+class Assignment(BaseModel):
+    id: int
+    ignore: bool = False            # stop retrying this file instead of matching it
+    kind: str | None = Field(None, pattern="^(movie|episode)$")
+    tmdb_id: int | None = None
+    season: int | None = Field(None, ge=0)
+    episode: int | None = Field(None, ge=0)
+    title: str | None = Field(None, max_length=512)
+    year: int | None = None
+
+    @model_validator(mode="after")
+    def _target(self):
+        if not self.ignore and (self.kind is None or self.tmdb_id is None):
+            raise ValueError("kind and tmdb_id are required unless ignore is set")
+        return self
+
+
+class AssignIn(BaseModel):
+    assignments: list[Assignment] = Field(min_length=1, max_length=500)
+
+
+class RetryIn(BaseModel):
+    ids: list[int] | None = None    # default: every unmatched file (optionally of library_id)
+    library_id: int | None = None
+
+
+def _conds(library_id: int | None, status: str | None, reason: str | None, q: str | None) -> list:
+    now = int(time.time())
+    conds = []
+    if library_id is not None:
+        conds.append(UnmatchedFile.library_id == library_id)
+    if status == "due":
+        conds.append(UnmatchedFile.next_retry_at <= now)
+    elif status == "waiting":
+        conds.append(UnmatchedFile.next_retry_at > now)
+    elif status == "ignored":
+        conds.append(UnmatchedFile.next_retry_at.is_(None))
+    if reason:
+        conds.append(UnmatchedFile.reason == reason)
+    if q:
+        conds.append(UnmatchedFile.rel_path.ilike(f"%{q}%"))
+    return conds
+
+
+@router.get("")
+def list_unmatched(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=200),
+    library_id: int | None = None,
+    status: str | None = Query(None, pattern="^(due|waiting|ignored)$"),
+    reason: str | None = Query(None, pattern="^(no_title|no_match|no_episode|pending)$"),
+    q: str | None = Query(None, description="substring of the relative path"),
+    db: Session = Depends(get_db),
+):
+    offset, limit = parse_pagination(page, per_page, max_per_page=200)
+    conds = _conds(library_id, status, reason, q)
+    total = db.scalar(select(func.count()).select_from(UnmatchedFile).where(*conds)) or 0
+    stmt = (
+        select(
+            UnmatchedFile.id, UnmatchedFile.library_id, UnmatchedFile.rel_path, UnmatchedFile.size,
+            UnmatchedFile.guess_json, UnmatchedFile.reason, UnmatchedFile.attempts,
+            UnmatchedFile.first_seen_at, UnmatchedFile.last_attempt_at, UnmatchedFile.next_retry_at,
+        )
+        .where(*conds)
+        .order_by(UnmatchedFile.library_id, UnmatchedFile.rel_path)
+        .offset(offset)
+        .limit(limit)
+    )
+    items = [
+        {"id": uid, "library_id": lid, "rel_path": path, "size": size, "guess": orjson.loads(guess or "{}"),
+         "reason": why, "attempts": attempts, "first_seen_at": first, "last_attempt_at": last,
+         "next_retry_at": due, "ignored": due is None}
+        for uid, lid, path, size, guess, why, attempts, first, last, due in db.execute(stmt)
+    ]
+    return fast_json({"total": total, "page": page, "per_page": limit, "items": items})
+
+
+@router.post("/assign")
+def assign_unmatched(payload: AssignIn, db: Session = Depends(get_db)):
+    """Match (or ignore) many unmatched files at once; each entry reports its own result.
+
+    Every TMDB lookup runs before the first write, so the SQLite write lock is
+    held only for the writes themselves.
+    """
+    results: list[dict | None] = [None] * len(payload.assignments)
+    targets: dict[int, tuple] = {}  # index -> (row, lookup target)
+    hits: dict = {}
+    for i, a in enumerate(payload.assignments):
+        row = db.get(UnmatchedFile, a.id)
+        if row is None:
+            results[i] = {"id": a.id, "ok": False, "error": "not found"}
+        elif not a.ignore:
+            try:
+                targets[i] = (row, unmatched.lookup(row, a.kind, a.tmdb_id, a.season, a.episode, a.title, hits))
+            except ValueError as e:
+                results[i] = {"id": a.id, "ok": False, "error": str(e)}
+    linked: set[int] = set()
+    deltas: dict[int, RollupDelta] = {}
+    for i, a in enumerate(payload.assignments):
+        if results[i] is not None:
+            continue
+        if a.id in linked:
+            # Listed twice: an earlier entry already linked the file and dropped its row
+            results[i] = {"id": a.id, "ok": False, "error": "not found"}
+        elif a.ignore:
+            db.get(UnmatchedFile, a.id).next_retry_at = None
+            results[i] = {"id": a.id, "ok": True, "ignored": True}
+        else:
+            row, target = targets[i]
+            delta = deltas.setdefault(row.library_id, RollupDelta())
+            results[i] = {"id": a.id, "ok": True, "file": unmatched.link(db, row, target, a.year, delta)}
+            linked.add(a.id)
+    for library_id, delta in deltas.items():
+        apply_delta(db, library_id, delta)
+    db.commit()
+    return {"assigned": sum(1 for r in results if r["ok"] and not r.get("ignored")),
+            "ignored": sum(1 for r in results if r.get("ignored")),
+            "failed": sum(1 for r in results if not r["ok"]),
+            "results": results}
+
+
+@router.post("/retry")
+def retry_unmatched(payload: RetryIn, db: Session = Depends(get_db)):
+    """Make files due now (including ignored ones); the next scan tries TMDB again."""
+    if payload.ids is not None and not payload.ids:
+        raise bad_request("ids must not be empty")
+    conds = _conds(payload.library_id, None, None, None)
+    if payload.ids is not None:
+        conds.append(UnmatchedFile.id.in_(payload.ids))
+    res = db.execute(update(UnmatchedFile).where(*conds).values(next_retry_at=int(time.time())))
+    db.commit()
+    return {"updated": res.rowcount}
@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from lhmm.db.models import WantedItem, ReleaseMatch
+from lhmm.api.deps import get_db
+from lhmm.api.pagination import parse_pagination
+from lhmm.api.errors import bad_request, not_found
+
+router = APIRouter(prefix="/wanted", tags=["wanted"])
+
+
+class WantedIn(BaseModel):
+    kind: str = Field(pattern="^(movie|episode)$")
+    title: str = Field(min_length=1, max_length=512)
+    year: int | None = None
+    tmdb_id: int | None = None
+    season: int | None = Field(None, ge=0)
+    episode: int | None = Field(None, ge=0)
+
+    @model_validator(mode="after")
+    def _episode_numbers(self):
+        if self.kind == "episode" and (self.season is None or self.episode is None):
+            raise ValueError("episode wanted items need season and episode")
+        return self
+
+
+def _out(w: WantedItem, matches: int = 0) -> dict:
+    return {
+        "id": w.id,
+        "kind": w.kind,
+        "title": w.title,
+        "year": w.year,
+        "tmdb_id": w.tmdb_id,
+        "season": w.season,
+        "episode": w.episode,
+        "status": w.status,
+        "added_at": w.added_at,
+        "matches": matches,
+    }
+
+
+@router.get("")
+def list_wanted(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=100),
+    status: str | None = Query(None, pattern="^(wanted|found)$"),
+    db: Session = Depends(get_db),
+):
+    offset, limit = parse_pagination(page, per_page)
+    conds = [WantedItem.status == status] if status else []
+    total = db.scalar(select(func.count()).select_from(WantedItem).where(*conds)) or 0
+    n_matches = (
+        select(func.count(ReleaseMatch.id))
+        .where(ReleaseMatch.wanted_id == WantedItem.id)
+        .correlate(WantedItem)
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        select(WantedItem, n_matches).where(*conds).order_by(WantedItem.id.desc()).offset(offset).limit(limit)
+    ).all()
+    return {"total": total, "page": page, "per_page": limit, "items": [_out(w, n) for w, n in rows]}
+
+
+@router.post("", status_code=201)
+def create_wanted(payload: WantedIn, db: Session = Depends(get_db)):
+    dup = db.query(WantedItem.id).filter(
+        WantedItem.kind == payload.kind,
+        WantedItem.title == payload.title,
+        WantedItem.year.is_(payload.year) if payload.year is None else WantedItem.year == payload.year,
+        WantedItem.season.is_(payload.season) if payload.season is None else WantedItem.season == payload.season,
+        WantedItem.episode.is_(payload.episode) if payload.episode is None else WantedItem.episode == payload.episode,
+    ).first()
+    if dup:
+        raise bad_request("Already wanted", {"id": dup[0]})
+    w = WantedItem(**payload.model_dump())
+    db.add(w)
+    db.commit()
+    return _out(w)
+
+
+@router.delete("/{wanted_id}")
+def delete_wanted(wanted_id: int, db: Session = Depends(get_db)):
+    w = db.get(WantedItem, wanted_id)
+    if not w:
+        raise not_found()
+    db.delete(w)
+    db.commit()
+    return {"deleted": wanted_id}
+
+
+@router.get("/{wanted_id}/releases")
+def wanted_releases(wanted_id: int, db: Session = Depends(get_db)):
+    if not db.get(WantedItem, wanted_id):
+        raise not_found()
+    rows = db.execute(
+        select(ReleaseMatch).where(ReleaseMatch.wanted_id == wanted_id).order_by(ReleaseMatch.pub_ts.desc())
+    ).scalars().all()
+    return {"items": [
+        {"id": r.id, "indexer": r.indexer, "guid": r.guid, "title": r.title, "link": r.link,
+         "size": r.size, "pub_ts": r.pub_ts, "found_at": r.found_at}
+        for r in rows
+    ]}
@@ -1,2 +1,4 @@
 from .base import Base  # noqa: F401
 from . import models  # noqa: F401
+from . import fts  # noqa: F401
+from . import generations  # noqa: F401
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import re
+from sqlalchemy import event, text
+from lhmm.db.base import Base
+
+# SQLite FTS5 index over media_items.title, series.name and media_files.rel_path.
+# One row per media file (rowid = media_files.id), kept in sync by triggers so every
+# write path (scanner, API, manual SQL) updates it without extra application code.
+# The alembic migration a1c9e4f2b7d3 creates the same objects for existing databases.
+
+FTS_TABLE = "media_search"
+
+_ROW_FROM_FILE = """
+    INSERT INTO media_search(rowid, title, series, path, library_id)
+    SELECT NEW.id, mi.title, COALESCE(s.name, ''), NEW.rel_path, NEW.library_id
+    FROM media_items mi LEFT JOIN series s ON s.id = mi.series_id
+    WHERE mi.id = NEW.item_id;
+"""
+
+DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS media_search USING fts5(
+        title, series, path, library_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS media_search_file_ai AFTER INSERT ON media_files BEGIN
+        {_ROW_FROM_FILE}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS media_search_file_ad AFTER DELETE ON media_files BEGIN
+        DELETE FROM media_search WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS media_search_file_au AFTER UPDATE OF item_id, rel_path, library_id ON media_files BEGIN
+        DELETE FROM media_search WHERE rowid = OLD.id;
+        {_ROW_FROM_FILE}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS media_search_item_au AFTER UPDATE OF title, series_id ON media_items BEGIN
+        UPDATE media_search
+        SET title = NEW.title,
+            series = COALESCE((SELECT name FROM series WHERE id = NEW.series_id), '')
+        WHERE rowid IN (SELECT id FROM media_files WHERE item_id = NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS media_search_series_au AFTER UPDATE OF name ON series BEGIN
+        UPDATE media_search SET series = NEW.name
+        WHERE rowid IN (
+            SELECT mf.id FROM media_files mf JOIN media_items mi ON mi.id = mf.item_id
+            WHERE mi.series_id = NEW.id
+        );
+    END
+    """,
+]
+
+REBUILD = [
+    "DELETE FROM media_search",
+    """
+    INSERT INTO media_search(rowid, title, series, path, library_id)
+    SELECT mf.id, mi.title, COALESCE(s.name, ''), mf.rel_path, mf.library_id
+    FROM media_files mf
+    JOIN media_items mi ON mi.id = mf.item_id
+    LEFT JOIN series s ON s.id = mi.series_id
+    """,
+]
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def match_query(q: str) -> str:
+    """Turn free text into an FTS5 MATCH expression: every token is a quoted prefix term."""
+    return " ".join(f'"{t}"*' for t in _TOKEN.findall(q or ""))
+
+
+def create_fts(conn) -> None:
+    for stmt in DDL:
+        conn.execute(text(stmt))
+
+
+def rebuild_fts(conn) -> None:
+    for stmt in REBUILD:
+        conn.execute(text(stmt))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    # Keep metadata.create_all() (scripts, benchmarks) in step with the migrations
+    if connection.dialect.name == "sqlite":
+        create_fts(connection)
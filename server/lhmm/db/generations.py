@@ -0,0 +1,59 @@
+from __future__ import annotations
+from sqlalchemy import event, text
+from lhmm.db.base import Base
+
+# Write counters for conditional GETs. Triggers bump a row in `generations` on
+# every insert/update/delete, keyed by scope:
+#
+#   disks, libraries      - any change to that table
+#   files:<library_id>    - media_files rows of one library
+#   scans:<library_id>    - library_scans rows of one library
+#   items                 - media_items / series edits (titles shown in item lists)
+#   epoch                 - random value set at creation, so a restored or rebuilt
+#                           database never reproduces an old ETag
+#
+# Triggers catch every write path (API, scanner, importer, manual SQL) without
+# application code. The alembic migration f2d8c4a6b1e3 creates the same objects.
+
+def _bump(scope_sql: str) -> str:
+    return (
+        f"INSERT INTO generations(scope, gen) VALUES ({scope_sql}, 1) "
+        f"ON CONFLICT(scope) DO UPDATE SET gen = gen + 1;"
+    )
+
+
+# (trigger name, timing/event/table, bumped scopes)
+TRIGGERS = [
+    ("gen_disks_ai", "AFTER INSERT ON disks", ["'disks'"]),
+    ("gen_disks_au", "AFTER UPDATE ON disks", ["'disks'"]),
+    ("gen_disks_ad", "AFTER DELETE ON disks", ["'disks'"]),
+    ("gen_libraries_ai", "AFTER INSERT ON libraries", ["'libraries'"]),
+    ("gen_libraries_au", "AFTER UPDATE ON libraries", ["'libraries'"]),
+    ("gen_libraries_ad", "AFTER DELETE ON libraries", ["'libraries'"]),
+    ("gen_files_ai", "AFTER INSERT ON media_files", ["'files:' || NEW.library_id"]),
+    ("gen_files_au", "AFTER UPDATE ON media_files", ["'files:' || OLD.library_id", "'files:' || NEW.library_id"]),
+    ("gen_files_ad", "AFTER DELETE ON media_files", ["'files:' || OLD.library_id"]),
+    ("gen_scans_ai", "AFTER INSERT ON library_scans", ["'scans:' || NEW.library_id"]),
+    ("gen_scans_au", "AFTER UPDATE ON library_scans", ["'scans:' || NEW.library_id"]),
+    ("gen_scans_ad", "AFTER DELETE ON library_scans", ["'scans:' || OLD.library_id"]),
+    ("gen_items_au", "AFTER UPDATE ON media_items", ["'items'"]),
+    ("gen_series_au", "AFTER UPDATE ON series", ["'items'"]),
+]
+
+DDL = [
+    f"CREATE TRIGGER IF NOT EXISTS {name} {on} BEGIN {' '.join(_bump(s) for s in scopes)} END"
+    for name, on, scopes in TRIGGERS
+] + [
+    "INSERT OR IGNORE INTO generations(scope, gen) VALUES ('epoch', abs(random()) % 1000000000)",
+]
+
+
+def create_generation_triggers(conn) -> None:
+    for stmt in DDL:
+        conn.execute(text(stmt))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        create_generation_triggers(connection)
@@ -76,6 +76,28 @@ class MediaFile(Base):
     __table_args__ = (
         UniqueConstraint("library_id", "rel_path", name="uq_file_unique_per_library"),
         Index("ix_mediafile_item", "item_id"),
+        # Library item lists, newest first (id breaks ties)
+        Index("ix_mediafile_library_created", "library_id", "created_at", "id"),
+    )
+
+class UnmatchedFile(Base):
+    """A scanned file TMDB matching failed for; retried with backoff (see lhmm.services.unmatched)."""
+    __tablename__ = "unmatched_files"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    library_id: Mapped[int] = mapped_column(ForeignKey("libraries.id", ondelete="CASCADE"), nullable=False)
+    rel_path: Mapped[str] = mapped_column(String(1024), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    mtime: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    guess_json: Mapped[str] = mapped_column(String, nullable=False, default="{}")  # title/year/type/season/episode
+    reason: Mapped[str] = mapped_column(String(32), nullable=False)  # no_title|no_match|no_episode|error
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    first_seen_at: Mapped[int] = mapped_column(BigInteger, default=now_ts, nullable=False)
+    last_attempt_at: Mapped[int] = mapped_column(BigInteger, default=now_ts, nullable=False)
+    next_retry_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True)  # NULL: ignored, never retried
+
+    __table_args__ = (
+        UniqueConstraint("library_id", "rel_path", name="uq_unmatched_per_library"),
+        Index("ix_unmatched_next_retry", "next_retry_at"),
     )
 
 class LibraryScan(Base):
@@ -84,9 +106,61 @@ class LibraryScan(Base):
     library_id: Mapped[int] = mapped_column(ForeignKey("libraries.id", ondelete="CASCADE"), nullable=False)
     started_at: Mapped[int] = mapped_column(BigInteger, default=now_ts, nullable=False)
     finished_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
-    status: Mapped[str] = mapped_column(String(32), nullable=False, default="queued")  # queued|running|succeeded|failed
+    status: Mapped[str] = mapped_column(String(32), nullable=False, default="queued")  # queued|running|pausing|paused|cancelling|cancelled|succeeded|failed
     stats_json: Mapped[str] = mapped_column(String, nullable=False, default="{}")
 
+    __table_args__ = (Index("ix_libraryscan_library", "library_id", "id"),)
+
+class ScanProgress(Base):
+    """Latest progress snapshot of a library's scan, for SSE viewers on other workers (see services.scan_progress)."""
+    __tablename__ = "scan_progress"
+    library_id: Mapped[int] = mapped_column(ForeignKey("libraries.id", ondelete="CASCADE"), primary_key=True)
+    scan_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    event_json: Mapped[str] = mapped_column(String, nullable=False, default="{}")
+    updated_at: Mapped[int] = mapped_column(BigInteger, default=now_ts, nullable=False)
+
+class LibraryStats(Base):
+    """Per-library rollup maintained by the scanner write path (see services.rollups)."""
+    __tablename__ = "library_stats"
+    library_id: Mapped[int] = mapped_column(ForeignKey("libraries.id", ondelete="CASCADE"), primary_key=True)
+    files: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    movies: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    episodes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    series_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_scan_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    last_scan_status: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    updated_at: Mapped[int] = mapped_column(BigInteger, default=now_ts, nullable=False)
+
+class SabHistory(Base):
+    """Local copy of SABnzbd history, synced incrementally by services.sab_sync."""
+    __tablename__ = "sab_history"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    nzo_id: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    name: Mapped[str] = mapped_column(String(512), nullable=False)
+    category: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    status: Mapped[str] = mapped_column(String(32), nullable=False)
+    completed: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)  # SAB completion time
+    bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    storage: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    fail_message: Mapped[str | None] = mapped_column(String, nullable=True)
+    raw_json: Mapped[str] = mapped_column(String, nullable=False, default="{}")
+    seq: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)  # sync batch, for delta reads
+    synced_at: Mapped[int] = mapped_column(BigInteger, default=now_ts, nullable=False)
+    # Import pipeline (services.importer): NULL = pending, 'imported' | 'failed' | 'skipped'
+    import_status: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    import_library_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    imported_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    import_error: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_sab_history_completed", "completed"),
+        Index("ix_sab_history_import", "status", "import_status"),
+        Index("ix_sab_history_category_completed", "category", "completed"),
+        Index("ix_sab_history_status", "status"),
+        Index("ix_sab_history_seq", "seq"),
+    )
+
 class Indexer(Base):
     __tablename__ = "indexers"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -95,6 +169,50 @@ class Indexer(Base):
     api_key: Mapped[str | None] = mapped_column(String(256), nullable=True)
     capabilities_json: Mapped[str] = mapped_column(String, nullable=False, default="{}")
 
+class IndexerRssState(Base):
+    """RSS watermark per indexer name (covers DB rows and settings.indexers alike)."""
+    __tablename__ = "indexer_rss_state"
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    last_guid: Mapped[str | None] = mapped_column(String(512), nullable=True)
+    last_pub_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    polled_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    new_items: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # in the last poll
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+
+class WantedItem(Base):
+    __tablename__ = "wanted_items"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(16), nullable=False)  # 'movie' | 'episode'
+    title: Mapped[str] = mapped_column(String(512), nullable=False)  # movie or series title
+    year: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    tmdb_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    season: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    episode: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="wanted")  # wanted|found
+    added_at: Mapped[int] = mapped_column(BigInteger, default=now_ts, nullable=False)
+
+    __table_args__ = (Index("ix_wanted_status", "status"),)
+
+class ReleaseMatch(Base):
+    __tablename__ = "release_matches"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    wanted_id: Mapped[int] = mapped_column(ForeignKey("wanted_items.id", ondelete="CASCADE"), nullable=False)
+    indexer: Mapped[str] = mapped_column(String(64), nullable=False)
+    guid: Mapped[str] = mapped_column(String(512), nullable=False)
+    title: Mapped[str] = mapped_column(String(512), nullable=False)
+    link: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    size: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    pub_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    found_at: Mapped[int] = mapped_column(BigInteger, default=now_ts, nullable=False)
+
+    __table_args__ = (UniqueConstraint("wanted_id", "guid", name="uq_release_match"),)
+
+class Generation(Base):
+    """Per-scope write counters bumped by triggers (see lhmm.db.generations); feed ETags."""
+    __tablename__ = "generations"
+    scope: Mapped[str] = mapped_column(String(64), primary_key=True)
+    gen: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
 class Job(Base):
     __tablename__ = "jobs"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -104,6 +222,16 @@ class Job(Base):
     started_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     finished_at: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
 
+    __table_args__ = (Index("ix_jobs_status_type", "status", "type"),)
+
+class Lease(Base):
+    """Named lease held by one process until expires_at (see lhmm.services.leader)."""
+    __tablename__ = "leases"
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    owner: Mapped[str] = mapped_column(String(128), nullable=False)
+    acquired_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    expires_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
 class AppConfig(Base):
     __tablename__ = "app_config"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, default=1)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+import importlib
+from dataclasses import dataclass
+from typing import Callable
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Executable
+
+# Registry of hot queries whose SQLite plans must stay index-backed. Statement
+# builders are registered where they are used:
+#
+#   @hot_query("media_files.by_path", 1, "Movie (2001)/movie.mkv")
+#   def file_by_path_stmt(library_id, rel_path): ...
+#
+# and scripts/test_query_plans.py runs EXPLAIN QUERY PLAN on every entry against a
+# seeded database, failing on a full table scan ("SCAN <table>") or, for queries
+# registered with sorted=True, on a temp B-tree for ORDER BY.
+
+MODULES = (
+    "lhmm.services.scanner",
+    "lhmm.api.v1.libraries",
+)
+
+
+@dataclass
+class HotQuery:
+    name: str
+    build: Callable[[], Executable]
+    sorted: bool = False           # ORDER BY must come from an index
+    allow_scan: tuple[str, ...] = ()  # tables a full scan is acceptable on
+
+
+HOT_QUERIES: dict[str, HotQuery] = {}
+
+
+def hot_query(name: str, *sample_args, sorted: bool = False, allow_scan: tuple[str, ...] = (), **sample_kwargs):
+    """Register a statement builder; the sample arguments are used to build the plan."""
+    def deco(fn):
+        HOT_QUERIES[name] = HotQuery(name, lambda: fn(*sample_args, **sample_kwargs), sorted, allow_scan)
+        return fn
+    return deco
+
+
+def load_registry() -> dict[str, HotQuery]:
+    for mod in MODULES:
+        importlib.import_module(mod)
+    return HOT_QUERIES
+
+
+def explain(conn: Connection, stmt: Executable) -> list[str]:
+    """EXPLAIN QUERY PLAN detail lines for a statement (bound values inlined)."""
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+
+def problems(q: HotQuery, plan: list[str]) -> list[str]:
+    out = []
+    for line in plan:
+        words = line.split()
+        if words[:1] == ["SCAN"] and len(words) > 1 and words[1] not in ("CONSTANT", *q.allow_scan):
+            out.append(line)
+        elif q.sorted and "TEMP B-TREE" in line and "ORDER BY" in line:
+            out.append(line)
+    return out
+
+
+def check_plans(conn: Connection) -> dict[str, dict]:
+    """Plan and problems for every registered query; empty problems means index-backed."""
+    return {
+        name: {"plan": (plan := explain(conn, q.build())), "problems": problems(q, plan)}
+        for name, q in sorted(load_registry().items())
+    }
@@ -1,8 +1,11 @@
 from fastapi import FastAPI, APIRouter, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from lhmm.settings import settings
 from lhmm.logging_json import setup_json_logging
 from lhmm.api.v1 import tmdb as tmdb_routes
+from lhmm.api.compression import CompressionMiddleware
+from lhmm.api.etag import NotModified, not_modified_response
 import os, time
 from lhmm.api.v1 import system as system_routes
 import logging
@@ -16,20 +19,32 @@ app = FastAPI(
     docs_url="/api/v1/docs",
     redoc_url=None,
     openapi_url="/api/v1/openapi.json",
+    default_response_class=ORJSONResponse,
 )
 
-# Scheduler bootstrap
-try:
-    from lhmm.scheduler import scheduler  # type: ignore
-    @app.on_event("startup")
-    async def _start_scheduler():
-        try:
-            scheduler.start()
-        except Exception:
-            pass
-except Exception:
-    # Scheduler optional
-    pass
+# Scheduler bootstrap; apscheduler and the job modules load here, not at import.
+# With several workers only the holder of the scheduler lease runs jobs and scans.
+@app.on_event("startup")
+async def _start_scheduler():
+    try:
+        from lhmm.scheduler import start_leadership  # type: ignore
+        app.state.leadership = start_leadership()
+    except Exception:
+        # Scheduler optional
+        pass
+
+@app.on_event("shutdown")
+async def _stop_scheduler():
+    lead = getattr(app.state, "leadership", None)
+    if lead is not None:
+        # Hand the lease over now instead of letting it expire
+        await lead.stop()
+
+@app.on_event("startup")
+async def _start_warmup():
+    if settings.startup.warmup:
+        from lhmm.startup import start_warmup
+        start_warmup()
 
 # Initialize JSON logging immediately after app creation
 setup_json_logging(
@@ -37,6 +52,9 @@ setup_json_logging(
     logfile=settings.logging.file,
 )
 
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+app.add_exception_handler(NotModified, not_modified_response)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors.allowed_origins,
@@ -73,13 +91,41 @@ def db_pragma():
         fk = conn.exec_driver_sql("PRAGMA foreign_keys;").scalar()
     return {"journal_mode": jm, "foreign_keys": fk}
 
+
+# File/WAL sizes, free-page ratio and recent maintenance passes
+@api.get("/db/stats")
+def db_stats():
+    from lhmm.services import db_maintenance
+    return db_maintenance.stats()
+
+
+# Run ANALYZE/optimize/vacuum/checkpoint now (vacuum=true forces a full VACUUM)
+@api.post("/db/maintenance")
+def db_maintenance_run(vacuum: bool = False):
+    from lhmm.services import db_maintenance
+    return db_maintenance.run_maintenance("manual", vacuum=vacuum)
+
 from lhmm.api.v1 import disks as disks_routes
 from lhmm.api.v1 import libraries as libraries_routes
+from lhmm.api.v1 import search as search_routes
+from lhmm.api.v1 import series as series_routes
+from lhmm.api.v1 import indexers as indexers_routes
+from lhmm.api.v1 import wanted as wanted_routes
+from lhmm.api.v1 import images as images_routes
+from lhmm.api.v1 import backups as backups_routes
+from lhmm.api.v1 import unmatched as unmatched_routes
 
 api.include_router(tmdb_routes.router)
 api.include_router(system_routes.router)
 api.include_router(disks_routes.router)
 api.include_router(libraries_routes.router)
+api.include_router(search_routes.router)
+api.include_router(series_routes.router)
+api.include_router(indexers_routes.router)
+api.include_router(wanted_routes.router)
+api.include_router(images_routes.router)
+api.include_router(backups_routes.router)
+api.include_router(unmatched_routes.router)
 
 @app.middleware("http")
 async def request_logger(request: Request, call_next):
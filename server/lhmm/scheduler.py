@@ -1,2 +1,97 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 scheduler = AsyncIOScheduler()
+
+# Only the process holding the "scheduler" lease runs these jobs (see
+# lhmm.services.leader); the others pause the scheduler and forward work to it.
+
+
+def register_jobs() -> None:
+    from lhmm.services.rollups import recompute_job
+    from lhmm.services.periodic_scans import register_periodic_scans
+    from lhmm.services.sab_sync import sync_history_job
+    from lhmm.services.rss_sync import sync_rss_job
+    from lhmm.services.leader import FORWARD_POLL_SECONDS
+    from lhmm.services.db_maintenance import maintenance_tick
+    from lhmm.services.db_backup import backup_job
+    from lhmm.services.unmatched import resolve_pending
+    from lhmm.settings import settings
+    # Full rollup rebuild to repair drift from out-of-band writes
+    scheduler.add_job(recompute_job, "interval", hours=24, id="rollups.recompute", replace_existing=True, jitter=900)
+    # Per-library adaptive refreshes from Library.settings_json["scan"]
+    register_periodic_scans()
+    # Incremental SABnzbd history -> sab_history
+    scheduler.add_job(
+        sync_history_job, "interval", seconds=settings.sabnzbd.history_poll_seconds,
+        id="sab.history.sync", replace_existing=True, max_instances=1, coalesce=True,
+    )
+    # Indexer RSS polling against the wanted list
+    if settings.rss.enabled:
+        scheduler.add_job(
+            sync_rss_job, "interval", minutes=settings.rss.interval_minutes,
+            id="rss.sync", replace_existing=True, max_instances=1, coalesce=True, jitter=30,
+        )
+    # Scan / periodic-scan requests made on other workers
+    scheduler.add_job(
+        process_forwarded, "interval", seconds=FORWARD_POLL_SECONDS,
+        id="leader.forwarded", replace_existing=True, max_instances=1, coalesce=True,
+    )
+    # WAL checkpoints past the size threshold; ANALYZE/optimize/vacuum when idle
+    if settings.db.maintenance.enabled:
+        scheduler.add_job(
+            maintenance_tick, "interval", seconds=settings.db.maintenance.check_seconds,
+            id="db.maintenance", replace_existing=True, max_instances=1, coalesce=True,
+        )
+    # Files queued as pending matches while TMDB was unreachable
+    scheduler.add_job(
+        resolve_pending, "interval", seconds=settings.tmdb.pending_check_seconds,
+        id="tmdb.pending", replace_existing=True, max_instances=1, coalesce=True,
+    )
+    # Online SQLite backups with retention
+    if settings.db.backup.enabled:
+        scheduler.add_job(
+            backup_job, "interval", hours=settings.db.backup.interval_hours,
+            id="db.backup", replace_existing=True, max_instances=1, coalesce=True, jitter=600,
+        )
+
+
+def process_forwarded() -> int:
+    from lhmm.services import leader
+    from lhmm.services.scan_scheduler import SCAN_REQUEST, handle_scan_request
+    from lhmm.services.periodic_scans import SYNC_REQUEST, handle_sync_request
+
+    handlers = {SCAN_REQUEST: handle_scan_request, SYNC_REQUEST: handle_sync_request}
+    claimed = leader.claim_forwarded(tuple(handlers))
+    for job_id, kind, payload in claimed:
+        try:
+            handlers[kind](payload)
+            leader.finish_forwarded(job_id)
+        except Exception as e:
+            leader.finish_forwarded(job_id, str(e))
+    return len(claimed)
+
+
+def _elected() -> None:
+    register_jobs()
+    if scheduler.running:
+        scheduler.resume()
+    else:
+        scheduler.start()
+    # Catch up on requests forwarded while nobody was leading
+    process_forwarded()
+
+
+def _demoted() -> None:
+    # Scans already running finish; nothing new starts here
+    if scheduler.running:
+        scheduler.pause()
+
+
+def start_leadership():
+    """Join the election for the scheduler lease (call from the app's startup hook)."""
+    from lhmm.services import leader
+    from lhmm.settings import settings
+
+    lead = leader.Leadership(leader.SCHEDULER_LEASE, settings.scheduler.lease_seconds, _elected, _demoted)
+    leader.set_leadership(lead)
+    lead.start()
+    return lead
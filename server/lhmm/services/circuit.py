@@ -0,0 +1,194 @@
+from __future__ import annotations
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+lg = logging.getLogger("lhmm.circuit")
+
+# Circuit breakers for external services, shared by every caller in the process.
+#
+#   closed     calls go through; `threshold` consecutive failures open the circuit
+#   open       calls fail fast with CircuitOpen (no network) for `reset_seconds`
+#   half-open  one trial call is let through: success closes the circuit, failure
+#              re-opens it with the wait doubled (up to max_reset_seconds)
+#
+# A failure is an exception from the call (timeouts, connection errors) or a
+# response with a 5xx / 429 status; any other response, 4xx included, proves the
+# service is answering and counts as a success. A call interrupted by anything
+# else (asyncio.CancelledError when a client disconnects, KeyboardInterrupt) is
+# neither: it only frees the half-open trial slot for the next caller.
+#
+#   tmdb = breaker("tmdb")
+#   r = tmdb.call(client.get, "/search/movie", params=...)
+
+T = TypeVar("T")
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a service whose circuit is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open; retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def _failed(result: Any) -> bool:
+    status = getattr(result, "status_code", None)
+    return status is not None and (status >= 500 or status == 429)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold: int = 5, reset_seconds: float = 30.0, max_reset_seconds: float = 600.0):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.reset_seconds = reset_seconds
+        self.max_reset_seconds = max(reset_seconds, max_reset_seconds)
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._wait = reset_seconds
+        self._opened_at = 0.0
+        self._trial = False  # a half-open trial call is in flight
+        self.opened = 0      # times the circuit has opened
+        self.rejected = 0    # calls failed fast while open
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self._wait:
+            self._state = "half-open"
+            self._trial = False
+        return self._state
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected (a half-open circuit with its trial taken counts)."""
+        with self._lock:
+            state = self._state_locked()
+            return state == "open" or (state == "half-open" and self._trial)
+
+    def allow(self) -> bool:
+        """Reserve a call: False while open; in half-open only the first caller gets True."""
+        with self._lock:
+            state = self._state_locked()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self._state_locked() == "closed":
+                return 0.0
+            return max(0.0, self._wait - (time.monotonic() - self._opened_at))
+
+    def success(self) -> None:
+        with self._lock:
+            if self._state != "closed":
+                lg.info({"event": "circuit.closed", "circuit": self.name})
+            self._state = "closed"
+            self._failures = 0
+            self._wait = self.reset_seconds
+            self._trial = False
+
+    def failure(self, err: str = "") -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == "half-open":
+                self._wait = min(self._wait * 2, self.max_reset_seconds)
+            elif self._state == "closed" and self._failures < self.threshold:
+                return
+            elif self._state == "open":
+                return
+            self._state = "open"
+            self._opened_at = time.monotonic()
+            self._trial = False
+            self.opened += 1
+            wait = self._wait
+        lg.warning({"event": "circuit.open", "circuit": self.name, "failures": self._failures,
+                    "retry_in_s": wait, "err": err})
+
+    def release(self) -> None:
+        """Give back a reserved call that neither succeeded nor failed (e.g. it was cancelled).
+
+        Without this an abandoned half-open trial would keep `_trial` set and the
+        circuit would reject every later call.
+        """
+        with self._lock:
+            self._trial = False
+
+    def _reject(self) -> CircuitOpen:
+        return CircuitOpen(self.name, self.retry_in())
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        if not self.allow():
+            raise self._reject()
+        settled = False
+        try:
+            result = fn(*args, **kwargs)
+            settled = True
+        except Exception as e:
+            settled = True
+            self.failure(str(e) or type(e).__name__)
+            raise
+        finally:
+            if not settled:
+                self.release()
+        self.failure(f"HTTP {result.status_code}") if _failed(result) else self.success()
+        return result
+
+    async def acall(self, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        if not self.allow():
+            raise self._reject()
+        settled = False
+        try:
+            result = await fn(*args, **kwargs)
+            settled = True
+        except Exception as e:
+            settled = True
+            self.failure(str(e) or type(e).__name__)
+            raise
+        finally:
+            if not settled:
+                self.release()
+        self.failure(f"HTTP {result.status_code}") if _failed(result) else self.success()
+        return result
+
+    def status(self) -> dict:
+        with self._lock:
+            state = self._state_locked()
+            retry_in = 0.0 if state == "closed" else max(0.0, self._wait - (time.monotonic() - self._opened_at))
+            return {"name": self.name, "state": state, "failures": self._failures, "retry_in_s": round(retry_in, 1),
+                    "opened": self.opened, "rejected": self.rejected}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """The process-wide breaker for a service; tmdb takes its limits from settings.tmdb."""
+    with _registry_lock:
+        b = _breakers.get(name)
+        if b is None:
+            kw = {}
+            if name == "tmdb":
+                from lhmm.settings import settings
+                cfg = settings.tmdb
+                kw = {"threshold": cfg.breaker_failures, "reset_seconds": cfg.breaker_reset_seconds,
+                      "max_reset_seconds": cfg.breaker_max_reset_seconds}
+            b = _breakers[name] = CircuitBreaker(name, **kw)
+        return b
+
+
+def statuses() -> list[dict]:
+    with _registry_lock:
+        items = list(_breakers.values())
+    return [b.status() for b in items]
@@ -0,0 +1,306 @@
+from __future__ import annotations
+import gzip
+import logging
+import os
+import pathlib
+import re
+import shutil
+import sqlite3
+import time
+from sqlalchemy import select, func
+from lhmm.db.session import SessionLocal, engine
+from lhmm.db.models import LibraryScan
+from lhmm.settings import CONFIG_DIR, settings
+from lhmm.services import leader, scan_control
+from lhmm.services.db_maintenance import db_path
+
+lg = logging.getLogger("lhmm.db_backup")
+
+# Online backups of the SQLite database with the backup API (sqlite3.Connection.backup).
+# Pages are copied pages_per_step at a time with a step_sleep_ms pause in between,
+# so the source is only read-locked for one step and writers (scans, imports) keep
+# going. A write from another connection restarts the copy, which SQLite handles,
+# so the result is a consistent snapshot with no torn WAL; after MAX_RESTARTS the
+# rest is copied in a single step instead.
+#
+#   <backup dir>/lhmm-20261019-031500-scheduled.sqlite3.gz
+#
+# A backup is written to a hidden .partial file, switched to journal_mode=DELETE
+# (one self-contained file), quick_check'ed, then gzip-streamed if compressed and
+# renamed into place; the newest `keep` backups are retained. The "db.backup" lease
+# keeps two workers from backing up at once.
+#
+# restore_backup() verifies the backup (full integrity_check, same alembic revision
+# as the live database unless forced), takes a "pre-restore" backup, then copies it
+# over the live database with the backup API in one step: other connections see the
+# old or the new database, never a mix. The generations epoch is re-randomised so
+# no client keeps an ETag from before the restore.
+
+BACKUP_LEASE = "db.backup"
+CHUNK = 1024 * 1024
+MAX_RESTARTS = 3
+_NAME = re.compile(r"^lhmm-\d{8}-\d{6}-[a-z][a-z-]*(\.\d+)?\.sqlite3(\.gz)?$")
+
+
+class BackupError(Exception):
+    pass
+
+
+class _Restarted(Exception):
+    pass
+
+
+def backup_dir() -> pathlib.Path:
+    cfg = settings.db.backup
+    return pathlib.Path(cfg.dir) if cfg.dir else CONFIG_DIR / "backups"
+
+
+def _info(path: pathlib.Path) -> dict:
+    st = path.stat()
+    return {"name": path.name, "bytes": st.st_size, "created_at": int(st.st_mtime),
+            "compressed": path.suffix == ".gz"}
+
+
+def list_backups() -> list[dict]:
+    """Backups newest first."""
+    d = backup_dir()
+    if not d.is_dir():
+        return []
+    return [_info(p) for p in sorted(d.iterdir(), key=lambda p: p.name, reverse=True) if _NAME.match(p.name)]
+
+
+def backup_path(name: str) -> pathlib.Path:
+    if not _NAME.match(name):
+        raise BackupError(f"not a backup name: {name}")
+    path = backup_dir() / name
+    if not path.is_file():
+        raise FileNotFoundError(name)
+    return path
+
+
+def _source_path() -> str:
+    path = db_path()
+    if not path:
+        raise BackupError("backups need a file-backed SQLite database")
+    return path
+
+
+def _alembic_version(conn: sqlite3.Connection) -> str | None:
+    try:
+        row = conn.execute("SELECT version_num FROM alembic_version").fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def _new_name(reason: str, compress: bool) -> str:
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+    ext = ".sqlite3.gz" if compress else ".sqlite3"
+    name, n = f"lhmm-{stamp}-{reason}{ext}", 1
+    while (backup_dir() / name).exists():
+        n += 1
+        name = f"lhmm-{stamp}-{reason}.{n}{ext}"
+    return name
+
+
+def create_backup(reason: str = "manual", compress: bool | None = None) -> dict:
+    """Copy the live database into the backup dir; returns the new backup's info."""
+    with leader.hold(BACKUP_LEASE, ttl=3600) as got:
+        if not got:
+            raise BackupError("another backup or restore is in progress")
+        return _create(reason, compress)
+
+
+def _create(reason: str, compress: bool | None, rotate: bool = True) -> dict:
+    cfg = settings.db.backup
+    compress = cfg.compress if compress is None else compress
+    src_path = _source_path()
+    d = backup_dir()
+    d.mkdir(parents=True, exist_ok=True)
+    name = _new_name(reason, compress)
+    tmp = d / f".{name}.partial"
+    t0 = time.perf_counter()
+    steps = restarts = 0
+    last_remaining: int | None = None
+    pause = cfg.step_sleep_ms / 1000
+
+    def progress(status, remaining, total):
+        # Called after every step. Sleeping here is what lets writers in between
+        # (backup()'s own sleep= only applies when a step reports BUSY); remaining
+        # going up means a write on another connection restarted the copy.
+        nonlocal steps, restarts, last_remaining
+        steps += 1
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise _Restarted
+        last_remaining = remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    try:
+        src = sqlite3.connect(src_path, timeout=30)
+        dst = sqlite3.connect(tmp)
+        try:
+            try:
+                src.backup(dst, pages=max(1, cfg.pages_per_step), progress=progress)
+            except _Restarted:
+                # Writes keep landing faster than the copy: take one snapshot instead
+                # (a WAL read transaction, so writers still are not blocked)
+                src.backup(dst, pages=-1)
+            dst.execute("PRAGMA journal_mode=DELETE")
+            check = dst.execute("PRAGMA quick_check").fetchone()[0]
+            version = _alembic_version(dst)
+            pages = dst.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            dst.close()
+            src.close()
+        if check != "ok":
+            raise BackupError(f"backup failed quick_check: {check}")
+        db_bytes = tmp.stat().st_size
+        final = d / name
+        if compress:
+            packed = d / f".{name}.gz.partial"
+            with open(tmp, "rb") as fin, gzip.open(packed, "wb", compresslevel=cfg.compress_level) as fout:
+                shutil.copyfileobj(fin, fout, CHUNK)
+            tmp.unlink()
+            tmp = packed
+        os.replace(tmp, final)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        (d / f".{name}.gz.partial").unlink(missing_ok=True)
+        raise
+    out = {
+        **_info(final), "reason": reason, "db_bytes": db_bytes, "pages": pages, "steps": steps,
+        "restarts": restarts,
+        "alembic_version": version, "ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+    out["pruned"] = prune(cfg.keep) if rotate else []
+    lg.info({"event": "db.backup.created", **out})
+    return out
+
+
+def prune(keep: int) -> list[str]:
+    """Delete all but the newest `keep` backups; returns the removed names."""
+    removed = []
+    for b in list_backups()[max(1, keep):]:
+        (backup_dir() / b["name"]).unlink(missing_ok=True)
+        removed.append(b["name"])
+    return removed
+
+
+def _unpacked(path: pathlib.Path) -> tuple[pathlib.Path, bool]:
+    """A plain SQLite file for `path`; True when it is a temporary copy to remove."""
+    if path.suffix != ".gz":
+        return path, False
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.restore")
+    try:
+        with gzip.open(path, "rb") as fin, open(tmp, "wb") as fout:
+            shutil.copyfileobj(fin, fout, CHUNK)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return tmp, True
+
+
+def _verify_file(path: pathlib.Path) -> dict:
+    # Read-only, so verifying never writes a journal next to the backup
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        problems = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+        tables = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+        return {
+            "ok": problems == ["ok"],
+            "integrity": problems[:20],
+            "alembic_version": _alembic_version(conn),
+            "tables": len(tables),
+            "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+        }
+    finally:
+        conn.close()
+
+
+def verify_backup(name: str) -> dict:
+    """Full integrity_check of a backup (decompressed to a temporary file first)."""
+    path = backup_path(name)
+    plain, temporary = path, False
+    try:
+        plain, temporary = _unpacked(path)
+        return {"name": name, **_verify_file(plain)}
+    except (sqlite3.Error, OSError, EOFError) as e:
+        return {"name": name, "ok": False, "integrity": [str(e)], "alembic_version": None}
+    finally:
+        if temporary:
+            plain.unlink(missing_ok=True)
+
+
+def _scans_running() -> int:
+    with SessionLocal() as db:
+        return db.scalar(
+            select(func.count()).select_from(LibraryScan)
+            .where(LibraryScan.status.in_(scan_control.ACTIVE), LibraryScan.started_at > int(time.time()) - 6 * 3600)
+        ) or 0
+
+
+def restore_backup(name: str, force: bool = False) -> dict:
+    """Replace the live database with a verified backup. force skips the alembic
+    revision and running-scan checks (never the integrity check)."""
+    path = backup_path(name)
+    live_path = _source_path()
+    with leader.hold(BACKUP_LEASE, ttl=3600) as got:
+        if not got:
+            raise BackupError("another backup or restore is in progress")
+        plain, temporary = _unpacked(path)
+        try:
+            check = _verify_file(plain)
+            if not check["ok"]:
+                raise BackupError(f"backup {name} failed integrity_check: {check['integrity'][:3]}")
+            live = sqlite3.connect(live_path, timeout=30)
+            try:
+                live_version = _alembic_version(live)
+            finally:
+                live.close()
+            if not force and check["alembic_version"] != live_version:
+                raise BackupError(
+                    f"backup is at revision {check['alembic_version']}, the database at {live_version}; "
+                    "restore with force and run alembic upgrade"
+                )
+            if not force and _scans_running():
+                raise BackupError("a library scan is running")
+
+            # Not rotated yet: the backup being restored may be the oldest one kept
+            safety = _create("pre-restore", None, rotate=False)
+            t0 = time.perf_counter()
+            src = sqlite3.connect(f"file:{plain}?mode=ro", uri=True)
+            live = sqlite3.connect(live_path, timeout=30)
+            try:
+                src.backup(live)  # one step: a single write transaction on the live file
+                try:
+                    live.execute("UPDATE generations SET gen = abs(random()) % 1000000000 WHERE scope = 'epoch'")
+                    live.commit()
+                except sqlite3.OperationalError:
+                    pass  # forced restore of a backup from before generations existed
+                live.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                live.close()
+                src.close()
+        finally:
+            if temporary:
+                plain.unlink(missing_ok=True)
+    # Pooled connections may hold statements prepared against the old schema
+    engine.dispose()
+    prune(settings.db.backup.keep)
+    out = {"restored": name, "alembic_version": check["alembic_version"], "pre_restore_backup": safety["name"],
+           "ms": round((time.perf_counter() - t0) * 1000, 1)}
+    lg.warning({"event": "db.backup.restored", **out})
+    return out
+
+
+def backup_job() -> None:
+    """Scheduler entry point for the periodic backup."""
+    try:
+        create_backup("scheduled")
+    except Exception as e:
+        lg.error({"event": "db.backup.error", "err": str(e)})
@@ -0,0 +1,229 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
+import time
+from sqlalchemy import select, delete
+from lhmm.db.session import SessionLocal, engine
+from lhmm.db.models import Job
+from lhmm.settings import settings
+
+lg = logging.getLogger("lhmm.db_maintenance")
+
+# Housekeeping for the SQLite file, run by the leader's scheduler (db.maintenance
+# job, every check_seconds):
+#
+#   - WAL over wal_checkpoint_mb: wal_checkpoint(TRUNCATE) straight away, even while
+#     scans run, so a long scan cannot grow the -wal file without bound;
+#   - when no scan is queued or running, a full pass if a scan finished since the
+#     last one, or at least every interval_hours: ANALYZE (bounded by
+#     analysis_limit) after scans, PRAGMA optimize, vacuuming, then a TRUNCATE
+#     checkpoint.
+#
+# Free pages are returned with PRAGMA incremental_vacuum, which only works once the
+# file is in auto_vacuum=INCREMENTAL. Databases created before that are converted
+# (PRAGMA auto_vacuum=INCREMENTAL + VACUUM, a one-off rewrite) during an idle pass
+# once vacuum_free_ratio of their pages are free.
+#
+# Each full pass is recorded as a finished Job row (type db.maintenance) so any
+# worker can report it; GET /api/v1/db/stats shows sizes, free-page ratio and the
+# last runs.
+
+MAINTENANCE_JOB = "db.maintenance"
+KEEP_RUNS = 20
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+_lock = threading.Lock()
+_scan_finished = threading.Event()
+
+
+def db_path() -> str | None:
+    """Filesystem path of the SQLite database, or None for in-memory/URI databases."""
+    path = engine.url.database
+    if not path or path == ":memory:" or path.startswith("file:"):
+        return None
+    return path
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def wal_bytes() -> int:
+    path = db_path()
+    return _file_size(path + "-wal") if path else 0
+
+
+def _pages(conn) -> dict:
+    pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()  # noqa: E731
+    page_size, page_count, freelist = pragma("page_size"), pragma("page_count"), pragma("freelist_count")
+    return {
+        "page_size": page_size,
+        "page_count": page_count,
+        "freelist_count": freelist,
+        "free_bytes": freelist * page_size,
+        "fragmentation": round(freelist / page_count, 4) if page_count else 0.0,
+        "auto_vacuum": AUTO_VACUUM_MODES.get(pragma("auto_vacuum"), "unknown"),
+    }
+
+
+def _analyzed(conn) -> bool:
+    return bool(conn.exec_driver_sql(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).scalar())
+
+
+def last_runs(limit: int = 5) -> list[dict]:
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(Job.payload_json).where(Job.type == MAINTENANCE_JOB).order_by(Job.id.desc()).limit(limit)
+        ).scalars()
+        return [json.loads(r) for r in rows]
+
+
+def stats() -> dict:
+    """Sizes on disk, page usage and the most recent maintenance passes."""
+    path = db_path()
+    with engine.connect() as conn:
+        pages = _pages(conn)
+        journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        analyzed = _analyzed(conn)
+    cfg = settings.db.maintenance
+    return {
+        "path": path,
+        "journal_mode": journal_mode,
+        "db_bytes": _file_size(path) if path else pages["page_size"] * pages["page_count"],
+        "wal_bytes": wal_bytes(),
+        "wal_checkpoint_bytes": cfg.wal_checkpoint_mb * 1024 * 1024,
+        **pages,
+        "analyzed": analyzed,
+        "last_runs": last_runs(),
+    }
+
+
+def checkpoint(reason: str = "manual") -> dict:
+    """wal_checkpoint(TRUNCATE); busy=1 means readers kept part of the WAL alive."""
+    t0 = time.perf_counter()
+    before = wal_bytes()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        busy, log_frames, done = conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").one()
+    out = {
+        "busy": busy, "log_frames": log_frames, "checkpointed": done,
+        "wal_bytes_before": before, "wal_bytes_after": wal_bytes(),
+        "ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+    lg.info({"event": "db.checkpoint", "reason": reason, **out})
+    return out
+
+
+def run_maintenance(reason: str = "manual", analyze: bool | None = None, vacuum: bool = False) -> dict:
+    """One full pass; analyze defaults to True after scans, on manual runs and when
+    the database has never been analyzed. vacuum=True forces a full VACUUM."""
+    if not _lock.acquire(blocking=False):
+        return {"reason": reason, "skipped": "already running"}
+    try:
+        return _run(reason, analyze, vacuum)
+    finally:
+        _lock.release()
+
+
+def _run(reason: str, analyze: bool | None, vacuum: bool) -> dict:
+    cfg = settings.db.maintenance
+    started = int(time.time())
+    t0 = time.perf_counter()
+    steps: dict[str, float] = {}
+    db_before = _file_size(db_path()) if db_path() else None
+
+    def step(name: str, fn) -> None:
+        s = time.perf_counter()
+        fn()
+        steps[name] = round((time.perf_counter() - s) * 1000, 1)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        sql = conn.exec_driver_sql
+        before = _pages(conn)
+        if analyze is None:
+            analyze = reason in ("post-scan", "manual") or not _analyzed(conn)
+        if analyze:
+            sql(f"PRAGMA analysis_limit={int(cfg.analysis_limit)}")
+            step("analyze", lambda: sql("ANALYZE"))
+        step("optimize", lambda: sql("PRAGMA optimize"))
+
+        convert = (
+            before["auto_vacuum"] != "incremental"
+            and before["fragmentation"] >= cfg.vacuum_free_ratio
+        )
+        if vacuum or convert:
+            # VACUUM rebuilds the file; the auto_vacuum change only takes effect through it
+            sql("PRAGMA auto_vacuum=INCREMENTAL")
+            step("vacuum", lambda: sql("VACUUM"))
+        elif before["auto_vacuum"] == "incremental" and before["freelist_count"]:
+            # pysqlite steps a statement once, which frees a single page; a script runs it to completion
+            raw = conn.connection.driver_connection
+            step("incremental_vacuum",
+                 lambda: raw.executescript(f"PRAGMA incremental_vacuum({int(cfg.incremental_vacuum_pages)})"))
+        after = _pages(conn)
+
+    ckpt = checkpoint(reason)
+    result = {
+        "reason": reason,
+        "at": started,
+        "ms": round((time.perf_counter() - t0) * 1000, 1),
+        "steps": steps,
+        "db_bytes_before": db_before,
+        "db_bytes_after": _file_size(db_path()) if db_path() else None,
+        "freelist_before": before["freelist_count"],
+        "freelist_after": after["freelist_count"],
+        "auto_vacuum": after["auto_vacuum"],
+        "checkpoint": ckpt,
+    }
+    _record(result, started)
+    lg.info({"event": "db.maintenance", **result})
+    return result
+
+
+def _record(result: dict, started: int) -> None:
+    with SessionLocal() as db:
+        db.add(Job(type=MAINTENANCE_JOB, status="done", payload_json=json.dumps(result),
+                   started_at=started, finished_at=int(time.time())))
+        db.flush()
+        keep = select(Job.id).where(Job.type == MAINTENANCE_JOB).order_by(Job.id.desc()).limit(KEEP_RUNS)
+        db.execute(delete(Job).where(Job.type == MAINTENANCE_JOB, Job.id.not_in(keep)))
+        db.commit()
+
+
+def _last_run_at() -> int:
+    with SessionLocal() as db:
+        return db.scalar(
+            select(Job.finished_at).where(Job.type == MAINTENANCE_JOB).order_by(Job.id.desc()).limit(1)
+        ) or 0
+
+
+def note_scan_finished() -> None:
+    """Called when a library scan ends; the next idle tick runs a post-scan pass."""
+    _scan_finished.set()
+
+
+def maintenance_tick() -> dict | None:
+    """Scheduler entry point: checkpoint an oversized WAL, run a pass when idle and due."""
+    from lhmm.services.scan_scheduler import scan_scheduler
+
+    cfg = settings.db.maintenance
+    try:
+        if wal_bytes() >= cfg.wal_checkpoint_mb * 1024 * 1024:
+            checkpoint("wal-threshold")
+        if scan_scheduler.is_busy():
+            return None
+        if _scan_finished.is_set():
+            _scan_finished.clear()
+            return run_maintenance("post-scan")
+        if time.time() - _last_run_at() >= cfg.interval_hours * 3600:
+            return run_maintenance("idle")
+    except Exception as e:
+        # e.g. "database is locked" by an import; the next tick retries
+        lg.warning({"event": "db.maintenance.error", "err": str(e)})
+    return None
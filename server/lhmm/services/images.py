@@ -0,0 +1,298 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING
+from sqlalchemy import select, union
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import Job, MediaItem, MediaFile
+from lhmm.settings import CONFIG_DIR, settings
+from lhmm.tmdb.client import CACHE_PATH as TMDB_CFG_CACHE
+
+if TYPE_CHECKING:
+    import httpx
+
+lg = logging.getLogger("lhmm.images")
+
+# Local cache of TMDB posters/backdrops under CONFIG_DIR/cache/images/<size>/<file>.
+# TMDB file paths are content-addressed (a new image gets a new path), so cached
+# files never go stale and are served with an immutable Cache-Control. "Resizing"
+# uses TMDB's pre-rendered sizes (w92 ... original) rather than re-encoding here.
+#
+# Total size is capped at settings.cache.images_max_mb with LRU eviction. The LRU
+# order lives in memory, seeded from file atimes at first use; hits bump the atime
+# (at most hourly) so the order survives restarts even on noatime mounts. The
+# accounting is per process: each worker only counts the files it has seen since
+# it started, so with N API workers the directory can grow to about N times the
+# cap (see CacheCfg.images_max_mb).
+
+IMAGE_DIR = CONFIG_DIR / "cache" / "images"
+DEFAULT_BASE = "https://image.tmdb.org/t/p/"
+DEFAULT_SIZES = ("w92", "w154", "w185", "w300", "w342", "w500", "w780", "w1280", "original")
+ATIME_BUMP = 3600.0
+PREWARM_CONCURRENCY = 8
+
+_NAME = re.compile(r"^[A-Za-z0-9_\-]{1,128}\.(jpg|jpeg|png|webp|svg)$")
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        import httpx
+
+        _client = httpx.AsyncClient(
+            timeout=20.0,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+        )
+    return _client
+
+
+# Parsed TMDB image config and its size names, keyed by the file's (mtime, size):
+# every image request checks the size name, so the JSON is only re-read when
+# TMDBClient.image_config() rewrites it.
+_cfg_memo: tuple[tuple[int, int] | None, dict, frozenset[str]] | None = None
+
+
+def _images_cfg() -> tuple[dict, frozenset[str]]:
+    global _cfg_memo
+    # Written by TMDBClient.image_config(); optional
+    try:
+        st = TMDB_CFG_CACHE.stat()
+        key = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        key = None
+    memo = _cfg_memo
+    if memo is not None and memo[0] == key:
+        return memo[1], memo[2]
+    cfg: dict = {}
+    if key is not None:
+        try:
+            cfg = json.loads(TMDB_CFG_CACHE.read_text("utf-8")) or {}
+        except (OSError, ValueError):
+            cfg = {}
+    sizes = set(DEFAULT_SIZES)
+    for k in ("poster_sizes", "backdrop_sizes", "still_sizes", "profile_sizes"):
+        sizes.update(cfg.get(k) or [])
+    memo = _cfg_memo = (key, cfg, frozenset(sizes))
+    return memo[1], memo[2]
+
+
+def base_url() -> str:
+    url = settings.tmdb.image_base_url or _images_cfg()[0].get("secure_base_url") or DEFAULT_BASE
+    return url.rstrip("/") + "/"
+
+
+def allowed_sizes() -> frozenset[str]:
+    return _images_cfg()[1]
+
+
+def valid(size: str, name: str) -> bool:
+    return size in allowed_sizes() and bool(_NAME.match(name))
+
+
+def etag(size: str, name: str, st: os.stat_result) -> str:
+    return f'"{size}-{name.rsplit(".", 1)[0]}-{st.st_size}"'
+
+
+class ImageCache:
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._lru: OrderedDict[str, int] | None = None  # "size/name" -> bytes
+        self._total = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def _load_locked(self) -> OrderedDict[str, int]:
+        if self._lru is None:
+            entries = []
+            if self.root.exists():
+                for d in self.root.iterdir():
+                    if not d.is_dir():
+                        continue
+                    for f in d.iterdir():
+                        if f.suffix == ".tmp":
+                            continue
+                        try:
+                            st = f.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((st.st_atime, f"{d.name}/{f.name}", st.st_size))
+            entries.sort()
+            self._lru = OrderedDict((k, sz) for _, k, sz in entries)
+            self._total = sum(self._lru.values())
+        return self._lru
+
+    def stats(self) -> dict:
+        with self._lock:
+            lru = self._load_locked()
+            return {"files": len(lru), "bytes": self._total, "max_bytes": self.max_bytes}
+
+    def path(self, size: str, name: str) -> Path:
+        return self.root / size / name
+
+    def lookup(self, size: str, name: str) -> tuple[Path, os.stat_result] | None:
+        p = self.path(size, name)
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            return None
+        key = f"{size}/{name}"
+        with self._lock:
+            lru = self._load_locked()
+            if key not in lru:
+                lru[key] = st.st_size
+                self._total += st.st_size
+            lru.move_to_end(key)
+        if time.time() - st.st_atime > ATIME_BUMP:
+            try:
+                os.utime(p, (time.time(), st.st_mtime))
+            except OSError:
+                pass
+        return p, st
+
+    def _added(self, key: str, nbytes: int) -> None:
+        victims = []
+        with self._lock:
+            lru = self._load_locked()
+            self._total += nbytes - lru.get(key, 0)
+            lru[key] = nbytes
+            lru.move_to_end(key)
+            while self._total > self.max_bytes and len(lru) > 1:
+                old, sz = lru.popitem(last=False)
+                self._total -= sz
+                victims.append(old)
+        for v in victims:
+            try:
+                (self.root / v).unlink()
+            except FileNotFoundError:
+                pass
+        if victims:
+            lg.info({"event": "images.evict", "files": len(victims), "bytes": self._total})
+
+    async def _download(self, size: str, name: str) -> None:
+        dst = self.path(size, name)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f"{name}.{os.getpid()}.{id(dst)}.tmp")
+        n = 0
+        try:
+            async with _http().stream("GET", f"{base_url()}{size}/{name}") as r:
+                r.raise_for_status()
+                with open(tmp, "wb") as f:
+                    async for chunk in r.aiter_bytes(64 * 1024):
+                        f.write(chunk)
+                        n += len(chunk)
+            os.replace(tmp, dst)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        self._added(f"{size}/{name}", n)
+
+    async def get(self, size: str, name: str) -> tuple[Path, os.stat_result]:
+        """Cached file for (size, name), downloading it once if needed.
+
+        Concurrent requests for the same image share a single download.
+        """
+        hit = self.lookup(size, name)
+        if hit:
+            return hit
+        key = f"{size}/{name}"
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._inflight[key] = fut
+            try:
+                await self._download(size, name)
+                fut.set_result(None)
+            except BaseException as e:
+                fut.set_exception(e)
+                # Mark retrieved so a download nobody else waited on does not warn
+                fut.exception()
+                raise
+            finally:
+                self._inflight.pop(key, None)
+        else:
+            await asyncio.shield(fut)
+        hit = self.lookup(size, name)
+        if not hit:
+            raise FileNotFoundError(key)
+        return hit
+
+
+cache = ImageCache(IMAGE_DIR, settings.cache.images_max_mb * 1024 * 1024)
+
+
+def library_image_paths(library_id: int | None) -> list[str]:
+    """Distinct poster/backdrop paths of items that have files (in one library, or all)."""
+    items = select(MediaFile.item_id)
+    if library_id is not None:
+        items = items.where(MediaFile.library_id == library_id)
+    stmt = union(
+        select(MediaItem.poster_path.label("p")).where(MediaItem.id.in_(items), MediaItem.poster_path.is_not(None)),
+        select(MediaItem.backdrop_path.label("p")).where(MediaItem.id.in_(items), MediaItem.backdrop_path.is_not(None)),
+    )
+    with SessionLocal() as db:
+        return [p for (p,) in db.execute(stmt)]
+
+
+def _update_job(job_id: int, **fields) -> None:
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        if not job:
+            return
+        payload = fields.pop("payload", None)
+        if payload is not None:
+            job.payload_json = json.dumps(payload)
+        for k, v in fields.items():
+            setattr(job, k, v)
+        db.commit()
+
+
+def create_prewarm_job(library_id: int | None, sizes: list[str]) -> int:
+    with SessionLocal() as db:
+        job = Job(type="images.prewarm", status="queued",
+                  payload_json=json.dumps({"library_id": library_id, "sizes": sizes}))
+        db.add(job)
+        db.commit()
+        return job.id
+
+
+async def prewarm(job_id: int, library_id: int | None, sizes: list[str]) -> dict:
+    """Fetch every missing image for a library (all libraries when None) in the given sizes."""
+    await asyncio.to_thread(_update_job, job_id, status="running", started_at=int(time.time()))
+    progress = {"library_id": library_id, "sizes": sizes, "total": 0, "cached": 0, "fetched": 0, "failed": 0}
+    try:
+        paths = await asyncio.to_thread(library_image_paths, library_id)
+        todo = [(s, p.lstrip("/")) for p in paths for s in sizes if valid(s, p.lstrip("/"))]
+        progress["total"] = len(todo)
+        sem = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+        async def one(size: str, name: str) -> None:
+            async with sem:
+                if cache.lookup(size, name):
+                    progress["cached"] += 1
+                    return
+                try:
+                    await cache.get(size, name)
+                    progress["fetched"] += 1
+                except Exception as e:
+                    progress["failed"] += 1
+                    lg.warning({"event": "images.prewarm.error", "image": f"{size}/{name}", "err": str(e)})
+
+        await asyncio.gather(*(one(s, n) for s, n in todo))
+        await asyncio.to_thread(_update_job, job_id, status="done", finished_at=int(time.time()), payload=progress)
+    except Exception as e:
+        progress["error"] = str(e)
+        await asyncio.to_thread(_update_job, job_id, status="error", finished_at=int(time.time()), payload=progress)
+        raise
+    lg.info({"event": "images.prewarm", "job_id": job_id, **progress})
+    return progress
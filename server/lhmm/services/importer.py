@@ -0,0 +1,201 @@
+from __future__ import annotations
+import asyncio
+import errno
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from sqlalchemy import select, or_
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import SabHistory, Library
+from lhmm.services.config_service import load_config
+from lhmm.services.leader import hold
+from lhmm.services.scanner import VIDEO_EXTS, _lib_root, scan_paths
+from lhmm.settings import settings
+
+lg = logging.getLogger("lhmm.importer")
+
+# Completed SAB downloads (sab_history rows with status Completed and no
+# import_status) are placed into the library mapped from their category
+# (sab_category_movies -> movie library, sab_category_tv -> tv library), then only
+# the placed files are matched and linked via scanner.scan_paths.
+#
+# Placement is zero-copy when the download and the library share a filesystem:
+# os.rename (import_mode=move) or os.link (import_mode=hardlink). Across devices
+# the file is copied in fixed-size chunks to a ".partial" name, fsynced, renamed
+# into place, and (for move) the source is removed afterwards. A same-size file
+# already at the destination counts as placed; move mode removes the source too.
+
+_SAMPLE = re.compile(r"(^|[\W_])sample([\W_]|$)", re.IGNORECASE)
+_lock = threading.Lock()
+IMPORT_LEASE = "sab.import"
+IMPORT_LEASE_SECONDS = 6 * 3600  # released when done; only matters if a process dies mid-import
+
+
+def _video_files(storage: str) -> list[str]:
+    if os.path.isfile(storage):
+        return [storage] if os.path.splitext(storage)[1].lower() in VIDEO_EXTS else []
+    out = []
+    for dp, _, fn in os.walk(storage):
+        for f in fn:
+            if os.path.splitext(f)[1].lower() in VIDEO_EXTS and not _SAMPLE.search(f):
+                out.append(os.path.join(dp, f))
+    return sorted(out)
+
+
+def _same_device(src: str, dst_dir: str) -> bool:
+    return os.stat(src).st_dev == os.stat(dst_dir).st_dev
+
+
+def _copy_chunked(src: str, dst: str, chunk: int) -> None:
+    tmp = dst + ".partial"
+    try:
+        with open(src, "rb") as fi, open(tmp, "wb") as fo:
+            shutil.copyfileobj(fi, fo, chunk)
+            fo.flush()
+            os.fsync(fo.fileno())
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def place_file(src: str, dst: str, mode: str = "move", chunk_mb: int = 8) -> str:
+    """Put src at dst; returns the method used: rename, hardlink, copy or exists.
+
+    "exists" means dst already holds a file of the same size (an earlier import);
+    in move mode the source is then removed like any moved file.
+    """
+    dst_dir = os.path.dirname(dst)
+    os.makedirs(dst_dir, exist_ok=True)
+    if os.path.exists(dst):
+        if os.path.getsize(dst) == os.path.getsize(src):
+            if mode == "move" and os.path.abspath(src) != os.path.abspath(dst):
+                os.unlink(src)
+            return "exists"
+        raise FileExistsError(errno.EEXIST, "destination exists with a different size", dst)
+    if _same_device(src, dst_dir):
+        try:
+            if mode == "hardlink":
+                os.link(src, dst)
+                return "hardlink"
+            os.rename(src, dst)
+            return "rename"
+        except OSError as e:
+            # e.g. hardlinks unsupported on this filesystem; bind mounts can also
+            # report one st_dev but refuse rename with EXDEV
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+    _copy_chunked(src, dst, max(1, chunk_mb) * 1024 * 1024)
+    if mode == "move":
+        os.unlink(src)
+    return "copy"
+
+
+def _targets() -> dict[str, tuple[int, str]]:
+    """SAB category -> (library id, library root); lowest-id library of each type wins."""
+    with SessionLocal() as db:
+        cfg = load_config(db)
+        by_type: dict[str, tuple[int, str]] = {}
+        for li in db.execute(select(Library).order_by(Library.id.asc())).scalars():
+            if li.type not in by_type:
+                try:
+                    by_type[li.type] = (li.id, _lib_root(db, li.id))
+                except RuntimeError:
+                    continue
+    out = {}
+    for key, kind in (("sab_category_movies", "movie"), ("sab_category_tv", "tv")):
+        cat = (cfg.get(key) or "").strip()
+        if cat and kind in by_type:
+            out[cat] = by_type[kind]
+    return out
+
+
+def _import_one(h: SabHistory, library_id: int, root: str) -> dict:
+    storage = (h.storage or "").rstrip("/")
+    if not storage or not os.path.exists(storage):
+        raise FileNotFoundError(errno.ENOENT, "download not found", storage or h.name)
+    files = _video_files(storage)
+    if not files:
+        return {"status": "skipped", "error": "no video files"}
+    # A job folder keeps its name under the library root; a bare file lands at the root
+    dest_base = os.path.join(root, os.path.basename(storage)) if os.path.isdir(storage) else root
+    placed, methods = [], {}
+    for src in files:
+        rel = os.path.relpath(src, storage) if os.path.isdir(storage) else os.path.basename(src)
+        dst = os.path.join(dest_base, rel)
+        how = place_file(src, dst, settings.sabnzbd.import_mode, settings.sabnzbd.import_chunk_mb)
+        methods[how] = methods.get(how, 0) + 1
+        placed.append(dst)
+    stats = scan_paths(library_id, placed)
+    return {"status": "imported", "files": placed, "methods": methods, "matched": stats["matched"]}
+
+
+def import_completed(retry_failed: bool = False, limit: int = 100) -> dict:
+    """Import pending completed downloads; returns counts.
+
+    Serialised by a process lock and, across workers, by the sab.import lease.
+    """
+    if not _lock.acquire(blocking=False):
+        return {"busy": True}
+    try:
+        with hold(IMPORT_LEASE, IMPORT_LEASE_SECONDS) as got:
+            if not got:
+                return {"busy": True}
+            return _import_pending(retry_failed, limit)
+    finally:
+        _lock.release()
+
+
+def _import_pending(retry_failed: bool, limit: int) -> dict:
+    targets = _targets()
+    if not targets:
+        return {"imported": 0, "failed": 0, "skipped": 0, "reason": "no category mapped to a library"}
+    pending = SabHistory.import_status.is_(None)
+    if retry_failed:
+        pending = or_(pending, SabHistory.import_status == "failed")
+    counts = {"imported": 0, "failed": 0, "skipped": 0}
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(SabHistory)
+            .where(SabHistory.status == "Completed", SabHistory.category.in_(list(targets)))
+            .where(pending)
+            .order_by(SabHistory.completed.asc())
+            .limit(limit)
+        ).scalars().all()
+        for h in rows:
+            library_id, root = targets[h.category]
+            t0 = time.perf_counter()
+            try:
+                res = _import_one(h, library_id, root)
+                h.import_status = res["status"]
+                h.import_error = res.get("error")
+            except Exception as e:
+                res = {"status": "failed"}
+                h.import_status = "failed"
+                h.import_error = str(e)[:1000]
+            h.import_library_id = library_id
+            h.imported_at = int(time.time())
+            db.commit()
+            counts[h.import_status] += 1
+            lg.info({
+                "event": f"import.{h.import_status}",
+                "nzo_id": h.nzo_id,
+                "library_id": library_id,
+                "files": len(res.get("files") or []),
+                "methods": res.get("methods"),
+                "matched": res.get("matched"),
+                "err": h.import_error,
+                "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+            })
+    return counts
+
+
+async def run_imports(retry_failed: bool = False) -> dict:
+    return await asyncio.to_thread(import_completed, retry_failed)
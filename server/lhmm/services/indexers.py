@@ -0,0 +1,345 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Iterable, TYPE_CHECKING
+from xml.etree.ElementTree import XMLPullParser
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import Indexer
+from lhmm.settings import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+lg = logging.getLogger("lhmm.indexers")
+
+# Newznab search fan-out. Every configured indexer (rows in `indexers` plus
+# settings.indexers; the DB wins on a name clash) is queried concurrently through
+# one pooled AsyncClient, each under its own timeout. Responses are parsed
+# incrementally with XMLPullParser as bytes arrive, and results are yielded per
+# indexer as soon as it answers, deduplicated against everything already yielded.
+# The merged result list is cached for CACHE_TTL seconds per query.
+#
+# capabilities_json follows the Newznab caps document, e.g.
+#   {"searching": {"search": {"available": "yes", "supportedParams": "q"},
+#                  "tv-search": {"available": "yes", "supportedParams": "q,season,ep,tvdbid"},
+#                  "movie-search": {"available": "yes", "supportedParams": "q,imdbid,tmdbid"}},
+#    "limits": {"max": 100}, "timeout": 10}
+# Missing capabilities fall back to plain t=search with a free-text query.
+
+DEFAULT_TIMEOUT = 10.0
+CACHE_TTL = 120.0
+CACHE_MAX = 256
+NEWZNAB_NS = "http://www.newznab.com/DTD/2010/feeds/attributes/"
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        import httpx
+
+        _client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+    return _client
+
+
+@dataclass
+class IndexerDef:
+    name: str
+    url: str
+    api_key: str = ""
+    caps: dict = field(default_factory=dict)
+    id: int | None = None
+
+    @property
+    def timeout(self) -> float:
+        try:
+            return float(self.caps.get("timeout") or DEFAULT_TIMEOUT)
+        except (TypeError, ValueError):
+            return DEFAULT_TIMEOUT
+
+    def supports(self, mode: str) -> set[str] | None:
+        """Supported params for a search mode, or None when the mode is unavailable."""
+        s = (self.caps.get("searching") or self.caps).get(mode)
+        if not isinstance(s, dict):
+            return None
+        if str(s.get("available", "yes")).lower() not in ("yes", "true", "1"):
+            return None
+        return {p.strip() for p in str(s.get("supportedParams") or "q").split(",") if p.strip()}
+
+
+@dataclass(frozen=True)
+class SearchQuery:
+    q: str = ""
+    type: str = "search"  # search | movie | tv
+    year: int | None = None
+    tmdbid: int | None = None
+    imdbid: str | None = None
+    tvdbid: int | None = None
+    season: int | None = None
+    ep: int | None = None
+    cat: str | None = None
+    limit: int = 100
+
+    def cache_key(self) -> str:
+        return json.dumps(asdict(self), sort_keys=True)
+
+
+def load_indexers(names: Iterable[str] | None = None) -> list[IndexerDef]:
+    out: dict[str, IndexerDef] = {}
+    for cfg in settings.indexers:
+        out[cfg.name] = IndexerDef(name=cfg.name, url=cfg.url, api_key=cfg.api_key, caps=dict(cfg.capabilities))
+    with SessionLocal() as db:
+        for ix in db.query(Indexer).all():
+            try:
+                caps = json.loads(ix.capabilities_json or "{}") or {}
+            except ValueError:
+                caps = {}
+            out[ix.name] = IndexerDef(name=ix.name, url=ix.url, api_key=ix.api_key or "", caps=caps, id=ix.id)
+    if names:
+        wanted = set(names)
+        return [d for n, d in out.items() if n in wanted]
+    return list(out.values())
+
+
+def build_params(ix: IndexerDef, sq: SearchQuery) -> dict:
+    """Newznab query for one indexer, using the richest search mode it supports."""
+    params: dict = {"apikey": ix.api_key, "o": "xml"}
+    max_limit = (ix.caps.get("limits") or {}).get("max")
+    params["limit"] = min(sq.limit, int(max_limit)) if max_limit else sq.limit
+    if sq.cat:
+        params["cat"] = sq.cat
+    text = sq.q.strip()
+    if sq.type == "movie" and (sup := ix.supports("movie-search")) is not None:
+        params["t"] = "movie"
+        if sq.tmdbid and "tmdbid" in sup:
+            params["tmdbid"] = sq.tmdbid
+        elif sq.imdbid and "imdbid" in sup:
+            params["imdbid"] = sq.imdbid.removeprefix("tt")
+        else:
+            params["q"] = f"{text} {sq.year}" if sq.year and "year" not in sup else text
+            if sq.year and "year" in sup:
+                params["year"] = sq.year
+        return params
+    if sq.type == "tv" and (sup := ix.supports("tv-search")) is not None:
+        params["t"] = "tvsearch"
+        if sq.tvdbid and "tvdbid" in sup:
+            params["tvdbid"] = sq.tvdbid
+        else:
+            params["q"] = text
+        if sq.season is not None and "season" in sup:
+            params["season"] = sq.season
+            if sq.ep is not None and "ep" in sup:
+                params["ep"] = sq.ep
+        elif sq.season is not None:
+            params["q"] = _se_text(text, sq.season, sq.ep)
+        return params
+    # Generic search: fold the structured bits into the text
+    params["t"] = "search"
+    if sq.type == "tv" and sq.season is not None:
+        text = _se_text(text, sq.season, sq.ep)
+    elif sq.type == "movie" and sq.year:
+        text = f"{text} {sq.year}"
+    params["q"] = text
+    return params
+
+
+def _se_text(text: str, season: int, ep: int | None) -> str:
+    return f"{text} S{season:02d}" + (f"E{ep:02d}" if ep is not None else "")
+
+
+class NewznabError(Exception):
+    pass
+
+
+class FeedParser:
+    """Incremental Newznab/RSS parser: feed() bytes, get back completed <item>s."""
+
+    def __init__(self) -> None:
+        self._p = XMLPullParser(events=("start", "end"))
+        self._root_seen = False
+
+    def feed(self, chunk: bytes) -> list[dict]:
+        self._p.feed(chunk)
+        return self._drain()
+
+    def close(self) -> list[dict]:
+        self._p.close()
+        return self._drain()
+
+    def _drain(self) -> list[dict]:
+        out = []
+        for ev, el in self._p.read_events():
+            if ev == "start":
+                if not self._root_seen:
+                    self._root_seen = True
+                    if el.tag == "error":
+                        raise NewznabError(f"{el.get('code')}: {el.get('description')}")
+                continue
+            if el.tag == "item":
+                out.append(_item(el))
+                el.clear()
+        return out
+
+
+def _item(el) -> dict:
+    attrs = {a.get("name"): a.get("value") for a in el.iter(f"{{{NEWZNAB_NS}}}attr")}
+    enc = el.find("enclosure")
+    size = attrs.get("size") or el.findtext("size") or (enc.get("length") if enc is not None else None)
+    pub = el.findtext("pubDate")
+    try:
+        pub_ts = int(parsedate_to_datetime(pub).timestamp()) if pub else None
+    except (TypeError, ValueError):
+        pub_ts = None
+    return {
+        "title": (el.findtext("title") or "").strip(),
+        "guid": (el.findtext("guid") or "").strip(),
+        "link": (enc.get("url") if enc is not None else None) or (el.findtext("link") or "").strip(),
+        "size": int(size) if size and str(size).isdigit() else None,
+        "pub_ts": pub_ts,
+        "category": attrs.get("category"),
+        "grabs": int(attrs["grabs"]) if (attrs.get("grabs") or "").isdigit() else None,
+    }
+
+
+async def fetch(ix: IndexerDef, params: dict) -> AsyncIterator[dict]:
+    """Stream items from one indexer as the response body arrives."""
+    url = ix.url.rstrip("/")
+    if not url.endswith("/api"):
+        url += "/api"
+    parser = FeedParser()
+    async with _http().stream("GET", url, params=params, timeout=ix.timeout) as r:
+        r.raise_for_status()
+        async for chunk in r.aiter_bytes():
+            for it in parser.feed(chunk):
+                yield it
+    for it in parser.close():
+        yield it
+
+
+_TITLE_JUNK = re.compile(r"[^a-z0-9]+")
+
+
+def _norm_title(t: str) -> str:
+    return _TITLE_JUNK.sub(" ", t.lower()).strip()
+
+
+class Deduper:
+    """Drops a release already seen from another indexer (same title, size within 1%)."""
+
+    def __init__(self) -> None:
+        self._seen: dict[str, list[dict]] = {}
+
+    def add(self, item: dict) -> bool:
+        key = _norm_title(item["title"])
+        kept = self._seen.setdefault(key, [])
+        for k in kept:
+            a, b = k.get("size"), item.get("size")
+            if not a or not b or abs(a - b) <= 0.01 * max(a, b):
+                if item["indexer"] not in k["indexers"]:
+                    k["indexers"].append(item["indexer"])
+                return False
+        item["indexers"] = [item["indexer"]]
+        kept.append(item)
+        return True
+
+
+class _Cache:
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max = max_entries
+        self._d: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def get(self, key: str) -> dict | None:
+        hit = self._d.get(key)
+        if not hit:
+            return None
+        if time.monotonic() - hit[0] > self.ttl:
+            self._d.pop(key, None)
+            return None
+        self._d.move_to_end(key)
+        return hit[1]
+
+    def put(self, key: str, value: dict) -> None:
+        self._d[key] = (time.monotonic(), value)
+        self._d.move_to_end(key)
+        while len(self._d) > self.max:
+            self._d.popitem(last=False)
+
+
+cache = _Cache(CACHE_TTL, CACHE_MAX)
+
+
+async def _search_one(ix: IndexerDef, sq: SearchQuery) -> tuple[IndexerDef, list[dict], str | None, float]:
+    t0 = time.perf_counter()
+    items: list[dict] = []
+    err = None
+    try:
+        async with asyncio.timeout(ix.timeout):
+            async for it in fetch(ix, build_params(ix, sq)):
+                it["indexer"] = ix.name
+                items.append(it)
+    except TimeoutError:
+        err = f"timed out after {ix.timeout:g}s"
+    except Exception as e:
+        err = str(e) or type(e).__name__
+    if err:
+        lg.warning({"event": "indexer.search.error", "indexer": ix.name, "err": err})
+    return ix, items, err, round((time.perf_counter() - t0) * 1000, 1)
+
+
+async def search_stream(sq: SearchQuery, indexers: list[IndexerDef] | None = None) -> AsyncIterator[dict]:
+    """Yield one event per indexer as it finishes, then a final "done" event.
+
+    Per-indexer events carry only results not already yielded. A cache hit yields
+    a single "cached" event with the merged list.
+    """
+    indexers = load_indexers() if indexers is None else indexers
+    key = sq.cache_key() + "|" + ",".join(sorted(i.name for i in indexers))
+    hit = cache.get(key)
+    if hit is not None:
+        yield {"event": "cached", **hit}
+        return
+    dedupe = Deduper()
+    merged: list[dict] = []
+    summary: dict[str, dict] = {}
+    tasks = [asyncio.create_task(_search_one(ix, sq)) for ix in indexers]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            ix, items, err, ms = await fut
+            fresh = [it for it in items if dedupe.add(it)]
+            merged.extend(fresh)
+            summary[ix.name] = {"count": len(items), "new": len(fresh), "error": err, "elapsed_ms": ms}
+            yield {"event": "results", "indexer": ix.name, **summary[ix.name], "results": fresh}
+    finally:
+        for t in tasks:
+            t.cancel()
+    result = {"results": merged, "indexers": summary}
+    # Only cache when every indexer answered; a timeout should be retried next time
+    if all(s["error"] is None for s in summary.values()):
+        cache.put(key, result)
+    yield {"event": "done", "total": len(merged), "indexers": summary}
+
+
+async def search(sq: SearchQuery, indexers: list[IndexerDef] | None = None) -> dict:
+    """Wait for every indexer and return the merged, deduplicated results, newest first."""
+    out: dict = {"results": [], "indexers": {}, "cached": False}
+    async for ev in search_stream(sq, indexers):
+        if ev["event"] == "cached":
+            out.update(results=list(ev["results"]), indexers=ev["indexers"], cached=True)
+        elif ev["event"] == "results":
+            out["results"].extend(ev["results"])
+        elif ev["event"] == "done":
+            out["indexers"] = ev["indexers"]
+    out["results"].sort(key=lambda r: r.get("pub_ts") or 0, reverse=True)
+    return out
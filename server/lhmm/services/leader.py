@@ -0,0 +1,235 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import secrets
+import socket
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+from sqlalchemy import select, update, delete, case, or_, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import Lease, Job
+
+lg = logging.getLogger("lhmm.leader")
+
+# Single-leader background work for multi-worker deployments (uvicorn --workers N).
+# Every worker tries to take the "scheduler" lease, a row in `leases` that is
+# claimed or renewed with one atomic UPSERT: the update only applies when the row
+# is ours or has expired, and RETURNING tells us whether it did. The holder renews
+# it every lease_seconds/3 and runs APScheduler and the scan pool; the others stay
+# HTTP-only and take over once the lease expires (or at once when the leader shuts
+# down cleanly and deletes it).
+#
+# Work that has to run on the leader but is triggered by a request on any worker
+# (scans, periodic-scan re-registration) is forwarded as a queued Job row and picked
+# up by the leader's process_forwarded() poll.
+
+SCHEDULER_LEASE = "scheduler"
+FORWARD_POLL_SECONDS = 2
+FORWARDED_KEEP_SECONDS = 86400
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+
+
+def try_acquire(name: str, ttl: int, owner: str = OWNER) -> bool:
+    """Take or renew a lease; True when `owner` holds it afterwards."""
+    now = int(time.time())
+    stmt = insert(Lease).values(name=name, owner=owner, acquired_at=now, expires_at=now + ttl)
+    ex = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Lease.name],
+        set_={
+            "owner": ex.owner,
+            "expires_at": ex.expires_at,
+            "acquired_at": case((Lease.owner == ex.owner, Lease.acquired_at), else_=ex.acquired_at),
+        },
+        where=or_(Lease.owner == ex.owner, Lease.expires_at < now),
+    ).returning(Lease.owner)
+    with SessionLocal() as db:
+        got = db.execute(stmt).scalar()
+        if got is None and _steal_from_dead_local(db, name, ttl, owner, now):
+            got = owner
+        db.commit()
+    return got == owner
+
+
+def _steal_from_dead_local(db, name: str, ttl: int, owner: str, now: int) -> bool:
+    # A lease left by a process on this host that no longer exists (crash, or a
+    # container restart that reuses our pid) need not wait for expiry.
+    held = db.scalar(select(Lease.owner).where(Lease.name == name))
+    if not held:
+        return False
+    host, _, rest = held.partition(":")
+    pid = rest.partition(":")[0]
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    if int(pid) != os.getpid():
+        try:
+            os.kill(int(pid), 0)
+            return False
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            return False
+    res = db.execute(
+        update(Lease)
+        .where(Lease.name == name, Lease.owner == held)
+        .values(owner=owner, acquired_at=now, expires_at=now + ttl)
+    )
+    if res.rowcount:
+        lg.info({"event": "leader.lease.reclaimed", "lease": name, "from": held})
+    return bool(res.rowcount)
+
+
+def release(name: str, owner: str = OWNER) -> None:
+    with SessionLocal() as db:
+        db.execute(delete(Lease).where(Lease.name == name, Lease.owner == owner))
+        db.commit()
+
+
+def holder(name: str) -> dict | None:
+    with SessionLocal() as db:
+        row = db.get(Lease, name)
+        if not row:
+            return None
+        return {"name": row.name, "owner": row.owner, "acquired_at": row.acquired_at,
+                "expires_at": row.expires_at, "expired": row.expires_at < int(time.time())}
+
+
+@contextmanager
+def hold(name: str, ttl: int = 600) -> Iterator[bool]:
+    """Cross-process mutex for a short critical section; yields False if another process holds it."""
+    got = try_acquire(name, ttl)
+    try:
+        yield got
+    finally:
+        if got:
+            release(name)
+
+
+class Leadership:
+    """Keeps (or waits for) a lease and calls on_elected/on_demoted on transitions."""
+
+    def __init__(self, name: str, ttl: int, on_elected: Callable[[], None], on_demoted: Callable[[], None]) -> None:
+        self.name = name
+        self.ttl = max(3, ttl)
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.is_leader = False
+        self._valid_until = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.is_leader:
+            self._set(False)
+            await asyncio.to_thread(release, self.name)
+
+    async def _run(self) -> None:
+        while True:
+            t0 = time.monotonic()
+            try:
+                ok = await asyncio.to_thread(try_acquire, self.name, self.ttl)
+                if ok:
+                    self._valid_until = t0 + self.ttl
+            except Exception as e:
+                # e.g. "database is locked": keep leading until our lease could have lapsed
+                ok = self.is_leader and time.monotonic() < self._valid_until - 1
+                lg.warning({"event": "leader.lease.error", "lease": self.name, "err": str(e)})
+            if ok != self.is_leader:
+                self._set(ok)
+            await asyncio.sleep(self.ttl / 3)
+
+    def _set(self, leader: bool) -> None:
+        self.is_leader = leader
+        lg.info({"event": "leader.elected" if leader else "leader.demoted", "lease": self.name, "owner": OWNER})
+        try:
+            (self.on_elected if leader else self.on_demoted)()
+        except Exception as e:
+            lg.error({"event": "leader.transition.error", "lease": self.name, "leader": leader, "err": str(e)})
+
+
+_leadership: Leadership | None = None
+
+
+def set_leadership(lead: Leadership | None) -> None:
+    global _leadership
+    _leadership = lead
+
+
+def is_leader() -> bool:
+    """True in the process that runs background work; also True when no election runs
+    (scripts, tests, a single process without the startup hook)."""
+    return _leadership is None or _leadership.is_leader
+
+
+def forward(kind: str, payload: dict, dedupe: bool = False, db: Session | None = None) -> int | None:
+    """Queue work for the leader; with dedupe, returns None if an identical request is queued.
+
+    With ``db`` the Job row joins the caller's transaction and is committed with it.
+    A caller that has already written must pass its session: a second connection
+    would wait on the caller's own SQLite write lock until the busy timeout.
+    """
+    if db is None:
+        with SessionLocal() as own:
+            job_id = forward(kind, payload, dedupe, own)
+            own.commit()
+        return job_id
+    body = json.dumps(payload, sort_keys=True)
+    if dedupe and db.scalar(
+        select(Job.id).where(Job.type == kind, Job.status == "queued", Job.payload_json == body).limit(1)
+    ):
+        return None
+    job = Job(type=kind, status="queued", payload_json=body)
+    db.add(job)
+    db.flush()
+    return job.id
+
+
+def pending_forwarded(kinds: tuple[str, ...]) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Job).where(Job.status == "queued", Job.type.in_(kinds))) or 0
+
+
+def claim_forwarded(kinds: tuple[str, ...]) -> list[tuple[int, str, dict]]:
+    """Atomically mark queued requests running and return them, oldest first."""
+    now = int(time.time())
+    with SessionLocal() as db:
+        queued = select(Job.id).where(Job.status == "queued", Job.type.in_(kinds))
+        rows = db.execute(
+            update(Job)
+            .where(Job.id.in_(queued))
+            .values(status="running", started_at=now)
+            .returning(Job.id, Job.type, Job.payload_json)
+        ).all()
+        db.execute(delete(Job).where(
+            Job.type.in_(kinds), Job.status.in_(("done", "error")), Job.finished_at < now - FORWARDED_KEEP_SECONDS,
+        ))
+        db.commit()
+    return sorted((jid, kind, json.loads(body or "{}")) for jid, kind, body in rows)
+
+
+def finish_forwarded(job_id: int, error: str | None = None) -> None:
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        if not job:
+            return
+        job.status = "error" if error else "done"
+        job.finished_at = int(time.time())
+        if error:
+            job.payload_json = json.dumps({**json.loads(job.payload_json or "{}"), "error": error})
+        db.commit()
@@ -0,0 +1,201 @@
+from __future__ import annotations
+import json
+import logging
+import random
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import Library, LibraryScan
+from lhmm.services import leader
+
+lg = logging.getLogger("lhmm.periodic_scans")
+
+# Scheduled library refreshes, configured per library in Library.settings_json:
+#
+#   {"scan": {"interval_minutes": 60, "min_interval_minutes": 15,
+#             "max_interval_minutes": 1440, "jitter_seconds": 300}}
+#
+# Each run first compares a directory-mtime fingerprint with the one stored by the
+# last succeeded scan and only queues an (incremental) scan when it differs. The
+# baseline only advances when that scan succeeds, so a change whose scan fails, is
+# cancelled or paused, or could not be queued is seen again on the next run.
+# Quiet libraries double their interval up to the max; libraries that changed
+# halve it down to the min. Every run is a one-shot "date" job that reschedules
+# itself with fresh jitter.
+
+JOB_PREFIX = "scan.periodic."
+SYNC_REQUEST = "periodic.sync"
+
+
+@dataclass
+class ScanSchedule:
+    interval: float  # minutes
+    min_interval: float
+    max_interval: float
+    jitter: float  # seconds
+
+
+def parse_schedule(settings_json: str | None) -> ScanSchedule | None:
+    try:
+        cfg = (json.loads(settings_json or "{}") or {}).get("scan") or {}
+    except (ValueError, AttributeError):
+        return None
+    if not cfg or cfg.get("enabled") is False or not cfg.get("interval_minutes"):
+        return None
+    interval = float(cfg["interval_minutes"])
+    lo = float(cfg.get("min_interval_minutes") or max(5.0, interval / 4))
+    hi = float(cfg.get("max_interval_minutes") or interval * 8)
+    return ScanSchedule(
+        interval=min(max(interval, lo), hi),
+        min_interval=lo,
+        max_interval=hi,
+        jitter=float(cfg.get("jitter_seconds", min(300.0, interval * 6))),
+    )
+
+
+class _State:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.interval: dict[int, float] = {}  # current adaptive interval (minutes)
+
+
+_state = _State()
+
+
+def _scheduler():
+    from lhmm.scheduler import scheduler
+    return scheduler
+
+
+def _schedule_next(library_id: int, delay_minutes: float, jitter: float) -> None:
+    delay = delay_minutes * 60 + random.uniform(0, jitter)
+    _scheduler().add_job(
+        run_periodic_scan,
+        "date",
+        run_date=datetime.now(timezone.utc) + timedelta(seconds=delay),
+        args=[library_id],
+        id=f"{JOB_PREFIX}{library_id}",
+        replace_existing=True,
+        misfire_grace_time=300,
+    )
+
+
+def _last_fingerprint(library_id: int) -> str | None:
+    with SessionLocal() as db:
+        rows = (
+            db.query(LibraryScan.stats_json)
+            .filter(LibraryScan.library_id == library_id, LibraryScan.status == "succeeded")
+            .order_by(LibraryScan.id.desc())
+            .limit(5)
+            .all()
+        )
+    for (stats_json,) in rows:
+        try:
+            fp = json.loads(stats_json or "{}").get("dir_fingerprint")
+        except ValueError:
+            continue
+        if fp:
+            return fp
+    return None
+
+
+def run_periodic_scan(library_id: int) -> None:
+    from lhmm.services.scanner import dir_fingerprint, _lib_root
+    from lhmm.services.scan_scheduler import scan_scheduler
+    from lhmm.services import scan_control
+
+    with SessionLocal() as db:
+        li = db.get(Library, library_id)
+        sched = parse_schedule(li.settings_json) if li else None
+        if not li or not sched:
+            unschedule(library_id)
+            return
+        try:
+            root = _lib_root(db, library_id)
+        except RuntimeError as e:
+            lg.warning({"event": "periodic_scan.root.error", "library_id": library_id, "err": str(e)})
+            _schedule_next(library_id, sched.interval, sched.jitter)
+            return
+        disk_id = li.root_disk_id
+        if scan_control.paused(db, library_id):
+            # Paused (e.g. for peak hours) until resumed or cancelled by hand
+            with _state.lock:
+                interval = _state.interval.get(library_id, sched.interval)
+            _schedule_next(library_id, interval, sched.jitter)
+            return
+
+    with _state.lock:
+        interval = _state.interval.get(library_id, sched.interval)
+    prev = _last_fingerprint(library_id)
+
+    fp = dir_fingerprint(root)
+    changed = fp != prev
+    if changed:
+        queued = scan_scheduler.submit(library_id, disk_id, (0, 0), incremental=True, fingerprint=fp)
+        if queued:
+            interval = max(sched.min_interval, interval / 2)
+    else:
+        queued = False
+        interval = min(sched.max_interval, interval * 2)
+    with _state.lock:
+        _state.interval[library_id] = interval
+    lg.info({
+        "event": "periodic_scan.run",
+        "library_id": library_id,
+        "changed": changed,
+        "queued": queued,
+        "next_interval_min": round(interval, 1),
+    })
+    _schedule_next(library_id, interval, sched.jitter)
+
+
+def sync_library(library_id: int, settings_json: str | None) -> None:
+    """(Re)register or remove a library's periodic job after its settings change."""
+    sched = parse_schedule(settings_json)
+    if not sched:
+        unschedule(library_id)
+        return
+    with _state.lock:
+        _state.interval[library_id] = sched.interval
+    # First run lands anywhere in the first interval so libraries do not fire together
+    _schedule_next(library_id, random.uniform(0, sched.interval), sched.jitter)
+
+
+def request_sync(library_id: int, settings_json: str | None, db: Session | None = None) -> None:
+    """sync_library() on the leader, which owns the scheduler; None settings unschedules.
+
+    The settings travel with the request so the leader does not depend on the
+    caller's transaction having committed yet. Pass the caller's session as ``db``
+    when it has written (see leader.forward).
+    """
+    if leader.is_leader():
+        sync_library(library_id, settings_json)
+        return
+    leader.forward(SYNC_REQUEST, {"library_id": library_id, "settings_json": settings_json}, db=db)
+
+
+def handle_sync_request(payload: dict) -> None:
+    sync_library(payload["library_id"], payload.get("settings_json"))
+
+
+def unschedule(library_id: int) -> None:
+    with _state.lock:
+        _state.interval.pop(library_id, None)
+    try:
+        _scheduler().remove_job(f"{JOB_PREFIX}{library_id}")
+    except Exception:
+        pass
+
+
+def register_periodic_scans() -> int:
+    with SessionLocal() as db:
+        libs = db.query(Library.id, Library.settings_json).all()
+    n = 0
+    for lid, sj in libs:
+        if parse_schedule(sj):
+            sync_library(lid, sj)
+            n += 1
+    lg.info({"event": "periodic_scan.register", "libraries": n})
+    return n
@@ -0,0 +1,157 @@
+from __future__ import annotations
+import logging
+from dataclasses import dataclass
+from sqlalchemy import select, func, case, distinct
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import LibraryStats, MediaFile, MediaItem, LibraryScan, Library, now_ts
+
+lg = logging.getLogger("lhmm.rollups")
+
+# library_stats is updated incrementally: write paths accumulate a RollupDelta and
+# apply it with a single UPSERT per commit. Inserts add, rematches subtract the old
+# file and add the new one, and a full scan subtracts the files it prunes because
+# they are gone from disk. recompute() rebuilds rows from the base tables to repair
+# any drift (run by the scheduler and POST /libraries/stats/recompute).
+#
+# series_count is a distinct count, so it cannot be added up. A delta that linked
+# or dropped an episode file marks it stale and apply_delta() counts it again.
+# Full scans set defer_series instead of paying that count at every batch commit;
+# finish_scan() counts once at the end.
+
+
+@dataclass
+class RollupDelta:
+    files: int = 0
+    movies: int = 0
+    episodes: int = 0
+    total_bytes: int = 0
+    series: bool = False  # series_count is stale
+    defer_series: bool = False
+
+    def add_file(self, kind: str, size: int, sign: int = 1) -> None:
+        self.files += sign
+        self.total_bytes += sign * size
+        if kind == "movie":
+            self.movies += sign
+        elif kind == "episode":
+            self.episodes += sign
+            self.series = not self.defer_series
+
+    def __bool__(self) -> bool:
+        return bool(self.files or self.movies or self.episodes or self.total_bytes or self.series)
+
+
+def apply_delta(db: Session, library_id: int, d: RollupDelta) -> None:
+    if not d:
+        return
+    if d.series:
+        db.flush()  # the count must see the delta's own file rows (autoflush is off)
+    stmt = insert(LibraryStats).values(
+        library_id=library_id,
+        files=d.files,
+        movies=d.movies,
+        episodes=d.episodes,
+        total_bytes=d.total_bytes,
+        series_count=_series_count(db, library_id) if d.series else 0,
+        updated_at=now_ts(),
+    )
+    ex = stmt.excluded
+    set_ = {
+        "files": LibraryStats.files + ex.files,
+        "movies": LibraryStats.movies + ex.movies,
+        "episodes": LibraryStats.episodes + ex.episodes,
+        "total_bytes": LibraryStats.total_bytes + ex.total_bytes,
+        "updated_at": ex.updated_at,
+    }
+    if d.series:
+        set_["series_count"] = ex.series_count
+    db.execute(stmt.on_conflict_do_update(index_elements=[LibraryStats.library_id], set_=set_))
+    d.files = d.movies = d.episodes = d.total_bytes = 0
+    d.series = False
+
+
+def _series_count(db: Session, library_id: int) -> int:
+    return db.scalar(
+        select(func.count(distinct(MediaItem.series_id)))
+        .select_from(MediaFile)
+        .join(MediaItem, MediaFile.item_id == MediaItem.id)
+        .where(MediaFile.library_id == library_id, MediaItem.series_id.is_not(None))
+    ) or 0
+
+
+def finish_scan(db: Session, library_id: int, finished_at: int, status: str) -> None:
+    """Record scan time/status and refresh the series count (a distinct count is not additive)."""
+    stmt = insert(LibraryStats).values(
+        library_id=library_id,
+        series_count=_series_count(db, library_id),
+        last_scan_at=finished_at,
+        last_scan_status=status,
+        updated_at=now_ts(),
+    )
+    ex = stmt.excluded
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[LibraryStats.library_id],
+        set_={
+            "series_count": ex.series_count,
+            "last_scan_at": ex.last_scan_at,
+            "last_scan_status": ex.last_scan_status,
+            "updated_at": ex.updated_at,
+        },
+    ))
+
+
+def recompute(db: Session, library_id: int | None = None) -> int:
+    """Rebuild rollups from media_files/media_items/library_scans. Returns rows written."""
+    agg = (
+        select(
+            MediaFile.library_id,
+            func.count(MediaFile.id),
+            func.sum(case((MediaItem.kind == "movie", 1), else_=0)),
+            func.sum(case((MediaItem.kind == "episode", 1), else_=0)),
+            func.coalesce(func.sum(MediaFile.size), 0),
+            func.count(distinct(MediaItem.series_id)),
+        )
+        .join(MediaItem, MediaFile.item_id == MediaItem.id)
+        .group_by(MediaFile.library_id)
+    )
+    lib_ids = select(Library.id)
+    if library_id is not None:
+        agg = agg.where(MediaFile.library_id == library_id)
+        lib_ids = lib_ids.where(Library.id == library_id)
+    counts = {r[0]: r[1:] for r in db.execute(agg)}
+    last = {}
+    for lid, fin, status in db.execute(
+        select(LibraryScan.library_id, LibraryScan.finished_at, LibraryScan.status)
+        .where(LibraryScan.id.in_(
+            select(func.max(LibraryScan.id)).where(LibraryScan.finished_at.is_not(None)).group_by(LibraryScan.library_id)
+        ))
+    ):
+        last[lid] = (fin, status)
+    n = 0
+    now = now_ts()
+    for lid in db.execute(lib_ids).scalars():
+        files, movies, episodes, total_bytes, series = counts.get(lid, (0, 0, 0, 0, 0))
+        fin, status = last.get(lid, (None, None))
+        row = dict(
+            files=files, movies=movies or 0, episodes=episodes or 0, total_bytes=total_bytes or 0,
+            series_count=series, last_scan_at=fin, last_scan_status=status, updated_at=now,
+        )
+        stmt = insert(LibraryStats).values(library_id=lid, **row)
+        db.execute(stmt.on_conflict_do_update(index_elements=[LibraryStats.library_id], set_=row))
+        n += 1
+    return n
+
+
+def recompute_job() -> None:
+    db = SessionLocal()
+    try:
+        n = recompute(db)
+        db.commit()
+        lg.info({"event": "rollups.recompute", "libraries": n})
+    except Exception as e:
+        db.rollback()
+        lg.error({"event": "rollups.recompute.error", "err": str(e)})
+    finally:
+        db.close()
@@ -0,0 +1,185 @@
+from __future__ import annotations
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from sqlalchemy import select, update
+from sqlalchemy.dialects.sqlite import insert
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import IndexerRssState, WantedItem, ReleaseMatch
+from lhmm.services.indexers import IndexerDef, FeedParser, _http, load_indexers
+from lhmm.settings import settings
+
+lg = logging.getLogger("lhmm.rss")
+
+# Periodic RSS polling of every indexer. Feeds are newest-first, so the body is
+# streamed through FeedParser and reading stops at the first item at or behind the
+# stored watermark (last GUID, or a pubDate older than the last one seen); the
+# connection is dropped without downloading or parsing the rest. New items are
+# matched against an in-memory index of wanted items keyed by normalised title
+# (+ year for movies, + SxxEyy for episodes), so matching costs a regex and a few
+# dict lookups per item. Indexers are polled concurrently, at most
+# settings.rss.max_concurrent at a time.
+
+_NORM_JUNK = re.compile(r"[^a-z0-9]+")
+_EPISODE = re.compile(r"[ ._\-\[(]S(\d{1,2})[ ._-]?E(\d{1,3})(?![0-9])", re.IGNORECASE)
+_YEAR = re.compile(r"[ ._\-\[(]((?:19|20)\d{2})(?=[ ._\-\])]|$)")
+
+
+def norm_title(t: str) -> str:
+    t = t.lower().replace("&", " and ").replace("'", "")
+    return _NORM_JUNK.sub(" ", t).strip()
+
+
+def release_keys(title: str) -> list[tuple]:
+    """Candidate index keys for a release name, most specific first."""
+    m = _EPISODE.search(title)
+    if m:
+        return [("e", norm_title(title[:m.start()]), int(m.group(1)), int(m.group(2)))]
+    keys = []
+    # Titles can contain a year-like number ("Blade Runner 2049 2017"): try every split
+    for m in _YEAR.finditer(title):
+        head = norm_title(title[:m.start()])
+        if head:
+            keys.append(("m", head, int(m.group(1))))
+            keys.append(("m", head, None))
+    return keys
+
+
+@dataclass
+class WantedIndex:
+    keys: dict[tuple, list[int]]
+
+    @classmethod
+    def build(cls) -> "WantedIndex":
+        keys: dict[tuple, list[int]] = {}
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(WantedItem.id, WantedItem.kind, WantedItem.title, WantedItem.year,
+                       WantedItem.season, WantedItem.episode)
+                .where(WantedItem.status == "wanted")
+            ).all()
+        for wid, kind, title, year, season, episode in rows:
+            if kind == "episode":
+                if season is None or episode is None:
+                    continue
+                k = ("e", norm_title(title), season, episode)
+            else:
+                k = ("m", norm_title(title), year)
+            keys.setdefault(k, []).append(wid)
+        return cls(keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def match(self, title: str) -> list[int]:
+        for k in release_keys(title):
+            ids = self.keys.get(k)
+            if ids:
+                return ids
+        return []
+
+
+def _state(name: str) -> tuple[str | None, int | None]:
+    with SessionLocal() as db:
+        st = db.get(IndexerRssState, name)
+        return (st.last_guid, st.last_pub_ts) if st else (None, None)
+
+
+def _rss_params(ix: IndexerDef) -> dict:
+    params: dict = {"t": "search", "apikey": ix.api_key, "o": "xml"}
+    max_limit = (ix.caps.get("limits") or {}).get("max")
+    params["limit"] = int(max_limit) if max_limit else 100
+    if ix.caps.get("rss_cat"):
+        params["cat"] = ix.caps["rss_cat"]
+    return params
+
+
+async def read_new_items(ix: IndexerDef, last_guid: str | None, last_pub_ts: int | None) -> list[dict]:
+    """Stream the feed and return items newer than the watermark (newest first)."""
+    url = ix.url.rstrip("/")
+    if not url.endswith("/api"):
+        url += "/api"
+    parser = FeedParser()
+    out: list[dict] = []
+    async with _http().stream("GET", url, params=_rss_params(ix), timeout=ix.timeout) as r:
+        r.raise_for_status()
+        async for chunk in r.aiter_bytes():
+            for it in parser.feed(chunk):
+                if (last_guid and it["guid"] == last_guid) or (
+                    last_pub_ts and it["pub_ts"] and it["pub_ts"] < last_pub_ts
+                ):
+                    return out  # leaving the context closes the connection mid-body
+                out.append(it)
+    out.extend(it for it in parser.close() if not (last_guid and it["guid"] == last_guid))
+    return out
+
+
+def _store(name: str, items: list[dict], matches: list[dict], error: str | None) -> None:
+    now = int(time.time())
+    with SessionLocal() as db:
+        if matches:
+            db.execute(insert(ReleaseMatch).values(matches).on_conflict_do_nothing())
+            db.execute(
+                update(WantedItem)
+                .where(WantedItem.id.in_({m["wanted_id"] for m in matches}), WantedItem.status == "wanted")
+                .values(status="found")
+            )
+        values = {"polled_at": now, "new_items": len(items), "last_error": error}
+        if items:
+            values["last_guid"] = items[0]["guid"]
+            values["last_pub_ts"] = max((it["pub_ts"] or 0) for it in items) or None
+        stmt = insert(IndexerRssState).values(name=name, **values)
+        db.execute(stmt.on_conflict_do_update(index_elements=[IndexerRssState.name], set_=values))
+        db.commit()
+
+
+async def poll_indexer(ix: IndexerDef, index: WantedIndex, sem: asyncio.Semaphore) -> dict:
+    async with sem:
+        t0 = time.perf_counter()
+        last_guid, last_pub_ts = await asyncio.to_thread(_state, ix.name)
+        items: list[dict] = []
+        error = None
+        try:
+            items = await read_new_items(ix, last_guid, last_pub_ts)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            lg.warning({"event": "rss.poll.error", "indexer": ix.name, "err": error})
+        now = int(time.time())
+        matches = [
+            {"wanted_id": wid, "indexer": ix.name, "guid": it["guid"], "title": it["title"][:512],
+             "link": it["link"], "size": it["size"], "pub_ts": it["pub_ts"], "found_at": now}
+            for it in items if it["guid"]
+            for wid in index.match(it["title"])
+        ]
+        await asyncio.to_thread(_store, ix.name, items, matches, error)
+        return {
+            "indexer": ix.name,
+            "new_items": len(items),
+            "matches": len(matches),
+            "error": error,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+        }
+
+
+async def sync_rss(indexers: list[IndexerDef] | None = None) -> dict:
+    indexers = load_indexers() if indexers is None else indexers
+    index = await asyncio.to_thread(WantedIndex.build)
+    sem = asyncio.Semaphore(max(1, settings.rss.max_concurrent))
+    results = await asyncio.gather(*(poll_indexer(ix, index, sem) for ix in indexers))
+    out = {
+        "indexers": results,
+        "wanted_keys": len(index),
+        "new_items": sum(r["new_items"] for r in results),
+        "matches": sum(r["matches"] for r in results),
+    }
+    lg.info({"event": "rss.sync", **{k: v for k, v in out.items() if k != "indexers"}})
+    return out
+
+
+async def sync_rss_job() -> None:
+    try:
+        await sync_rss()
+    except Exception as e:
+        lg.warning({"event": "rss.sync.error", "err": str(e)})
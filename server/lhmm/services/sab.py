@@ -1,5 +1,4 @@
 from __future__ import annotations
-import httpx
 
 class SabClient:
     def __init__(self, url: str, api_key: str, timeout=10.0):
@@ -8,6 +7,8 @@ class SabClient:
         self.timeout = timeout
 
     async def version(self):
+        import httpx
+
         params = {"mode":"version","output":"json","apikey":self.key}
         async with httpx.AsyncClient(timeout=self.timeout) as cx:
             r = await cx.get(f"{self.url}/api", params=params)
@@ -15,6 +16,8 @@ class SabClient:
             return r.json()
 
     async def queue(self):
+        import httpx
+
         params = {"mode":"queue","output":"json","apikey":self.key}
         async with httpx.AsyncClient(timeout=self.timeout) as cx:
             r = await cx.get(f"{self.url}/api", params=params)
@@ -22,6 +25,8 @@ class SabClient:
             return r.json()
 
     async def history(self, start=0, limit=50):
+        import httpx
+
         params = {"mode":"history","start":start,"limit":limit,"output":"json","apikey":self.key}
         async with httpx.AsyncClient(timeout=self.timeout) as cx:
             r = await cx.get(f"{self.url}/api", params=params)
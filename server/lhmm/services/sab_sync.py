@@ -0,0 +1,156 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import time
+from sqlalchemy import select, func
+from sqlalchemy.dialects.sqlite import insert
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import SabHistory
+from lhmm.services.config_service import load_config
+from lhmm.services.sab import SabClient
+from lhmm.settings import settings
+
+lg = logging.getLogger("lhmm.sab")
+
+# SAB history is pulled newest-first, one page at a time, and upserted into
+# sab_history. Paging stops at the first slot that is already stored in a final
+# state (Completed/Failed) at or below the watermark (newest stored completion
+# time), so a steady-state sync reads one page. Rows written by a sync share a
+# `seq` number; clients poll GET /system/sab/history/delta?since=<seq>.
+
+PAGE = 50
+FINAL = {"Completed", "Failed"}
+
+
+def _sab_creds() -> tuple[str, str]:
+    with SessionLocal() as db:
+        cfg = load_config(db)
+    return (cfg.get("sab_url") or "").strip(), (cfg.get("sab_api_key") or "").strip()
+
+
+def _row(slot: dict) -> dict:
+    return {
+        "nzo_id": str(slot.get("nzo_id")),
+        "name": str(slot.get("name") or slot.get("nzb_name") or "")[:512],
+        "category": slot.get("category"),
+        "status": str(slot.get("status") or "")[:32],
+        "completed": int(slot.get("completed") or 0),
+        "bytes": int(slot.get("bytes") or 0),
+        "storage": slot.get("storage"),
+        "fail_message": slot.get("fail_message") or None,
+        "raw_json": json.dumps(slot),
+    }
+
+
+def _watermark(db) -> tuple[str | None, int]:
+    row = db.execute(
+        select(SabHistory.nzo_id, SabHistory.completed)
+        .where(SabHistory.status.in_(FINAL))
+        .order_by(SabHistory.completed.desc())
+        .limit(1)
+    ).first()
+    return (row[0], row[1]) if row else (None, 0)
+
+
+def _store_page(slots: list[dict], seq: int, wm_completed: int, backfill: bool = False) -> tuple[int, bool]:
+    """Upsert the new/changed slots of one page; returns (rows written, reached_known).
+
+    With ``backfill`` (first sync into an empty table) finished rows are marked as
+    not to be imported: they predate lhmm and were placed by whatever ran before.
+    """
+    rows = [_row(s) for s in slots if s.get("nzo_id")]
+    if not rows:
+        return 0, True
+    now = int(time.time())
+    with SessionLocal() as db:
+        known = dict(db.execute(
+            select(SabHistory.nzo_id, SabHistory.status).where(SabHistory.nzo_id.in_([r["nzo_id"] for r in rows]))
+        ).all())
+        fresh = []
+        reached = False
+        for r in rows:
+            if known.get(r["nzo_id"]) == r["status"] and r["status"] in FINAL and r["completed"] <= wm_completed:
+                reached = True
+                break
+            if known.get(r["nzo_id"]) == r["status"] and r["status"] in FINAL:
+                continue
+            row = {**r, "seq": seq, "synced_at": now, "import_status": None}
+            if backfill and r["status"] in FINAL:
+                row["import_status"] = "skipped"
+            fresh.append(row)
+        if fresh:
+            stmt = insert(SabHistory).values(fresh)
+            ex = stmt.excluded
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[SabHistory.nzo_id],
+                set_={c: getattr(ex, c) for c in (
+                    "name", "category", "status", "completed", "bytes", "storage",
+                    "fail_message", "raw_json", "seq", "synced_at",
+                )},
+            ))
+            db.commit()
+    return len(fresh), reached
+
+
+async def sync_history(max_pages: int = 200) -> dict:
+    url, key = _sab_creds()
+    if not url or not key:
+        return {"ok": False, "reason": "sab not configured"}
+    with SessionLocal() as db:
+        seq = (db.scalar(select(func.max(SabHistory.seq))) or 0) + 1
+        wm_nzo, wm_completed = _watermark(db)
+        backfill = wm_nzo is None and not db.scalar(select(func.count()).select_from(SabHistory))
+    client = SabClient(url, key)
+    written = 0
+    pages = 0
+    start = 0
+    while pages < max_pages:
+        data = await client.history(start, PAGE)
+        slots = (data.get("history") or {}).get("slots") or []
+        pages += 1
+        n, reached = await asyncio.to_thread(_store_page, slots, seq, wm_completed, backfill)
+        written += n
+        if reached or len(slots) < PAGE:
+            break
+        start += PAGE
+    if written:
+        lg.info({"event": "sab.history.sync", "written": written, "pages": pages, "seq": seq})
+    return {"ok": True, "written": written, "pages": pages, "seq": seq if written else seq - 1}
+
+
+async def sync_history_job() -> None:
+    from lhmm.services.importer import run_imports
+
+    try:
+        await sync_history()
+    except Exception as e:
+        lg.warning({"event": "sab.history.sync.error", "err": str(e)})
+    if settings.sabnzbd.import_enabled:
+        try:
+            await run_imports()
+        except Exception as e:
+            lg.warning({"event": "import.error", "err": str(e)})
+
+
+class _QueueCache:
+    """Short-TTL cache for SAB's queue; concurrent callers share a single fetch."""
+
+    def __init__(self) -> None:
+        self._data: dict | None = None
+        self._at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self, url: str, key: str) -> dict:
+        ttl = settings.sabnzbd.queue_cache_seconds
+        if self._data is not None and time.monotonic() - self._at < ttl:
+            return self._data
+        async with self._lock:
+            if self._data is not None and time.monotonic() - self._at < ttl:
+                return self._data
+            self._data = await SabClient(url, key).queue()
+            self._at = time.monotonic()
+            return self._data
+
+
+queue_cache = _QueueCache()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+import logging
+import threading
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import Library, LibraryScan
+
+lg = logging.getLogger("lhmm.scan_control")
+
+# Cooperative cancel / pause / resume for library scans.
+#
+# A request flips the library's LibraryScan row (any worker can) and sets the
+# in-process ScanControl token when the scan runs in this process. The scanner
+# checks the token between files and re-reads its row at every batch commit, so
+# a request made on another worker is picked up within one batch. It always stops
+# on a commit boundary:
+#
+#   running -> pausing    -> paused      stats_json keeps "checkpoint", the last committed path
+#   running -> cancelling -> cancelled
+#   paused  -> cancelled                 (cancel, or a new scan of the library supersedes it)
+#   paused  -> running                   (resume: the same row, walking on after the checkpoint)
+#
+# The walk order is sorted (scanner._walk_video_files), so a checkpoint path is
+# enough for a resumed scan to skip every file and directory before it.
+#
+# The scan holds the SQLite write lock for a whole batch, TMDB lookups included,
+# so the row update from another worker can outlast the busy timeout. request()
+# then raises Busy rather than queueing the write elsewhere (any queue would need
+# the same lock); the API answers 503 with BUSY_RETRY_AFTER.
+
+ACTIVE = ("running", "pausing", "cancelling")
+_REQUESTED = {"pausing": "pause", "cancelling": "cancel"}
+BUSY_RETRY_AFTER = 5  # seconds
+
+
+class Busy(Exception):
+    """The scan row stayed write-locked past the busy timeout; retry the request."""
+
+
+class ScanControl:
+    """Token for one running scan; `requested` is None, "pause" or "cancel"."""
+
+    def __init__(self, scan_id: int):
+        self.scan_id = scan_id
+        self.requested: str | None = None
+
+    def request(self, action: str) -> None:
+        # cancel wins over a pending pause
+        if self.requested != "cancel":
+            self.requested = action
+
+    def sync(self, db: Session) -> str | None:
+        """Pick up a request written to the scan row by another worker."""
+        status = db.scalar(select(LibraryScan.status).where(LibraryScan.id == self.scan_id))
+        if status in _REQUESTED:
+            self.request(_REQUESTED[status])
+        return self.requested
+
+
+_controls: dict[int, ScanControl] = {}  # library_id -> token of the scan running here
+_lock = threading.Lock()
+
+
+def register(library_id: int, scan_id: int) -> ScanControl:
+    with _lock:
+        ctl = _controls[library_id] = ScanControl(scan_id)
+    return ctl
+
+
+def unregister(library_id: int, ctl: ScanControl) -> None:
+    with _lock:
+        if _controls.get(library_id) is ctl:
+            del _controls[library_id]
+
+
+def _latest(db: Session, library_id: int) -> LibraryScan | None:
+    return db.scalars(
+        select(LibraryScan)
+        .where(LibraryScan.library_id == library_id, LibraryScan.status.in_(ACTIVE + ("paused",)))
+        .order_by(LibraryScan.id.desc())
+        .limit(1)
+    ).first()
+
+
+def request(library_id: int, action: str) -> dict | None:
+    """Ask the library's scan to "pause" or "cancel"; None when it has no running or paused scan.
+
+    Cancel also drops a scan still waiting in this process's scheduler queue.
+    Raises Busy when the row could not be written in time.
+    """
+    from lhmm.services.scan_scheduler import scan_scheduler
+
+    with SessionLocal() as db:
+        scan = _latest(db, library_id)
+        if scan is None:
+            if action == "cancel" and scan_scheduler.discard(library_id):
+                return {"scan_id": None, "status": "dequeued"}
+            return None
+        scan_id = scan.id
+    # Token first: a scan running here stops at the next file and commits, which
+    # also releases the write lock the updates below wait for.
+    with _lock:
+        ctl = _controls.get(library_id)
+    if ctl is not None and ctl.scan_id == scan_id:
+        ctl.request(action)
+    # Conditional updates: never overwrite a status the scan has already finished with
+    try:
+        with SessionLocal() as db:
+            this = LibraryScan.id == scan_id
+            if action == "cancel":
+                db.execute(update(LibraryScan).where(this, LibraryScan.status == "paused").values(status="cancelled"))
+                db.execute(update(LibraryScan).where(this, LibraryScan.status.in_(("running", "pausing")))
+                           .values(status="cancelling"))
+            else:
+                db.execute(update(LibraryScan).where(this, LibraryScan.status == "running").values(status="pausing"))
+            db.commit()
+            out = {"scan_id": scan_id, "status": db.scalar(select(LibraryScan.status).where(this))}
+    except OperationalError as e:
+        lg.warning({"event": f"scan.{action}.busy", "library_id": library_id, "scan_id": scan_id, "err": str(e)})
+        raise Busy(scan_id) from e
+    lg.info({"event": f"scan.{action}", "library_id": library_id, **out})
+    return out
+
+
+def resume(library_id: int) -> dict | None:
+    """Queue the library's paused scan to continue after its checkpoint; None if none is paused."""
+    from lhmm.services.scan_scheduler import request_scan
+
+    with SessionLocal() as db:
+        scan = _latest(db, library_id)
+        if scan is None or scan.status != "paused":
+            return None
+        disk_id = db.scalar(select(Library.root_disk_id).where(Library.id == library_id))
+        scan_id = scan.id
+    return {"scan_id": scan_id, **request_scan(library_id, disk_id, resume=scan_id)}
+
+
+def paused(db: Session, library_id: int) -> bool:
+    scan = _latest(db, library_id)
+    return scan is not None and scan.status == "paused"
@@ -0,0 +1,69 @@
+from __future__ import annotations
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+# In-process pub/sub for scan progress. The scanner runs in a worker thread and
+# publishes snapshots; each SSE viewer owns a small asyncio.Queue on the event
+# loop. Viewers never touch the DB, so N viewers cost N queue puts per event.
+
+QUEUE_SIZE = 64
+
+
+class ScanEventBus:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subs: dict[int, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._last: dict[int, dict] = {}
+        self._seq = 0
+
+    def publish(self, library_id: int, event: dict) -> None:
+        with self._lock:
+            self._seq += 1
+            event = {**event, "seq": self._seq}
+            self._last[library_id] = event
+            subs = list(self._subs.get(library_id, ()))
+        for loop, q in subs:
+            try:
+                loop.call_soon_threadsafe(_offer, q, event)
+            except RuntimeError:
+                # loop already closed; the viewer's unsubscribe will clean up
+                pass
+
+    def last(self, library_id: int) -> dict | None:
+        with self._lock:
+            return self._last.get(library_id)
+
+    @contextmanager
+    def subscribe(self, library_id: int) -> Iterator[asyncio.Queue]:
+        """Must be entered from the event loop that will read the queue."""
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            self._subs.setdefault(library_id, set()).add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                subs = self._subs.get(library_id)
+                if subs is not None:
+                    subs.discard(entry)
+                    if not subs:
+                        del self._subs[library_id]
+
+    def subscriber_count(self, library_id: int) -> int:
+        with self._lock:
+            return len(self._subs.get(library_id, ()))
+
+
+def _offer(q: asyncio.Queue, event: dict) -> None:
+    # Events are full snapshots, so a slow viewer can safely skip stale ones
+    if q.full():
+        try:
+            q.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    q.put_nowait(event)
+
+
+bus = ScanEventBus()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import ScanProgress, now_ts
+from lhmm.services import leader
+from lhmm.services.scan_events import bus
+
+lg = logging.getLogger("lhmm.scan_progress")
+
+# Scan progress for SSE viewers on every worker. Scans run only on the leader,
+# whose scanner feeds the in-process scan_events bus directly. It also upserts its
+# latest snapshot into scan_progress (one row per library) on every batch commit
+# and when the scan ends, so the row costs no extra write transaction while the
+# scan holds the write lock.
+#
+# On a non-leader, the first SSE viewer of a library starts one poller task that
+# reads the row every POLL_SECONDS and republishes new snapshots on the local bus.
+# N viewers still cost one primary-key read per poll, and the SSE endpoint reads
+# the bus the same way on every worker.
+
+POLL_SECONDS = 1.0
+
+_pollers: dict[int, asyncio.Task] = {}  # library_id -> poller (touched only on the event loop)
+
+
+def store(db: Session, scan_id: int, event: dict) -> None:
+    """Upsert the library's snapshot in the caller's transaction (committed with it)."""
+    row = {"scan_id": scan_id, "event_json": json.dumps(event), "updated_at": now_ts()}
+    stmt = insert(ScanProgress).values(library_id=event["library_id"], **row)
+    db.execute(stmt.on_conflict_do_update(index_elements=[ScanProgress.library_id], set_=row))
+
+
+def latest(library_id: int) -> dict | None:
+    with SessionLocal() as db:
+        raw = db.scalar(select(ScanProgress.event_json).where(ScanProgress.library_id == library_id))
+    return json.loads(raw) if raw else None
+
+
+def follow(library_id: int) -> None:
+    """Mirror the library's stored snapshots onto the local bus while it has viewers.
+
+    Call from the event loop after subscribing; a no-op on the leader, whose scans
+    publish to the bus themselves.
+    """
+    if leader.is_leader() or library_id in _pollers:
+        return
+    _pollers[library_id] = asyncio.get_running_loop().create_task(_poll(library_id))
+
+
+def _same(last: dict | None, event: dict) -> bool:
+    # The bus adds its own "seq"; snapshots are otherwise compared as a whole
+    return last is not None and {k: v for k, v in last.items() if k != "seq"} == event
+
+
+async def _poll(library_id: int) -> None:
+    try:
+        while bus.subscriber_count(library_id) and not leader.is_leader():
+            try:
+                event = await asyncio.to_thread(latest, library_id)
+            except Exception as e:
+                lg.warning({"event": "scan_progress.poll.error", "library_id": library_id, "err": str(e)})
+                event = None
+            if event is not None and not _same(bus.last(library_id), event):
+                bus.publish(library_id, event)
+            await asyncio.sleep(POLL_SECONDS)
+    finally:
+        _pollers.pop(library_id, None)
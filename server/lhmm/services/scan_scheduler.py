@@ -0,0 +1,208 @@
+from __future__ import annotations
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import Library, LibraryScan, LibraryStats
+from lhmm.settings import settings
+from lhmm.services import leader
+
+lg = logging.getLogger("lhmm.scan_scheduler")
+
+# Coordinates scans across libraries: at most `per_disk` walkers run on any one
+# Disk (so two libraries on the same spindle do not thrash it), while libraries on
+# different disks proceed in parallel up to `max_workers`. Pending scans are picked
+# by priority across all disks: recently changed libraries first, then smaller ones.
+# A scan is handed to the pool only when a worker is free for it, so everything
+# still queued can be reordered by a later submit or dropped by discard().
+#
+# Scans only run in the leader process (lhmm.services.leader); request_scan() and
+# request_scans() forward to it from any other worker.
+
+SCAN_REQUEST = "scan.request"
+
+
+@dataclass(order=True)
+class _Pending:
+    priority: tuple
+    seq: int
+    library_id: int = field(compare=False)
+    disk_id: int = field(compare=False)
+    kwargs: dict = field(compare=False, default_factory=dict)
+
+
+class ScanScheduler:
+    def __init__(self, per_disk: int = 1, max_workers: int = 4):
+        self.per_disk = max(1, per_disk)
+        self.max_workers = max(1, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="lhmm-scan")
+        self._lock = threading.Lock()
+        self._pending: dict[int, list[_Pending]] = {}  # disk_id -> heap
+        self._active: dict[int, int] = {}  # disk_id -> running walkers
+        self._queued: set[int] = set()  # library ids queued or running
+        self._running: set[int] = set()
+        self._seq = itertools.count()
+
+    def submit(self, library_id: int, disk_id: int, priority: tuple = (0,), **kwargs) -> bool:
+        """Queue a scan; returns False if the library is already queued or running."""
+        with self._lock:
+            if library_id in self._queued:
+                return False
+            self._queued.add(library_id)
+            heapq.heappush(
+                self._pending.setdefault(disk_id, []),
+                _Pending(priority, next(self._seq), library_id, disk_id, kwargs),
+            )
+            self._dispatch_locked()
+        return True
+
+    def discard(self, library_id: int) -> bool:
+        """Drop a queued (not yet running) scan; False if it is running or not queued."""
+        with self._lock:
+            if library_id not in self._queued or library_id in self._running:
+                return False
+            for disk_id, heap in self._pending.items():
+                kept = [j for j in heap if j.library_id != library_id]
+                if len(kept) != len(heap):
+                    heapq.heapify(kept)
+                    self._pending[disk_id] = kept
+            self._queued.discard(library_id)
+        return True
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "per_disk": self.per_disk,
+                "max_workers": self.max_workers,
+                "running": sorted(self._running),
+                "queued": sorted(self._queued - self._running),
+                "active_per_disk": {k: v for k, v in self._active.items() if v},
+            }
+
+    def is_busy(self, library_id: int | None = None) -> bool:
+        with self._lock:
+            return bool(self._queued) if library_id is None else library_id in self._queued
+
+    def _dispatch_locked(self) -> None:
+        while len(self._running) < self.max_workers:
+            heads = [heap[0] for disk_id, heap in self._pending.items()
+                     if heap and self._active.get(disk_id, 0) < self.per_disk]
+            if not heads:
+                return
+            job = heapq.heappop(self._pending[min(heads).disk_id])
+            self._active[job.disk_id] = self._active.get(job.disk_id, 0) + 1
+            self._running.add(job.library_id)
+            self._pool.submit(self._run, job)
+
+    def _run(self, job: _Pending) -> None:
+        from lhmm.services.scanner import scan_library
+        from lhmm.services.db_maintenance import note_scan_finished
+
+        try:
+            scan_library(job.library_id, **job.kwargs)
+        except Exception as e:
+            lg.error({"event": "scan_scheduler.scan.error", "library_id": job.library_id, "err": str(e)})
+        finally:
+            note_scan_finished()
+            with self._lock:
+                self._active[job.disk_id] -= 1
+                self._running.discard(job.library_id)
+                self._queued.discard(job.library_id)
+                self._dispatch_locked()
+
+
+def library_priorities(db, library_ids: list[int] | None = None) -> dict[int, tuple[int, tuple]]:
+    """disk id and priority key per library: changed-last-time first, then fewest files.
+
+    Lower sorts first. Libraries never scanned get top priority (0 files, changed).
+    """
+    stmt = select(Library.id, Library.root_disk_id, LibraryStats.files).outerjoin(
+        LibraryStats, LibraryStats.library_id == Library.id
+    )
+    if library_ids is not None:
+        stmt = stmt.where(Library.id.in_(library_ids))
+    libs = db.execute(stmt).all()
+    last_stats: dict[int, str] = {}
+    ids = [r[0] for r in libs]
+    if ids:
+        latest = (
+            select(func.max(LibraryScan.id))
+            .where(LibraryScan.library_id.in_(ids), LibraryScan.status == "succeeded")
+            .group_by(LibraryScan.library_id)
+        )
+        for lid, stats_json in db.execute(
+            select(LibraryScan.library_id, LibraryScan.stats_json).where(LibraryScan.id.in_(latest))
+        ):
+            last_stats[lid] = stats_json
+    out = {}
+    for lid, disk_id, files in libs:
+        changed = True
+        if lid in last_stats:
+            try:
+                st = json.loads(last_stats[lid] or "{}")
+                changed = bool(st.get("changed", st.get("matched", 1)))
+            except ValueError:
+                pass
+        out[lid] = (disk_id, (0 if changed else 1, files or 0))
+    return out
+
+
+def enqueue_scans(library_ids: list[int] | None = None, **kwargs) -> dict:
+    """Queue scans for the given libraries (default: all) through the shared scheduler."""
+    with SessionLocal() as db:
+        prio = library_priorities(db, library_ids)
+    queued, skipped = [], []
+    for lid, (disk_id, key) in sorted(prio.items(), key=lambda kv: kv[1][1]):
+        (queued if scan_scheduler.submit(lid, disk_id, key, **kwargs) else skipped).append(lid)
+    lg.info({"event": "scan_scheduler.enqueue", "queued": queued, "already_queued": skipped, "at": int(time.time())})
+    return {"queued": queued, "already_queued": skipped}
+
+
+scan_scheduler = ScanScheduler(
+    per_disk=settings.scheduler.walkers_per_disk,
+    max_workers=settings.scheduler.max_concurrent_scans,
+)
+
+
+def request_scan(library_id: int, disk_id: int, *, db: Session | None = None, **kwargs) -> dict:
+    """Queue one library's scan (top priority) here if this process leads, else on the leader.
+
+    ``db`` is the caller's session for the forwarded request (see leader.forward).
+    """
+    if leader.is_leader():
+        queued = scan_scheduler.submit(library_id, disk_id, **kwargs)
+        return {"queued": queued, "already_queued": not queued}
+    job_id = leader.forward(SCAN_REQUEST, {"library_id": library_id, "disk_id": disk_id, "kwargs": kwargs},
+                            dedupe=True, db=db)
+    return {"queued": job_id is not None, "already_queued": job_id is None, "forwarded": job_id}
+
+
+def request_scans(library_ids: list[int] | None = None, *, db: Session | None = None, **kwargs) -> dict:
+    """enqueue_scans() here if this process leads, else on the leader."""
+    if leader.is_leader():
+        return enqueue_scans(library_ids, **kwargs)
+    job_id = leader.forward(SCAN_REQUEST, {"library_ids": library_ids, "kwargs": kwargs}, dedupe=True, db=db)
+    return {"queued": [], "already_queued": [], "forwarded": job_id}
+
+
+def handle_scan_request(payload: dict) -> None:
+    kwargs = payload.get("kwargs") or {}
+    if "library_id" in payload:
+        scan_scheduler.submit(payload["library_id"], payload["disk_id"], **kwargs)
+    else:
+        enqueue_scans(payload.get("library_ids"), **kwargs)
+
+
+def scan_status() -> dict:
+    return {
+        **scan_scheduler.status(),
+        "leader": leader.is_leader(),
+        "forwarded_pending": leader.pending_forwarded((SCAN_REQUEST,)),
+    }
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import heapq
+import random
+import time
+from contextlib import contextmanager
+from typing import Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Bounded memory regardless of library size: each stage keeps a fixed-size
+# reservoir sample for percentiles, and throughput points are downsampled.
+RESERVOIR_SIZE = 1024
+MAX_THROUGHPUT_POINTS = 120
+
+
+class _Stage:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: list[float] = []
+
+    def add(self, dt: float, rng: random.Random) -> None:
+        self.count += 1
+        self.total += dt
+        if dt > self.max:
+            self.max = dt
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(dt)
+        else:
+            j = rng.randrange(self.count)
+            if j < RESERVOIR_SIZE:
+                self.samples[j] = dt
+
+    def summary(self) -> dict:
+        s = sorted(self.samples)
+
+        def pct(p: float) -> float:
+            if not s:
+                return 0.0
+            return s[min(len(s) - 1, int(p * len(s)))]
+
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 1),
+            "p50_ms": round(pct(0.50) * 1000, 2),
+            "p95_ms": round(pct(0.95) * 1000, 2),
+            "p99_ms": round(pct(0.99) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class ScanTimings:
+    """Per-stage timing collector for a single scan (walk, guessit, tmdb, db)."""
+
+    def __init__(self, slowest_n: int = 10, sample_every: float = 5.0) -> None:
+        self.started = time.perf_counter()
+        self.slowest_n = slowest_n
+        self.sample_every = sample_every
+        self.files = 0
+        self._stages: dict[str, _Stage] = {}
+        self._slowest: list[tuple[float, str]] = []  # min-heap of (secs, path)
+        self._throughput: list[tuple[float, int]] = []
+        self._next_sample = sample_every
+        self._rng = random.Random(0)
+
+    def add(self, stage: str, dt: float) -> None:
+        st = self._stages.get(stage)
+        if st is None:
+            st = self._stages[stage] = _Stage()
+        st.add(dt, self._rng)
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def timed_iter(self, it: Iterator[T], stage: str) -> Iterator[T]:
+        # Attribute time spent producing each element (e.g. os.walk + stat) to a stage
+        it = iter(it)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                v = next(it)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - t0)
+                return
+            self.add(stage, time.perf_counter() - t0)
+            yield v
+
+    def file_done(self, path: str, dt: float) -> None:
+        self.files += 1
+        if len(self._slowest) < self.slowest_n:
+            heapq.heappush(self._slowest, (dt, path))
+        elif dt > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (dt, path))
+        elapsed = time.perf_counter() - self.started
+        if elapsed >= self._next_sample:
+            self._throughput.append((round(elapsed, 1), self.files))
+            self._next_sample = elapsed + self.sample_every
+            if len(self._throughput) > MAX_THROUGHPUT_POINTS:
+                # Halve resolution instead of growing without bound
+                self._throughput = self._throughput[1::2]
+                self.sample_every *= 2
+
+    def stage_totals(self) -> dict[str, float]:
+        return {k: v.total for k, v in self._stages.items()}
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "files_per_sec": round(self.files / elapsed, 2) if elapsed > 0 else 0.0,
+            "stages": {k: v.summary() for k, v in self._stages.items()},
+            "slowest": [
+                {"path": p, "ms": round(dt * 1000, 1)}
+                for dt, p in sorted(self._slowest, reverse=True)
+            ],
+            # [seconds since start, cumulative files]
+            "throughput": [list(p) for p in self._throughput] + [[round(elapsed, 1), self.files]],
+        }
@@ -3,22 +3,69 @@ import os
 import time
 import json
 import logging
+import cProfile
+import hashlib
+from collections import OrderedDict
 from typing import Iterator
-from guessit import guessit
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
+from lhmm.settings import CONFIG_DIR
 from lhmm.db.session import SessionLocal
 from lhmm.db.models import Library, Disk, Series, MediaItem, MediaFile, LibraryScan
+from lhmm.db.query_plans import hot_query
 from lhmm.services.tmdb_match import best_movie, best_tv
+from lhmm.services.circuit import CircuitOpen
+from lhmm.services.scan_timing import ScanTimings
+from lhmm.services.scan_events import bus
+from lhmm.services.rollups import RollupDelta, apply_delta, finish_scan
+from lhmm.services import unmatched, scan_control, scan_progress
 
 VIDEO_EXTS = {".mkv", ".mp4", ".avi", ".mov", ".m4v", ".ts", ".webm"}
 
+PROFILE_DIR = CONFIG_DIR / "cache" / "profiles"
+PROGRESS_EVERY = 0.5  # seconds between progress events
+COMMIT_EVERY = 50     # files per batch commit (also how often pause/cancel rows are re-read)
+SERIES_IDS_MAX = 4096  # tmdb_id -> series id entries kept per scan (LRU)
+PRUNE_PAGE = 1000     # file rows checked against the disk per query when pruning
+COUNT_KEYS = ("files", "movies", "episodes", "matched", "skipped", "new", "updated", "unchanged", "deferred", "pending")
+
 lg = logging.getLogger("lhmm.scanner")
 
 
-def _walk_video_files(root: str) -> Iterator[tuple[str, int, int]]:
-    for dp, _, fn in os.walk(root):
-        for f in fn:
+def guessit(name: str) -> dict:
+    # guessit (rebulk, babelfish) takes ~100ms to import and compiles its rule set
+    # on first call; load it on first use (or in lhmm.startup.warmup) instead of
+    # at import, so processes that never scan do not pay for it.
+    from guessit import guessit as _guessit
+
+    return _guessit(name)
+
+
+def walk_key(rel_path: str) -> tuple:
+    """Sort key matching _walk_video_files' order: a directory's files, then its subdirectories."""
+    parts = rel_path.split(os.sep)
+    return tuple((1, d) for d in parts[:-1]) + ((0, parts[-1]),)
+
+
+def _walk_video_files(root: str, after: str | None = None) -> Iterator[tuple[str, int, int]]:
+    """Video files under root in a stable order (names sorted, see walk_key).
+
+    With ``after`` (a relative path from an earlier walk, e.g. a paused scan's
+    checkpoint) every file up to and including it is skipped, and directories that
+    lie wholly before it are not entered.
+    """
+    after_key = walk_key(after) if after else None
+    for dp, dirs, fn in os.walk(root):
+        rel_dir = os.path.relpath(dp, root)
+        prefix = () if rel_dir == os.curdir else tuple((1, d) for d in rel_dir.split(os.sep))
+        dirs.sort()
+        if after_key is not None:
+            n = len(prefix) + 1
+            dirs[:] = [d for d in dirs if prefix + ((1, d),) >= after_key[:n]]
+        for f in sorted(fn):
             if os.path.splitext(f)[1].lower() in VIDEO_EXTS:
+                if after_key is not None and prefix + ((0, f),) <= after_key:
+                    continue
                 abs_path = os.path.join(dp, f)
                 try:
                     st = os.stat(abs_path)
@@ -36,6 +83,46 @@ def _ensure_series(db: Session, tmdb_id: int, name: str, year: int | None) -> Se
     return s
 
 
+@hot_query("media_items.match_movie", "movie", 603, None, None, None)
+@hot_query("media_items.match_episode", "episode", 1399, 12, 1, 3)
+def item_match_stmt(kind: str, tmdb_id: int, series_id: int | None, season: int | None, episode: int | None):
+    # IS (not =) so NULL dimensions match; served by uq_mediaitem_unique
+    return select(MediaItem).where(
+        MediaItem.kind == kind,
+        MediaItem.tmdb_id == tmdb_id,
+        MediaItem.series_id.is_(series_id),
+        MediaItem.season.is_(season),
+        MediaItem.episode.is_(episode),
+    )
+
+
+@hot_query("media_files.by_path", 1, "Some Movie (2001)/Some.Movie.2001.mkv")
+def file_by_path_stmt(library_id: int, rel_path: str, *cols):
+    """File row (or just `cols`) by its unique (library_id, rel_path)."""
+    return select(*(cols or (MediaFile,))).where(MediaFile.library_id == library_id, MediaFile.rel_path == rel_path)
+
+
+@hot_query("media_files.prune_page", 1, "", 1000, sorted=True)
+def files_page_stmt(library_id: int, after: str, limit: int):
+    """One page of a library's files in rel_path order (keyset on uq_file_unique_per_library)."""
+    return (
+        select(MediaFile.id, MediaFile.rel_path, MediaFile.size, MediaItem.kind)
+        .join(MediaItem, MediaItem.id == MediaFile.item_id)
+        .where(MediaFile.library_id == library_id, MediaFile.rel_path > after)
+        .order_by(MediaFile.rel_path)
+        .limit(limit)
+    )
+
+
+@hot_query("library_scans.last_succeeded", 1, sorted=True)
+def last_succeeded_scan_stmt(library_id: int):
+    return (
+        select(LibraryScan.stats_json)
+        .where(LibraryScan.library_id == library_id, LibraryScan.status == "succeeded")
+        .order_by(LibraryScan.id.desc())
+    )
+
+
 def _ensure_item(
     db: Session,
     kind: str,
@@ -45,15 +132,10 @@ def _ensure_item(
     series_id: int | None = None,
     season: int | None = None,
     episode: int | None = None,
+    poster_path: str | None = None,
+    backdrop_path: str | None = None,
 ) -> MediaItem:
-    q = db.query(MediaItem).filter(
-        MediaItem.kind == kind,
-        MediaItem.tmdb_id == tmdb_id,
-        MediaItem.series_id.is_(series_id if series_id is not None else None),
-        MediaItem.season.is_(season if season is not None else None),
-        MediaItem.episode.is_(episode if episode is not None else None),
-    )
-    item = q.one_or_none()
+    item = db.execute(item_match_stmt(kind, tmdb_id, series_id, season, episode)).scalar_one_or_none()
     if not item:
         item = MediaItem(
             kind=kind,
@@ -63,24 +145,99 @@ def _ensure_item(
             series_id=series_id,
             season=season,
             episode=episode,
+            poster_path=poster_path,
+            backdrop_path=backdrop_path,
         )
         db.add(item)
         db.flush()
+    elif (poster_path and not item.poster_path) or (backdrop_path and not item.backdrop_path):
+        item.poster_path = item.poster_path or poster_path
+        item.backdrop_path = item.backdrop_path or backdrop_path
     return item
 
 
-def _link_file(db: Session, library_id: int, item_id: int, rel_path: str, size: int, mtime: int) -> None:
-    mf = db.query(MediaFile).filter(
-        MediaFile.library_id == library_id,
-        MediaFile.rel_path == rel_path,
-    ).one_or_none()
+def _link_file(
+    db: Session,
+    library_id: int,
+    item_id: int,
+    rel_path: str,
+    size: int,
+    mtime: int,
+    kind: str | None = None,
+    delta: RollupDelta | None = None,
+) -> str:
+    """Insert or update the file row; returns "new", "updated" or "unchanged"."""
+    mf = db.execute(file_by_path_stmt(library_id, rel_path)).scalar_one_or_none()
     if not mf:
         mf = MediaFile(library_id=library_id, item_id=item_id, rel_path=rel_path, size=size, mtime=mtime, quality_json="{}")
         db.add(mf)
-    else:
-        mf.item_id = item_id
-        mf.size = size
-        mf.mtime = mtime
+        if delta is not None:
+            delta.add_file(kind, size)
+        return "new"
+    if mf.item_id == item_id and mf.size == size and mf.mtime == mtime:
+        return "unchanged"
+    if delta is not None:
+        old_kind = kind
+        if mf.item_id != item_id:
+            old = db.get(MediaItem, mf.item_id)
+            old_kind = old.kind if old else None
+        delta.add_file(old_kind, mf.size or 0, -1)
+        delta.add_file(kind, size)
+    mf.item_id = item_id
+    mf.size = size
+    mf.mtime = mtime
+    return "updated"
+
+
+def _is_unchanged(db: Session, library_id: int, rel_path: str, size: int, mtime: int) -> bool:
+    row = db.execute(file_by_path_stmt(library_id, rel_path, MediaFile.size, MediaFile.mtime)).one_or_none()
+    return row is not None and row.size == size and row.mtime == mtime
+
+
+def dir_fingerprint(root: str) -> str:
+    """Cheap change detector: hash of every directory's mtime under root.
+
+    Adding, removing or renaming a file bumps its parent directory's mtime, so this
+    only stats directories (never files) and is far cheaper than a scan. In-place
+    rewrites of an existing file are not detected.
+    """
+    h = hashlib.sha1()
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            st = os.stat(d)
+            with os.scandir(d) as it:
+                subdirs = sorted(e.path for e in it if e.is_dir(follow_symlinks=False))
+        except OSError:
+            continue
+        h.update(f"{os.path.relpath(d, root)}\0{st.st_mtime_ns}\n".encode("utf-8", "surrogateescape"))
+        stack.extend(reversed(subdirs))
+    return h.hexdigest()
+
+
+def _prune_missing(db: Session, library_id: int, root: str, delta: RollupDelta) -> int:
+    """Delete file rows whose file is gone from disk, subtracting them from the rollups.
+
+    Checks each stored path with a stat, a page at a time, instead of collecting
+    the walked paths, so memory stays flat and a resumed scan (which did not walk
+    the files before its checkpoint) prunes correctly.
+    """
+    n = 0
+    after = ""
+    while True:
+        page = db.execute(files_page_stmt(library_id, after, PRUNE_PAGE)).all()
+        if not page:
+            return n
+        gone = []
+        for fid, rel_path, size, kind in page:
+            if not os.path.isfile(os.path.join(root, rel_path)):
+                gone.append(fid)
+                delta.add_file(kind, size or 0, -1)
+        if gone:
+            db.execute(delete(MediaFile).where(MediaFile.id.in_(gone)))
+            n += len(gone)
+        after = page[-1].rel_path
 
 
 def _lib_root(db: Session, library_id: int) -> str:
@@ -93,82 +250,430 @@ def _lib_root(db: Session, library_id: int) -> str:
     return os.path.join(dk.mount_path, li.root_subdir)
 
 
-def scan_library(library_id: int) -> dict:
+def _expected_files(db: Session, library_id: int) -> int | None:
+    # File count of the last successful scan, used as the ETA denominator
+    last = db.scalar(last_succeeded_scan_stmt(library_id).limit(1))
+    try:
+        return int(json.loads(last or "{}").get("files") or 0) or None
+    except (ValueError, TypeError):
+        return None
+
+
+class _Progress:
+    """Throttled publisher of scan snapshots to the in-process event bus.
+
+    store() also writes the latest snapshot to scan_progress for viewers on other
+    workers; the scanner calls it on commit boundaries.
+    """
+
+    def __init__(self, library_id: int, scan_id: int, expected: int | None, timings: ScanTimings):
+        self.library_id = library_id
+        self.scan_id = scan_id
+        self.expected = expected
+        self.timings = timings
+        self._next = 0.0
+        self._prev_totals: dict[str, float] = {}
+        self._last: dict | None = None
+        self._stored: dict | None = None
+
+    def store(self, db: Session | None = None) -> None:
+        """Upsert the latest snapshot in db's transaction, or in its own when db is None."""
+        event = self._last
+        if event is None or event is self._stored:
+            return
+        if db is not None:
+            scan_progress.store(db, self.scan_id, event)
+        else:
+            with SessionLocal() as own:
+                scan_progress.store(own, self.scan_id, event)
+                own.commit()
+        self._stored = event
+
+    def publish(self, stats: dict, status: str = "running", force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now < self._next:
+            return
+        self._next = now + PROGRESS_EVERY
+        totals = self.timings.stage_totals()
+        # "Current" stage = where most of the time went since the previous event
+        deltas = {k: v - self._prev_totals.get(k, 0.0) for k, v in totals.items()}
+        self._prev_totals = totals
+        stage = None
+        if status == "running" and deltas and max(deltas.values()) > 0:
+            stage = max(deltas, key=deltas.get)
+        elapsed = now - self.timings.started
+        rate = stats["files"] / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if status == "running" and self.expected and rate > 0 and self.expected > stats["files"]:
+            eta = round((self.expected - stats["files"]) / rate, 1)
+        self._last = {
+            "library_id": self.library_id,
+            "scan_id": self.scan_id,
+            "status": status,
+            "stage": stage,
+            "files": stats["files"],
+            "matched": stats["matched"],
+            "skipped": stats["skipped"],
+            "pending": stats["pending"],
+            "movies": stats["movies"],
+            "episodes": stats["episodes"],
+            "expected_files": self.expected,
+            "files_per_sec": round(rate, 2),
+            "eta_s": eta,
+            "ts": int(time.time()),
+        }
+        bus.publish(self.library_id, self._last)
+
+
+class SeriesIds:
+    """Bounded LRU of tmdb_id -> (series id, year) for one scan.
+
+    Episodes of a show arrive together, so this saves the Series query per file
+    without keeping Series objects (or an unbounded map) alive across batches.
+    """
+
+    def __init__(self, maxsize: int = SERIES_IDS_MAX):
+        self.maxsize = maxsize
+        self._ids: OrderedDict[int, tuple[int, int | None]] = OrderedDict()
+
+    def get(self, db: Session, tmdb_id: int, name: str, year: int | None) -> tuple[int, int | None]:
+        hit = self._ids.get(tmdb_id)
+        if hit is not None:
+            self._ids.move_to_end(tmdb_id)
+            return hit
+        s = _ensure_series(db, tmdb_id, name, year)
+        hit = self._ids[tmdb_id] = (s.id, s.year)
+        if len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)
+        return hit
+
+
+def _link_hit(
+    db: Session,
+    library_id: int,
+    rel_path: str,
+    size: int,
+    mtime: int,
+    kind: str,
+    hit: dict,
+    title: str | None,
+    year: int | None,
+    season: int | None,
+    episode: int | None,
+    delta: RollupDelta | None,
+    series_ids: SeriesIds | None = None,
+) -> str:
+    """Upsert the item (and series) for a TMDB hit and link the file to it; returns _link_file()'s result."""
+    if kind == "movie":
+        item = _ensure_item(
+            db,
+            kind="movie",
+            tmdb_id=int(hit.get("id")),
+            title=(hit.get("title") or title or "").strip(),
+            year=int((hit.get("release_date") or "0000")[:4] or 0) or (int(year) if year else None),
+            poster_path=hit.get("poster_path"),
+            backdrop_path=hit.get("backdrop_path"),
+        )
+    else:
+        series_id, series_year = (series_ids or SeriesIds(0)).get(
+            db,
+            tmdb_id=int(hit.get("id")),
+            name=(hit.get("name") or title or "").strip(),
+            year=int((hit.get("first_air_date") or "0000")[:4] or 0) or (int(year) if year else None),
+        )
+        item = _ensure_item(
+            db,
+            kind="episode",
+            tmdb_id=int(hit.get("id")),
+            title=(hit.get("name") or title or "").strip(),
+            year=series_year,
+            series_id=series_id,
+            season=int(season),
+            episode=int(episode),
+            poster_path=hit.get("poster_path"),
+            backdrop_path=hit.get("backdrop_path"),
+        )
+    return _link_file(db, library_id, item.id, rel_path, size, mtime, kind, delta)
+
+
+def _match_and_link(
+    db: Session,
+    library_id: int,
+    abs_path: str,
+    rel_path: str,
+    size: int,
+    mtime: int,
+    stats: dict,
+    timings: ScanTimings,
+    delta: RollupDelta,
+    known: unmatched.UnmatchedIndex | None = None,
+    series_ids: SeriesIds | None = None,
+) -> None:
+    """guessit + TMDB match for one file, then upsert its item and file rows.
+
+    Files that do not match are recorded in unmatched_files; with ``known`` (the
+    library's unmatched rows, loaded once per scan) those not yet due for a retry
+    are skipped before guessit/TMDB. When TMDB fails or its circuit is open the
+    file is queued as a pending match instead of failing.
+    """
+    if known is not None and known.deferred(rel_path, size, mtime):
+        stats["skipped"] += 1
+        stats["deferred"] += 1
+        return
+    with timings.stage("guessit"):
+        g = guessit(os.path.basename(abs_path))
+    title = g.get("title")
+    year = g.get("year")
+    kind = "movie" if g.get("type") == "movie" else "episode"
+    season = g.get("season")
+    episode = g.get("episode")
+    reason = None
+    with timings.stage("tmdb"):
+        if not title:
+            hit = None
+        else:
+            try:
+                hit = best_movie(title, year) if kind == "movie" else best_tv(title, year)
+            except Exception as e:
+                # Degraded mode: TMDB down or the circuit open (no request made).
+                # The walk goes on; resolve_pending() matches the file later.
+                hit, reason = None, unmatched.PENDING
+                if not isinstance(e, CircuitOpen):
+                    lg.warning({"event": "scan.tmdb.error", "path": rel_path, "err": str(e)})
+    if reason is None and not hit:
+        reason = "no_title" if not title else "no_match"
+    elif reason is None and kind == "episode" and (season is None or episode is None):
+        reason = "no_episode"
+    with timings.stage("db"):
+        if reason:
+            if db.execute(file_by_path_stmt(library_id, rel_path, MediaFile.id)).first():
+                # Linked before (e.g. assigned by hand from the unmatched queue): keep it
+                stats["unchanged"] += 1
+                return
+            unmatched.record(db, library_id, rel_path, size, mtime, g, reason)
+            stats["skipped"] += 1
+            if reason == unmatched.PENDING:
+                stats["pending"] += 1
+            return
+        stats[_link_hit(db, library_id, rel_path, size, mtime, kind, hit, title, year, season, episode, delta,
+                        series_ids)] += 1
+        if known is None or rel_path in known:
+            unmatched.clear(db, library_id, rel_path)
+    stats["movies" if kind == "movie" else "episodes"] += 1
+    stats["matched"] += 1
+
+
+def scan_library(
+    library_id: int,
+    profile: bool = False,
+    incremental: bool = False,
+    fingerprint: str | None = None,
+    resume: int | None = None,
+) -> dict:
+    """Walk a library root, match files against TMDB and link them.
+
+    Per-stage timings are stored under ``stats["timing"]``. With ``profile=True``
+    the whole scan runs under cProfile and the dump is written to PROFILE_DIR.
+    ``incremental=True`` skips files whose size and mtime match the stored row
+    (no guessit/TMDB). ``fingerprint`` is the dir_fingerprint() taken before the
+    walk; it is stored with the stats for the periodic scan job.
+
+    The scan stops early, on a commit boundary, when paused or cancelled through
+    lhmm.services.scan_control. ``resume`` is the id of a paused LibraryScan of
+    this library: its row, counters and options are reused and the walk continues
+    after its checkpoint. A new (non-resume) scan supersedes paused ones.
+    """
     db = SessionLocal()
-    scan = LibraryScan(library_id=library_id, status="running")
-    db.add(scan)
+    ckpt = None
+    if resume is not None:
+        scan = db.get(LibraryScan, resume)
+        if scan is None or scan.library_id != library_id or scan.status != "paused":
+            db.close()
+            raise ValueError(f"scan {resume} is not a paused scan of library {library_id}")
+        prev = json.loads(scan.stats_json or "{}")
+        ckpt = prev.get("checkpoint")
+        incremental = bool(prev.get("incremental"))
+        fingerprint = prev.get("dir_fingerprint")
+        scan.status = "running"
+        scan.finished_at = None
+        stats = {k: int(prev.get(k) or 0) for k in COUNT_KEYS}
+        stats["resumed"] = int(prev.get("resumed") or 0) + 1
+    else:
+        db.execute(
+            update(LibraryScan)
+            .where(LibraryScan.library_id == library_id, LibraryScan.status == "paused")
+            .values(status="cancelled")
+        )
+        scan = LibraryScan(library_id=library_id, status="running")
+        db.add(scan)
+        stats = dict.fromkeys(COUNT_KEYS, 0)
     db.flush()
-    stats = {"files": 0, "movies": 0, "episodes": 0, "matched": 0, "skipped": 0}
+    if incremental:
+        stats["incremental"] = True
+    if fingerprint:
+        stats["dir_fingerprint"] = fingerprint
+    timings = ScanTimings()
+    delta = RollupDelta(defer_series=True)  # finish_scan() recounts series
+    progress = _Progress(library_id, scan.id, _expected_files(db, library_id), timings)
+    progress.publish(stats, force=True)
+    progress.store(db)
+    # Committed up front so pause/cancel requests and SSE viewers on any worker
+    # can find the scan
+    db.commit()
+    known = unmatched.UnmatchedIndex(db, library_id)
+    series_ids = SeriesIds()
+    ctl = scan_control.register(library_id, scan.id)
+    stopped = None
+    last = ckpt
+    prof = cProfile.Profile() if profile else None
+    if prof:
+        prof.enable()
     try:
         root = _lib_root(db, library_id)
-        for abs_path, size, mtime in _walk_video_files(root):
+        for abs_path, size, mtime in timings.timed_iter(_walk_video_files(root, after=ckpt), "walk"):
+            if ctl.requested:
+                stopped = ctl.requested
+                break
+            t_file = time.perf_counter()
             stats["files"] += 1
-            rel_path = os.path.relpath(abs_path, root)
-            g = guessit(os.path.basename(abs_path))
-            try:
-                if g.get("type") == "movie":
-                    title = g.get("title")
-                    year = g.get("year")
-                    hit = best_movie(title, year) if title else None
-                    if not hit:
-                        stats["skipped"] += 1
-                        continue
-                    item = _ensure_item(
-                        db,
-                        kind="movie",
-                        tmdb_id=int(hit.get("id")),
-                        title=(hit.get("title") or title or "").strip(),
-                        year=int((hit.get("release_date") or "0000")[:4] or 0) or (int(year) if year else None),
-                    )
-                    _link_file(db, library_id, item.id, rel_path, size, mtime)
-                    stats["movies"] += 1
-                    stats["matched"] += 1
-                else:
-                    title = g.get("title")
-                    year = g.get("year")
-                    season = g.get("season")
-                    episode = g.get("episode")
-                    hit = best_tv(title, year) if title else None
-                    if not hit or season is None or episode is None:
-                        stats["skipped"] += 1
-                        continue
-                    s = _ensure_series(
-                        db,
-                        tmdb_id=int(hit.get("id")),
-                        name=(hit.get("name") or title or "").strip(),
-                        year=int((hit.get("first_air_date") or "0000")[:4] or 0) or (int(year) if year else None),
-                    )
-                    item = _ensure_item(
-                        db,
-                        kind="episode",
-                        tmdb_id=int(hit.get("id")),
-                        title=(hit.get("name") or title or "").strip(),
-                        year=s.year,
-                        series_id=s.id,
-                        season=int(season),
-                        episode=int(episode),
-                    )
-                    _link_file(db, library_id, item.id, rel_path, size, mtime)
-                    stats["episodes"] += 1
-                    stats["matched"] += 1
-            except Exception as e:
-                lg.warning({"event": "scan.file.error", "path": abs_path, "err": str(e)})
-            if stats["files"] % 50 == 0:
-                db.commit()
-        db.commit()
-        scan.status = "succeeded"
+            rel_path = last = os.path.relpath(abs_path, root)
+            same = False
+            if incremental:
+                with timings.stage("db"):
+                    same = _is_unchanged(db, library_id, rel_path, size, mtime)
+                if same:
+                    stats["unchanged"] += 1
+                    timings.file_done(rel_path, time.perf_counter() - t_file)
+                    progress.publish(stats)
+            if not same:
+                try:
+                    _match_and_link(db, library_id, abs_path, rel_path, size, mtime, stats, timings, delta, known,
+                                    series_ids)
+                except Exception as e:
+                    lg.warning({"event": "scan.file.error", "path": abs_path, "err": str(e)})
+                finally:
+                    timings.file_done(rel_path, time.perf_counter() - t_file)
+                    progress.publish(stats)
+            if stats["files"] % COMMIT_EVERY == 0:
+                with timings.stage("commit"):
+                    apply_delta(db, library_id, delta)
+                    scan.stats_json = json.dumps({**stats, "checkpoint": last})
+                    progress.store(db)
+                    db.commit()
+                    # Start every batch with an empty identity map: nothing the batch
+                    # loaded (items, files, series) is needed again, so memory stays
+                    # flat however large the library is.
+                    db.expunge_all()
+                    db.add(scan)
+                    # Pause/cancel requested on another worker
+                    ctl.sync(db)
+        with timings.stage("commit"):
+            if stopped is None:
+                if ckpt:
+                    # Files before the checkpoint were seen by the paused run
+                    ckpt_key = walk_key(ckpt)
+                    known.assume_seen(lambda p: walk_key(p) <= ckpt_key)
+                # Files gone from disk leave the unmatched queue and the library.
+                # A walk that found nothing is more likely an unmounted disk than
+                # an emptied library, so file rows are only pruned after a walk
+                # that saw something.
+                stats["unmatched_pruned"] = known.prune(db)
+                if stats["files"]:
+                    stats["pruned"] = _prune_missing(db, library_id, root, delta)
+            apply_delta(db, library_id, delta)
+            db.commit()
+        if stopped == "pause":
+            scan.status = "paused"
+            stats["checkpoint"] = last
+        elif stopped == "cancel":
+            scan.status = "cancelled"
+        else:
+            scan.status = "succeeded"
+        stats["changed"] = stats["new"] + stats["updated"] + stats.get("pruned", 0)
+        stats["timing"] = timings.summary()
         scan.stats_json = json.dumps(stats)
     except Exception as e:
         scan.status = "failed"
-        stats = {**stats, "error": str(e)}
+        stats = {**stats, "error": str(e), "timing": timings.summary()}
         scan.stats_json = json.dumps(stats)
+        apply_delta(db, library_id, delta)
         db.commit()
         lg.error({"event": "scan.error", "library_id": library_id, "err": str(e)})
         raise
     finally:
+        if prof:
+            prof.disable()
+            try:
+                PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+                out = PROFILE_DIR / f"scan-{library_id}-{scan.id}.prof"
+                prof.dump_stats(str(out))
+                stats["profile_path"] = str(out)
+                scan.stats_json = json.dumps(stats)
+            except Exception as e:
+                lg.warning({"event": "scan.profile.error", "library_id": library_id, "err": str(e)})
         scan.finished_at = int(time.time())
+        try:
+            finish_scan(db, library_id, scan.finished_at, scan.status)
+        except Exception as e:
+            lg.warning({"event": "rollups.update.error", "library_id": library_id, "err": str(e)})
         db.commit()
         db.close()
-    lg.info({"event": "scan.end", "library_id": library_id, **stats})
+        scan_control.unregister(library_id, ctl)
+        progress.publish(stats, status=scan.status, force=True)
+        try:
+            progress.store()
+        except Exception as e:
+            lg.warning({"event": "scan_progress.store.error", "library_id": library_id, "err": str(e)})
+    lg.info({
+        "event": "scan.end",
+        "library_id": library_id,
+        **{k: v for k, v in stats.items() if k != "timing"},
+        "elapsed_ms": stats["timing"]["elapsed_ms"],
+    })
     return stats
 
+
+def scan_paths(library_id: int, paths: list[str]) -> dict:
+    """Match and link only the given files (absolute paths under the library root).
+
+    Used by the import pipeline so a finished download is linked without walking
+    the whole library. No LibraryScan row is written. Each file is committed on
+    its own, so a collision with a concurrent full scan loses only that file.
+    """
+    stats = dict.fromkeys(COUNT_KEYS, 0)
+    timings = ScanTimings()
+    delta = RollupDelta()
+    with SessionLocal() as db:
+        root = _lib_root(db, library_id)
+        for abs_path in paths:
+            rel_path = os.path.relpath(abs_path, root)
+            if rel_path.startswith(os.pardir) or os.path.splitext(abs_path)[1].lower() not in VIDEO_EXTS:
+                stats["skipped"] += 1
+                continue
+            try:
+                st = os.stat(abs_path)
+            except FileNotFoundError:
+                stats["skipped"] += 1
+                continue
+            t_file = time.perf_counter()
+            stats["files"] += 1
+            try:
+                _match_and_link(db, library_id, abs_path, rel_path, int(st.st_size), int(st.st_mtime), stats, timings, delta)
+                with timings.stage("commit"):
+                    apply_delta(db, library_id, delta)
+                    db.commit()
+            except Exception as e:
+                db.rollback()
+                delta = RollupDelta()
+                lg.warning({"event": "scan.file.error", "path": abs_path, "err": str(e)})
+            finally:
+                timings.file_done(rel_path, time.perf_counter() - t_file)
+    stats["changed"] = stats["new"] + stats["updated"]
+    stats["timing"] = timings.summary()
+    lg.info({
+        "event": "scan.paths",
+        "library_id": library_id,
+        **{k: v for k, v in stats.items() if k != "timing"},
+        "elapsed_ms": stats["timing"]["elapsed_ms"],
+    })
+    return stats
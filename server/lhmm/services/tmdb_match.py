@@ -1,9 +1,31 @@
 from __future__ import annotations
-from typing import Optional
-import httpx
+import threading
+from typing import Optional, TYPE_CHECKING
 from lhmm.settings import settings
+from lhmm.services.circuit import breaker
 
-BASE = "https://api.themoviedb.org/3"
+if TYPE_CHECKING:
+    import httpx
+
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+
+def _http() -> httpx.Client:
+    # One pooled client per process: scans issue a request per file, so reusing
+    # keep-alive connections avoids a TCP+TLS handshake on every lookup.
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import httpx
+
+                _client = httpx.Client(base_url=settings.tmdb.base_url, timeout=settings.tmdb.timeout_seconds)
+    return _client
+
+def _get(path: str, params: dict) -> httpx.Response:
+    # Every scan-side TMDB request goes through the shared breaker: once TMDB keeps
+    # failing this raises CircuitOpen immediately instead of waiting on a timeout.
+    return breaker("tmdb").call(_http().get, path, params=params)
 
 def _safe_year(date_str: Optional[str]) -> Optional[int]:
     try:
@@ -23,33 +45,42 @@ def best_movie(query: str, year: Optional[int]) -> Optional[dict]:
     key = settings.tmdb.api_key
     if not key or not query:
         return None
-    with httpx.Client(timeout=10.0) as client:
-        r = client.get(f"{BASE}/search/movie", params={"api_key": key, "query": query, "year": year or ""})
-        r.raise_for_status()
-        results = r.json().get("results", [])
-        best = None
-        best_s = -1
-        for c in results:
-            pop = c.get("popularity") or 0
-            s = pop + 50 * _score_year(year, _safe_year(c.get("release_date")))
-            if s > best_s:
-                best, best_s = c, s
-        return best
+    r = _get("/search/movie", params={"api_key": key, "query": query, "year": year or ""})
+    r.raise_for_status()
+    results = r.json().get("results", [])
+    best = None
+    best_s = -1
+    for c in results:
+        pop = c.get("popularity") or 0
+        s = pop + 50 * _score_year(year, _safe_year(c.get("release_date")))
+        if s > best_s:
+            best, best_s = c, s
+    return best
 
 def best_tv(query: str, year: Optional[int]) -> Optional[dict]:
     key = settings.tmdb.api_key
     if not key or not query:
         return None
-    with httpx.Client(timeout=10.0) as client:
-        r = client.get(f"{BASE}/search/tv", params={"api_key": key, "query": query})
-        r.raise_for_status()
-        results = r.json().get("results", [])
-        best = None
-        best_s = -1
-        for c in results:
-            pop = c.get("popularity") or 0
-            s = pop + 50 * _score_year(year, _safe_year(c.get("first_air_date")))
-            if s > best_s:
-                best, best_s = c, s
-        return best
+    r = _get("/search/tv", params={"api_key": key, "query": query})
+    r.raise_for_status()
+    results = r.json().get("results", [])
+    best = None
+    best_s = -1
+    for c in results:
+        pop = c.get("popularity") or 0
+        s = pop + 50 * _score_year(year, _safe_year(c.get("first_air_date")))
+        if s > best_s:
+            best, best_s = c, s
+    return best
 
+
+def details(kind: str, tmdb_id: int) -> Optional[dict]:
+    """A movie or TV show by TMDB id, with the same fields as a search hit; None if unknown."""
+    key = settings.tmdb.api_key
+    if not key:
+        return None
+    r = _get(f"/{'movie' if kind == 'movie' else 'tv'}/{int(tmdb_id)}", params={"api_key": key})
+    if r.status_code == 404:
+        return None
+    r.raise_for_status()
+    return r.json()
@@ -0,0 +1,261 @@
+from __future__ import annotations
+import json
+import logging
+import time
+from sqlalchemy import select, delete
+from sqlalchemy.orm import Session
+from lhmm.db.session import SessionLocal
+from lhmm.db.models import UnmatchedFile
+from lhmm.settings import settings
+
+lg = logging.getLogger("lhmm.unmatched")
+
+# Files the scanner could not match (no title guessed, no TMDB hit, an episode
+# without season/episode numbers) are kept in unmatched_files instead of being
+# retried against TMDB on every scan. Each failure doubles the wait before the
+# next attempt:
+#
+#   next_retry_at = now + min(retry_base_minutes * 2**(attempts-1), retry_max_days)
+#
+# A file whose size or mtime changed is retried at once (a fixed or replaced
+# release) and starts over at attempt 1. next_retry_at NULL marks a file the user
+# chose to ignore. Rows are deleted when the file matches, is assigned by hand
+# (POST /unmatched/assign) or is no longer found by a full scan.
+#
+# reason "pending" is different: TMDB was unreachable (circuit open, timeout,
+# 5xx) so the file was never really tried. Pending rows are due at once, do not
+# count as attempts, and are matched in batches by resolve_pending() (a leader
+# job) once the tmdb circuit lets requests through again. It asks TMDB about a
+# chunk of RESOLVE_CHUNK rows with no transaction open, then writes the chunk and
+# commits, so the write lock is never held across a lookup.
+
+GUESS_KEYS = ("title", "year", "type", "season", "episode", "episode_title", "release_group")
+PENDING = "pending"
+PRUNE_CHUNK = 500
+RESOLVE_CHUNK = 20
+
+
+def backoff_seconds(attempts: int) -> int:
+    cfg = settings.unmatched
+    base = cfg.retry_base_minutes * 60
+    return int(min(base * 2 ** max(0, attempts - 1), cfg.retry_max_days * 86400))
+
+
+def _guess(g: dict) -> dict:
+    # guessit values can be lists or babelfish objects; keep JSON-friendly fields
+    out = {}
+    for k in GUESS_KEYS:
+        v = g.get(k)
+        if v is not None:
+            out[k] = v if isinstance(v, (int, str, list)) else str(v)
+    return out
+
+
+def record(db: Session, library_id: int, rel_path: str, size: int, mtime: int | None, guess: dict, reason: str) -> UnmatchedFile:
+    """Insert or bump the unmatched row for a file that failed to match."""
+    now = int(time.time())
+    row = db.execute(
+        select(UnmatchedFile).where(UnmatchedFile.library_id == library_id, UnmatchedFile.rel_path == rel_path)
+    ).scalar_one_or_none()
+    if row is None:
+        row = UnmatchedFile(library_id=library_id, rel_path=rel_path, first_seen_at=now, attempts=0)
+        db.add(row)
+    elif row.size != size or row.mtime != mtime:
+        row.attempts = 0
+    row.size = size
+    row.mtime = mtime
+    row.guess_json = json.dumps(_guess(guess))
+    if reason == PENDING:
+        # Not a real attempt: keep the count and retry as soon as TMDB is back
+        row.reason = reason
+        row.next_retry_at = now
+        return row
+    _failed(row, reason, now)
+    return row
+
+
+def _failed(row: UnmatchedFile, reason: str, now: int) -> None:
+    row.attempts += 1
+    row.reason = reason
+    row.last_attempt_at = now
+    row.next_retry_at = now + backoff_seconds(row.attempts)
+
+
+def clear(db: Session, library_id: int, rel_path: str) -> None:
+    db.execute(delete(UnmatchedFile).where(UnmatchedFile.library_id == library_id, UnmatchedFile.rel_path == rel_path))
+
+
+class UnmatchedIndex:
+    """A library's unmatched rows, loaded once at the start of a scan."""
+
+    def __init__(self, db: Session, library_id: int):
+        self.library_id = library_id
+        self.now = int(time.time())
+        self._rows = {
+            p: (size, mtime, due)
+            for p, size, mtime, due in db.execute(
+                select(UnmatchedFile.rel_path, UnmatchedFile.size, UnmatchedFile.mtime, UnmatchedFile.next_retry_at)
+                .where(UnmatchedFile.library_id == library_id)
+            )
+        }
+        self.seen: set[str] = set()
+
+    def __contains__(self, rel_path: str) -> bool:
+        return rel_path in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def deferred(self, rel_path: str, size: int, mtime: int | None) -> bool:
+        """True if the file is known unmatched, unchanged and not yet due (or ignored)."""
+        row = self._rows.get(rel_path)
+        if row is None:
+            return False
+        self.seen.add(rel_path)
+        known_size, known_mtime, due = row
+        if (known_size, known_mtime) != (size, mtime):
+            return False
+        return due is None or due > self.now
+
+    def assume_seen(self, pred) -> None:
+        """Count rows whose path matches pred as seen (files a resumed scan skipped)."""
+        self.seen.update(p for p in self._rows if pred(p))
+
+    def prune(self, db: Session) -> int:
+        """Delete rows for files the scan did not come across (moved or deleted)."""
+        gone = sorted(set(self._rows) - self.seen)
+        for i in range(0, len(gone), PRUNE_CHUNK):
+            db.execute(delete(UnmatchedFile).where(
+                UnmatchedFile.library_id == self.library_id, UnmatchedFile.rel_path.in_(gone[i:i + PRUNE_CHUNK])
+            ))
+        return len(gone)
+
+
+def lookup(row: UnmatchedFile, kind: str, tmdb_id: int, season: int | None = None, episode: int | None = None,
+           title: str | None = None, hits: dict | None = None) -> dict:
+    """Validate a hand assignment and fetch its TMDB record, writing nothing.
+
+    Returns the target for link(); raises ValueError. ``hits`` caches TMDB records
+    by (kind, tmdb_id) across a batch (episodes of one show share a record).
+    """
+    from lhmm.services.tmdb_match import details
+
+    guess = json.loads(row.guess_json or "{}")
+    if kind == "episode":
+        season = season if season is not None else guess.get("season")
+        episode = episode if episode is not None else guess.get("episode")
+        if not isinstance(season, int) or not isinstance(episode, int):
+            raise ValueError("season and episode are required for episodes")
+    if settings.tmdb.api_key:
+        hits = {} if hits is None else hits
+        if (kind, tmdb_id) not in hits:
+            try:
+                hits[kind, tmdb_id] = details(kind, tmdb_id)
+            except Exception as e:
+                raise ValueError(f"TMDB lookup failed: {e}")
+        hit = hits[kind, tmdb_id]
+        if hit is None:
+            raise ValueError(f"TMDB has no {'movie' if kind == 'movie' else 'tv show'} {tmdb_id}")
+    else:
+        hit = {"id": tmdb_id}
+    title = title or guess.get("title")
+    if not (hit.get("title") or hit.get("name") or title):
+        raise ValueError("title is required without a TMDB API key")
+    return {"kind": kind, "tmdb_id": tmdb_id, "hit": hit, "title": title, "season": season, "episode": episode}
+
+
+def link(db: Session, row: UnmatchedFile, target: dict, year: int | None = None, delta=None) -> str:
+    """Write a lookup() target: link the file and drop its row. Returns _link_file()'s result.
+
+    With ``delta`` (a RollupDelta) the caller applies the rollup change, once per batch.
+    """
+    from lhmm.services.scanner import _link_hit
+    from lhmm.services.rollups import RollupDelta, apply_delta
+
+    own = delta is None
+    delta = RollupDelta() if own else delta
+    result = _link_hit(db, row.library_id, row.rel_path, row.size, row.mtime or 0, target["kind"], target["hit"],
+                       target["title"], year or json.loads(row.guess_json or "{}").get("year"),
+                       target["season"], target["episode"], delta)
+    if own:
+        apply_delta(db, row.library_id, delta)
+    db.delete(row)
+    lg.info({"event": "unmatched.assigned", "library_id": row.library_id, "path": row.rel_path,
+             "kind": target["kind"], "tmdb_id": target["tmdb_id"]})
+    return result
+
+
+def assign(db: Session, row: UnmatchedFile, kind: str, tmdb_id: int, season: int | None = None,
+           episode: int | None = None, title: str | None = None, year: int | None = None) -> str:
+    """Link an unmatched file to a TMDB movie/show by hand and drop its row.
+
+    Title, year and artwork come from TMDB when an API key is configured; otherwise
+    from the arguments or the stored guess. Returns _link_file()'s result for the file row.
+    Batches should lookup() every file before link()ing any (see POST /unmatched/assign).
+    """
+    return link(db, row, lookup(row, kind, tmdb_id, season, episode, title), year)
+
+
+def resolve_pending(limit: int | None = None) -> dict:
+    """Match pending files from their stored guess while the tmdb circuit allows it.
+
+    Stops at the first CircuitOpen, leaving the rest pending for the next run.
+    A miss becomes an ordinary unmatched row with backoff.
+    """
+    from lhmm.services.circuit import CircuitOpen, breaker
+    from lhmm.services.scanner import SeriesIds, _link_hit
+    from lhmm.services.tmdb_match import best_movie, best_tv
+    from lhmm.services.rollups import RollupDelta, apply_delta
+
+    out = {"checked": 0, "matched": 0, "unmatched": 0, "errors": 0, "circuit": breaker("tmdb").state}
+    if not settings.tmdb.api_key or breaker("tmdb").is_open():
+        return out
+    limit = limit or settings.tmdb.pending_batch
+    with SessionLocal() as db:
+        rows = db.scalars(
+            select(UnmatchedFile).where(UnmatchedFile.reason == PENDING)
+            .order_by(UnmatchedFile.library_id, UnmatchedFile.id).limit(limit)
+        ).all()
+        series_ids = SeriesIds()
+        stopped = False
+        for i in range(0, len(rows), RESOLVE_CHUNK):
+            found = []
+            for row in rows[i:i + RESOLVE_CHUNK]:
+                g = json.loads(row.guess_json or "{}")
+                kind = "movie" if g.get("type") == "movie" else "episode"
+                try:
+                    hit = best_movie(g.get("title"), g.get("year")) if kind == "movie" else best_tv(g.get("title"), g.get("year"))
+                except CircuitOpen:
+                    stopped = True
+                    break
+                except Exception as e:
+                    out["errors"] += 1
+                    lg.warning({"event": "unmatched.pending.error", "path": row.rel_path, "err": str(e)})
+                    continue
+                found.append((row, g, kind, hit))
+            deltas: dict[int, RollupDelta] = {}
+            now = int(time.time())
+            for row, g, kind, hit in found:
+                out["checked"] += 1
+                season, episode = g.get("season"), g.get("episode")
+                if not hit:
+                    _failed(row, "no_match", now)
+                elif kind == "episode" and not (isinstance(season, int) and isinstance(episode, int)):
+                    _failed(row, "no_episode", now)
+                else:
+                    delta = deltas.setdefault(row.library_id, RollupDelta())
+                    _link_hit(db, row.library_id, row.rel_path, row.size, row.mtime or 0, kind, hit,
+                              g.get("title"), g.get("year"), season, episode, delta, series_ids)
+                    db.delete(row)
+                    out["matched"] += 1
+                    continue
+                out["unmatched"] += 1
+            for library_id, delta in deltas.items():
+                apply_delta(db, library_id, delta)
+            db.commit()
+            if stopped:
+                break
+    out["circuit"] = breaker("tmdb").state
+    if out["checked"] or out["errors"]:
+        lg.info({"event": "unmatched.pending.resolved", **out})
+    return out
@@ -1,7 +1,6 @@
 from __future__ import annotations
 import json, os, pathlib
 from typing import List, Optional, Dict, Any
-import yaml
 from pydantic import BaseModel, Field, ValidationError
 
 CONFIG_DIR = pathlib.Path(os.environ.get("LHMM_CONFIG_DIR", "/lhmm/config"))
@@ -14,22 +13,62 @@ class LoggingCfg(BaseModel):
     level: str = "INFO"
     timezone: str = "local"
 
+class DBMaintenanceCfg(BaseModel):
+    enabled: bool = True
+    check_seconds: int = 60         # how often the WAL size / idle state is checked
+    interval_hours: int = 24        # idle pass at least this often even without scans
+    wal_checkpoint_mb: int = 64     # TRUNCATE checkpoint once the -wal file passes this
+    analysis_limit: int = 1000      # rows sampled per index by ANALYZE (0 = all)
+    vacuum_free_ratio: float = 0.25 # free-page share that triggers the one-off VACUUM to auto_vacuum=incremental
+    incremental_vacuum_pages: int = 4096  # pages released per pass (0 = all free pages)
+
+class DBBackupCfg(BaseModel):
+    enabled: bool = True            # scheduled backups (the API works either way)
+    interval_hours: int = 24
+    keep: int = 7                   # newest backups retained
+    dir: str = ""                   # empty: CONFIG_DIR/backups
+    compress: bool = True           # gzip
+    compress_level: int = 6
+    pages_per_step: int = 1024      # pages copied per backup step; writers wait at most one step
+    step_sleep_ms: int = 20         # pause between steps
+
 class DBCfg(BaseModel):
     url: str = "sqlite:////lhmm/config/db/lhmm.sqlite3"
+    maintenance: DBMaintenanceCfg = DBMaintenanceCfg()
+    backup: DBBackupCfg = DBBackupCfg()
 
 class PathsCfg(BaseModel):
     media_root: str = "/lhmm/media"
 
+class CacheCfg(BaseModel):
+    images_max_mb: int = 2048       # poster/backdrop cache under CONFIG_DIR/cache/images (LRU, per worker)
+
 class SchedulerCfg(BaseModel):
     enabled: bool = True
+    walkers_per_disk: int = 1       # concurrent library scans allowed on one Disk
+    max_concurrent_scans: int = 4   # across all disks
+    lease_seconds: int = 30         # leader lease; another worker takes over this long after a crash
 
 class TMDBCfg(BaseModel):
     api_key: str = ""
+    base_url: str = "https://api.themoviedb.org/3"
+    image_base_url: str = ""        # empty: TMDB /configuration secure_base_url, else image.tmdb.org
+    timeout_seconds: float = 10.0   # per request; a timeout counts as a breaker failure
+    breaker_failures: int = 5       # consecutive failures (errors, timeouts, 5xx/429) that open the circuit
+    breaker_reset_seconds: float = 30.0      # first wait before a trial request; doubles per failed trial
+    breaker_max_reset_seconds: float = 600.0
+    pending_check_seconds: int = 60 # how often the leader tries to resolve pending-match files
+    pending_batch: int = 200        # pending-match files resolved per run once TMDB answers again
 
 class SABCfg(BaseModel):
     url: str = ""
     api_key: str = ""
     category_default: str = ""
+    history_poll_seconds: int = 30
+    queue_cache_seconds: float = 3.0
+    import_enabled: bool = True     # move completed downloads into libraries
+    import_mode: str = "move"       # move | hardlink when on the same filesystem; otherwise copied
+    import_chunk_mb: int = 8        # buffer size for cross-filesystem copies
 
 class IndexerCfg(BaseModel):
     name: str
@@ -37,6 +76,18 @@ class IndexerCfg(BaseModel):
     api_key: str = ""
     capabilities: Dict[str, Any] = Field(default_factory=dict)
 
+class RSSCfg(BaseModel):
+    enabled: bool = True
+    interval_minutes: int = 15
+    max_concurrent: int = 4         # indexers polled at once
+
+class UnmatchedCfg(BaseModel):
+    retry_base_minutes: int = 360   # first TMDB retry for a file that did not match; doubles per attempt
+    retry_max_days: int = 30        # backoff cap
+
+class StartupCfg(BaseModel):
+    warmup: bool = True             # import guessit/httpx in the background once serving
+
 class BasicAuthCfg(BaseModel):
     enabled: bool = False
     username: str = ""
@@ -52,10 +103,14 @@ class Settings(BaseModel):
     logging: LoggingCfg = LoggingCfg()
     db: DBCfg = DBCfg()
     paths: PathsCfg = PathsCfg()
+    cache: CacheCfg = CacheCfg()
     scheduler: SchedulerCfg = SchedulerCfg()
     tmdb: TMDBCfg = TMDBCfg()
     sabnzbd: SABCfg = SABCfg()
     indexers: List[IndexerCfg] = Field(default_factory=list)
+    rss: RSSCfg = RSSCfg()
+    unmatched: UnmatchedCfg = UnmatchedCfg()
+    startup: StartupCfg = StartupCfg()
     auth: AuthCfg = AuthCfg()
     cors: CorsCfg = CorsCfg()
 
@@ -107,6 +162,8 @@ def load_settings() -> Settings:
     baseline = Settings().model_dump()
     file_cfg: Dict[str, Any] = {}
     if DEFAULT_YAML.exists():
+        import yaml
+
         with DEFAULT_YAML.open("r", encoding="utf-8") as f:
             file_cfg = yaml.safe_load(f) or {}
     merged = _deep_merge(baseline, file_cfg)
@@ -117,6 +174,33 @@ def load_settings() -> Settings:
     except ValidationError as ve:
         raise SystemExit(f"Invalid configuration: {ve}")
 
+class _LazySettings:
+    """Stands in for the Settings singleton; YAML + env are read on first attribute access.
+
+    Importing a module that does ``from lhmm.settings import settings`` therefore
+    costs nothing until a value is actually needed (CLI tools, Alembic).
+    """
+
+    __slots__ = ("_value",)
+
+    def __init__(self) -> None:
+        self._value: Optional[Settings] = None
+
+    def _load(self) -> Settings:
+        if self._value is None:
+            self._value = load_settings()
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+    def __repr__(self) -> str:
+        return repr(self._value) if self._value is not None else "<settings: not loaded>"
+
 # Singleton
-settings = load_settings()
+settings: Settings = _LazySettings()  # type: ignore[assignment]
 
@@ -0,0 +1,150 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+lg = logging.getLogger("lhmm.startup")
+
+# Cold-start budget. Heavy optional dependencies (guessit, httpx, apscheduler) are
+# imported on first use rather than when lhmm.main is imported; once the app is
+# serving, warmup() pulls them in on a background thread so the first scan or
+# outbound request does not pay for it either.
+#
+# `python -m lhmm --startup-report` prints where start-up time goes: per-module
+# import cost from a fresh interpreter (-X importtime), then each initialisation
+# step timed in-process.
+
+WARMUP_NAME = "Some.Movie.2010.1080p.BluRay.x264-GRP.mkv"
+
+_warm_thread: threading.Thread | None = None
+
+
+def warmup() -> dict[str, float]:
+    """Import the lazily-loaded dependencies and prime guessit's rule set; returns ms per step."""
+    out: dict[str, float] = {}
+
+    def step(name: str, fn) -> None:
+        t0 = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            lg.warning({"event": "startup.warmup.error", "step": name, "err": str(e)})
+        out[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+    step("httpx", lambda: __import__("httpx"))
+    step("guessit", lambda: __import__("guessit"))
+    step("guessit.first_call", lambda: __import__("lhmm.services.scanner", fromlist=["guessit"]).guessit(WARMUP_NAME))
+    return out
+
+
+def start_warmup() -> None:
+    global _warm_thread
+    if _warm_thread is not None:
+        return
+
+    def run() -> None:
+        t0 = time.perf_counter()
+        steps = warmup()
+        lg.info({"event": "startup.warmup", "ms": round((time.perf_counter() - t0) * 1000, 1), "steps": steps})
+
+    _warm_thread = threading.Thread(target=run, name="lhmm-warmup", daemon=True)
+    _warm_thread.start()
+
+
+def _import_breakdown(target: str = "lhmm.main") -> tuple[float, list[tuple[str, float]]]:
+    """Import `target` in a fresh interpreter; return (total ms, [(top-level package, ms)])."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    by_pkg: dict[str, float] = {}
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        mod = name.strip()
+        # lhmm modules are reported individually, everything else by distribution
+        key = mod if mod.startswith("lhmm") else mod.split(".")[0]
+        ms = int(self_us) / 1000
+        by_pkg[key] = by_pkg.get(key, 0.0) + ms
+        total += ms
+    ranked = sorted(by_pkg.items(), key=lambda kv: kv[1], reverse=True)
+    return round(total, 1), [(k, round(v, 1)) for k, v in ranked]
+
+
+def _timed(name: str, fn, out: list) -> None:
+    t0 = time.perf_counter()
+    err = None
+    try:
+        fn()
+    except Exception as e:
+        err = (str(e) or type(e).__name__).splitlines()[0]
+    out.append({"step": name, "ms": round((time.perf_counter() - t0) * 1000, 1), "error": err})
+
+
+def _db_ping() -> None:
+    from sqlalchemy import text
+    from lhmm.db.session import engine
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def _register_jobs() -> None:
+    from lhmm.scheduler import register_jobs
+
+    register_jobs()
+
+
+def startup_report(top: int = 25) -> dict:
+    import_total, modules = _import_breakdown()
+    init: list[dict] = []
+    _timed("import lhmm.settings", lambda: __import__("lhmm.settings"), init)
+    from lhmm.settings import settings
+
+    _timed("settings load (yaml + env)", lambda: settings.db, init)
+    _timed("import lhmm.main (routers, middleware)", lambda: __import__("lhmm.main"), init)
+    _timed("db connect + SELECT 1", _db_ping, init)
+    _timed("scheduler import + register_jobs", _register_jobs, init)
+    warm = warmup()
+    for k, v in warm.items():
+        init.append({"step": f"warmup: {k} (background)", "ms": v, "error": None})
+    return {"import_ms": import_total, "modules": modules[:top], "init": init}
+
+
+def print_report(rep: dict) -> None:
+    print(f"import lhmm.main in a fresh interpreter: {rep['import_ms']:.1f} ms (sum of self times)")
+    print()
+    print(f"  {'ms':>8}  module")
+    for name, ms in rep["modules"]:
+        print(f"  {ms:>8.1f}  {name}")
+    print()
+    print(f"  {'ms':>8}  initialisation step (in-process, after the imports above)")
+    for s in rep["init"]:
+        print(f"  {s['ms']:>8.1f}  {s['step']}" + (f"  [error: {s['error']}]" if s["error"] else ""))
+
+
+def main(argv: list[str]) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m lhmm")
+    ap.add_argument("--startup-report", action="store_true", help="print an import-time and init breakdown")
+    ap.add_argument("--json", action="store_true", help="with --startup-report: emit JSON")
+    ap.add_argument("--top", type=int, default=25, help="modules to list (default 25)")
+    args = ap.parse_args(argv)
+    if not args.startup_report:
+        ap.print_help()
+        return 2
+    rep = startup_report(args.top)
+    if args.json:
+        print(json.dumps(rep, indent=2))
+    else:
+        print_report(rep)
+    return 0
@@ -1,7 +1,6 @@
 from __future__ import annotations
 import os, json, time, asyncio, pathlib
 from typing import Any, Dict, List, Optional
-import httpx
 
 CACHE_PATH = pathlib.Path(os.environ.get("LHMM_CONFIG_DIR", "/lhmm/config")) / "cache" / "tmdb.json"
 BASE_URL = "https://api.themoviedb.org/3"
@@ -10,8 +9,12 @@ class TMDBClient:
     def __init__(self, api_key: str):
         if not api_key:
             raise RuntimeError("TMDB API key is not configured")
+        import httpx
+        from lhmm.services.circuit import breaker
+
         self.api_key = api_key
         self._client = httpx.AsyncClient(timeout=20)
+        self._breaker = breaker("tmdb")
         self._img_cfg: Optional[Dict[str, Any]] = None
         self._img_cfg_loaded_at: float = 0.0
 
@@ -28,7 +31,9 @@ class TMDBClient:
         q = {"api_key": self.api_key, **params}
         delay = 0.5
         for _ in range(5):
-            r = await self._client.get(f"{BASE_URL}{path}", params=q)
+            # Each attempt counts toward the shared breaker; once it opens the next
+            # attempt raises CircuitOpen rather than retrying an outage.
+            r = await self._breaker.acall(self._client.get, f"{BASE_URL}{path}", params=q)
             if r.status_code in (429,) or r.status_code >= 500:
                 await asyncio.sleep(delay)
                 delay = min(5.0, delay * 2)
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Scan benchmark against synthetic libraries and a local fake TMDB.
+
+Each (kind, size) case runs in a fresh subprocess so peak RSS and the SQLite
+file are isolated. Reports files/sec, TMDB calls per file, DB writes per file
+and peak RSS, and compares against a JSON baseline.
+
+  python scripts/bench_scan.py                              # movie+tv at 1k, 10k, 100k
+  python scripts/bench_scan.py --sizes 1000 --kinds movie --check
+  python scripts/bench_scan.py --sizes 1000,10000 --write-baseline
+  python scripts/bench_scan.py --latency-ms 25 --rate-limit 40
+  python scripts/bench_scan.py --sizes 10000,500000 --kinds tv --empty --check-rss-flat 16
+
+Baselines are machine specific; regenerate them on the box that runs --check.
+--check refuses to run a (kind, size) case that has no baseline yet; the
+committed file covers 1k only, so check larger sizes after --write-baseline.
+"""
+import argparse
+import json
+import os
+import pathlib
+import random
+import subprocess
+import sys
+import tempfile
+
+HERE = pathlib.Path(__file__).resolve().parent
+BASELINE = HERE / "bench_baseline.json"
+
+WORDS = (
+    "shadow river night golden last dark lost city empire silent storm broken winter "
+    "secret iron blue red star hidden fire wild north glass stone black white kingdom "
+    "ghost summer ocean hunter dragon crown garden midnight paper echo signal frontier"
+).split()
+RES = ["720p", "1080p", "2160p"]
+SRC = ["BluRay", "WEB-DL", "WEBRip", "HDTV"]
+GRP = ["SPARKS", "NTb", "FLUX", "GECKOS", "RARBG", "CAKES"]
+
+
+def _title(rng: random.Random, i: int) -> str:
+    # Index suffix keeps names unique so every movie/show is a distinct TMDB query
+    return " ".join(w.capitalize() for w in rng.sample(WORDS, rng.randint(1, 3))) + f" {i}"
+
+
+def _touch(path: pathlib.Path, rng: random.Random, sparse: bool) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        if sparse:
+            f.truncate(rng.randint(700, 8000) * 1024 * 1024)
+
+
+def make_movie_tree(root: pathlib.Path, n: int, sparse: bool, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    for i in range(n):
+        t = _title(rng, i)
+        year = rng.randint(1960, 2024)
+        dot = t.replace(" ", ".")
+        rel = f"{t} ({year})/{dot}.{year}.{rng.choice(RES)}.{rng.choice(SRC)}.x264-{rng.choice(GRP)}.mkv"
+        if i % 50 == 49:  # sprinkle of junk that should not match
+            rel = f"{t} ({year})/sample-{dot.lower()}.mkv"
+        _touch(root / rel, rng, sparse)
+
+
+def make_tv_tree(root: pathlib.Path, n: int, sparse: bool, seed: int = 2) -> None:
+    rng = random.Random(seed)
+    made = 0
+    show = 0
+    while made < n:
+        t = _title(rng, show)
+        dot = t.replace(" ", ".")
+        for season in range(1, rng.randint(1, 6) + 1):
+            for ep in range(1, rng.randint(8, 22) + 1):
+                if made >= n:
+                    break
+                rel = (
+                    f"{t}/Season {season:02d}/"
+                    f"{dot}.S{season:02d}E{ep:02d}.{rng.choice(RES)}.{rng.choice(SRC)}.x264-{rng.choice(GRP)}.mkv"
+                )
+                _touch(root / rel, rng, sparse)
+                made += 1
+        show += 1
+
+
+def run_one(kind: str, n: int, args) -> dict:
+    """Child process: build the tree, point lhmm at temp dirs + fake TMDB, scan once."""
+    sys.path.insert(0, str(HERE))
+    sys.path.insert(0, str(HERE.parent))
+    from fakes import FakeTMDB
+
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix=f"lhmm-bench-{kind}-{n}-"))
+    media = tmp / "media"
+    subdir = "Movies" if kind == "movie" else "TV"
+    (make_movie_tree if kind == "movie" else make_tv_tree)(media / subdir, n, sparse=not args.empty)
+
+    fake = FakeTMDB(latency_ms=args.latency_ms, rate_limit=args.rate_limit).start()
+    os.environ.update({
+        "LHMM_CONFIG_DIR": str(tmp / "config"),
+        "LHMM__DB__URL": f"sqlite:///{tmp / 'bench.sqlite3'}",
+        "LHMM__LOGGING__FILE": str(tmp / "lhmm.log"),
+        "LHMM__TMDB__API_KEY": "bench",
+        "LHMM__TMDB__BASE_URL": fake.url,
+    })
+
+    import resource
+    import logging
+    from sqlalchemy import event
+    from lhmm.db.base import Base
+    from lhmm.db.session import engine, SessionLocal
+    from lhmm.db.models import Disk, Library
+    from lhmm.services.scanner import scan_library
+
+    logging.getLogger("lhmm.scanner").setLevel(logging.ERROR)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        d = Disk(name="bench", mount_path=str(media))
+        db.add(d)
+        db.flush()
+        li = Library(name=f"bench-{kind}", type=kind, root_disk_id=d.id, root_subdir=subdir)
+        db.add(li)
+        db.commit()
+        lib_id = li.id
+
+    writes = {"n": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip()[:6].upper()
+        if verb in ("INSERT", "UPDATE", "DELETE"):
+            writes["n"] += len(parameters) if executemany else 1
+
+    fake.calls = 0
+    stats = scan_library(lib_id)
+    fake.stop()
+    files = max(1, stats["files"])
+    timing = stats.get("timing", {})
+    return {
+        "kind": kind,
+        "size": n,
+        "files": stats["files"],
+        "matched": stats["matched"],
+        "skipped": stats["skipped"],
+        "elapsed_s": round(timing.get("elapsed_ms", 0) / 1000, 2),
+        "files_per_sec": timing.get("files_per_sec", 0.0),
+        "tmdb_calls_per_file": round(fake.calls / files, 3),
+        "tmdb_throttled": fake.throttled,
+        "db_writes_per_file": round(writes["n"] / files, 3),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stages_ms": {k: v.get("total_ms") for k, v in timing.get("stages", {}).items()},
+    }
+
+
+def compare(results: list[dict], baseline: dict, tol: float) -> list[str]:
+    problems = []
+    for r in results:
+        key = f"{r['kind']}-{r['size']}"
+        b = baseline.get(key)
+        if not b:
+            problems.append(f"{key}: no baseline")
+            continue
+        if r["files_per_sec"] < b["files_per_sec"] * (1 - tol):
+            problems.append(f"{key}: files/sec {r['files_per_sec']} < baseline {b['files_per_sec']}")
+        for m in ("tmdb_calls_per_file", "db_writes_per_file", "peak_rss_mb"):
+            if r[m] > b[m] * (1 + tol) + 0.01:
+                problems.append(f"{key}: {m} {r[m]} > baseline {b[m]}")
+    return problems
+
+
+def rss_growth(results: list[dict], limit_mb: float) -> list[str]:
+    """Peak RSS per kind must not grow by more than limit_mb from the smallest to the largest size."""
+    problems = []
+    for kind in sorted({r["kind"] for r in results}):
+        runs = sorted((r for r in results if r["kind"] == kind), key=lambda r: r["size"])
+        if len(runs) < 2:
+            continue
+        lo, hi = runs[0], runs[-1]
+        growth = round(hi["peak_rss_mb"] - lo["peak_rss_mb"], 1)
+        print(f"{kind:>5} peak rss {lo['size']} -> {hi['size']} files: {growth:+} MB")
+        if growth > limit_mb:
+            problems.append(f"{kind}: peak rss grew {growth} MB from {lo['size']} to {hi['size']} files (limit {limit_mb})")
+    return problems
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--kinds", default="movie,tv")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="fake TMDB latency per request")
+    ap.add_argument("--rate-limit", type=float, default=0.0, help="fake TMDB requests/sec (0 = unlimited)")
+    ap.add_argument("--empty", action="store_true", help="zero-byte files instead of sparse ones")
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--write-baseline", action="store_true")
+    ap.add_argument("--check", action="store_true", help="exit 1 if a metric regresses past --tolerance")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--check-rss-flat", type=float, metavar="MB",
+                    help="exit 1 if peak RSS grows more than MB between the smallest and largest size")
+    ap.add_argument("--one", nargs=2, metavar=("KIND", "SIZE"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.one:
+        print(json.dumps(run_one(args.one[0], int(args.one[1]), args)))
+        return 0
+
+    sizes = [int(x) for x in args.sizes.split(",") if x]
+    kinds = [k for k in args.kinds.split(",") if k]
+    path = pathlib.Path(args.baseline)
+    if args.check and not args.write_baseline:
+        # Fail before the runs: a case without a baseline would be compared with nothing
+        baseline = json.loads(path.read_text()) if path.exists() else {}
+        missing = [f"{k}-{n}" for n in sizes for k in kinds if f"{k}-{n}" not in baseline]
+        if missing:
+            print(f"no baseline in {path} for: {', '.join(missing)}", file=sys.stderr)
+            print(f"record them first: python scripts/bench_scan.py --sizes {args.sizes} --kinds {args.kinds} "
+                  "--write-baseline", file=sys.stderr)
+            return 1
+
+    passthrough = ["--latency-ms", str(args.latency_ms), "--rate-limit", str(args.rate_limit)]
+    if args.empty:
+        passthrough.append("--empty")
+    results = []
+    for n in sizes:
+        for kind in kinds:
+            out = subprocess.run(
+                [sys.executable, __file__, "--one", kind, str(n), *passthrough],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            results.append(r)
+            print(
+                f"{kind:>5} {n:>7}  {r['files_per_sec']:>8.1f} files/s  "
+                f"tmdb/file={r['tmdb_calls_per_file']:<6} writes/file={r['db_writes_per_file']:<6} "
+                f"rss={r['peak_rss_mb']}MB  ({r['elapsed_s']}s)"
+            )
+
+    status = 0
+    if args.check_rss_flat is not None:
+        for p in rss_growth(results, args.check_rss_flat):
+            print("REGRESSION", p, file=sys.stderr)
+            status = 1
+
+    if args.write_baseline:
+        data = json.loads(path.read_text()) if path.exists() else {}
+        data.update({f"{r['kind']}-{r['size']}": r for r in results})
+        path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+        print(f"baseline written: {path}")
+    if args.check:
+        if not path.exists():
+            print("no baseline to check against", file=sys.stderr)
+            return 1
+        problems = compare(results, json.loads(path.read_text()), args.tolerance)
+        for p in problems:
+            print("REGRESSION", p, file=sys.stderr)
+        return 1 if problems else status
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Serialization cost of list responses, per 1k rows: the old path vs the fast path.
+
+  old: ORM objects -> pydantic model_validate().model_dump() (or hand-built dicts)
+       -> jsonable_encoder -> json.dumps (FastAPI's JSONResponse)
+  new: column select -> dict(zip(keys, row)) -> orjson (lhmm.api.fastjson)
+
+Both paths read the same rows from a throwaway SQLite file, so the numbers
+include row materialisation (ORM identity map vs plain tuples) as well as
+encoding. The query itself is timed separately as "sql".
+
+  python scripts/bench_serialize.py
+  python scripts/bench_serialize.py --rows 5000 --repeat 20
+"""
+import argparse
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+tmp = tempfile.mkdtemp(prefix="lhmm-bench-ser-")
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{tmp}/bench.sqlite3"
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, MediaItem, MediaFile, Series  # noqa: E402
+from lhmm.api.fastjson import rows  # noqa: E402
+from lhmm.api.v1.libraries import LibraryOut  # noqa: E402
+
+
+def seed(n: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path="/mnt/d")
+        db.add(d)
+        db.flush()
+        db.add_all(
+            Library(name=f"Library {i:05d}", type="movie" if i % 2 else "tv", root_disk_id=d.id,
+                    root_subdir=f"lib{i}", settings_json='{"scan_interval_minutes": 60}')
+            for i in range(n)
+        )
+        se = Series(tmdb_id=1, name="Some Show", year=2010)
+        db.add(se)
+        db.flush()
+        items = [
+            MediaItem(kind="episode", tmdb_id=10_000 + i, title=f"Episode title number {i}", year=2010,
+                      series_id=se.id, season=i // 20 + 1, episode=i % 20 + 1)
+            for i in range(n)
+        ]
+        db.add_all(items)
+        db.flush()
+        db.add_all(
+            MediaFile(item_id=mi.id, library_id=1, rel_path=f"Some Show/Season {mi.season:02d}/e{i}.mkv",
+                      size=1_500_000_000 + i)
+            for i, mi in enumerate(items)
+        )
+        db.commit()
+
+
+def libraries_old(db) -> bytes:
+    libs = db.execute(select(Library).order_by(Library.name)).scalars().all()
+    body = {"total": len(libs), "items": [LibraryOut.model_validate(i).model_dump() for i in libs]}
+    return JSONResponse(jsonable_encoder(body)).body
+
+
+def libraries_new(db) -> bytes:
+    cols = select(Library.id, Library.name, Library.type, Library.root_disk_id, Library.root_subdir, Library.settings_json)
+    items = rows(db.execute(cols.order_by(Library.name)))
+    return ORJSONResponse({"total": len(items), "items": items}).body
+
+
+def items_old(db) -> bytes:
+    out = []
+    stmt = (
+        select(MediaFile, MediaItem, Series)
+        .join(MediaItem, MediaFile.item_id == MediaItem.id)
+        .outerjoin(Series, MediaItem.series_id == Series.id)
+        .order_by(MediaFile.created_at.desc())
+    )
+    for mf, mi, se in db.execute(stmt).all():
+        out.append({
+            "file_id": mf.id, "path": mf.rel_path, "size": mf.size, "kind": mi.kind, "title": mi.title,
+            "year": mi.year, "series": se.name if se else None, "season": mi.season, "episode": mi.episode,
+        })
+    return JSONResponse(jsonable_encoder({"total": len(out), "items": out})).body
+
+
+def items_new(db) -> bytes:
+    stmt = (
+        select(MediaFile.id.label("file_id"), MediaFile.rel_path.label("path"), MediaFile.size, MediaItem.kind,
+               MediaItem.title, MediaItem.year, Series.name.label("series"), MediaItem.season, MediaItem.episode)
+        .join(MediaItem, MediaFile.item_id == MediaItem.id)
+        .outerjoin(Series, MediaItem.series_id == Series.id)
+        .order_by(MediaFile.created_at.desc())
+    )
+    items = rows(db.execute(stmt))
+    return ORJSONResponse({"total": len(items), "items": items}).body
+
+
+def sql_only(db, stmt) -> None:
+    db.execute(stmt).all()
+
+
+def bench(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        # Fresh session each run: the old path would otherwise reuse cached ORM objects
+        with SessionLocal() as db:
+            t0 = time.perf_counter()
+            fn(db)
+            best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+    seed(args.rows)
+
+    with SessionLocal() as db:
+        assert json.loads(libraries_old(db)) == json.loads(libraries_new(db))
+        assert json.loads(items_old(db)) == json.loads(items_new(db))
+
+    per_k = 1000 / args.rows
+    sql_libs = select(Library.id, Library.name, Library.type, Library.root_disk_id, Library.root_subdir,
+                      Library.settings_json).order_by(Library.name)
+    sql_items = select(MediaFile.id, MediaFile.rel_path, MediaFile.size, MediaItem.kind, MediaItem.title,
+                       MediaItem.year, Series.name, MediaItem.season, MediaItem.episode) \
+        .join(MediaItem, MediaFile.item_id == MediaItem.id).outerjoin(Series, MediaItem.series_id == Series.id) \
+        .order_by(MediaFile.created_at.desc())
+    results = {}
+    for name, old, new, stmt in (("libraries", libraries_old, libraries_new, sql_libs),
+                                 ("items", items_old, items_new, sql_items)):
+        sql = bench(lambda db: sql_only(db, stmt), args.repeat)
+        t_old = bench(old, args.repeat)
+        t_new = bench(new, args.repeat)
+        results[name] = {
+            "sql_ms_per_1k": round(sql * 1000 * per_k, 2),
+            "old_ms_per_1k": round(t_old * 1000 * per_k, 2),
+            "new_ms_per_1k": round(t_new * 1000 * per_k, 2),
+            "speedup": round(t_old / t_new, 1),
+        }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'endpoint':<10} {'sql':>9} {'old':>9} {'new':>9} {'speedup':>8}   (ms per 1k rows, best of {args.repeat})")
+    for name, r in results.items():
+        print(f"{name:<10} {r['sql_ms_per_1k']:>9} {r['old_ms_per_1k']:>9} {r['new_ms_per_1k']:>9} {r['speedup']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
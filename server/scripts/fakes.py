@@ -0,0 +1,260 @@
+"""Local stand-ins for external services, used by the benchmark and test scripts.
+
+Each fake runs a ThreadingHTTPServer on 127.0.0.1 in a daemon thread so it can be
+started from inside the process under test:
+
+    with FakeTMDB(latency_ms=20, rate_limit=40) as tmdb:
+        os.environ["LHMM__TMDB__BASE_URL"] = tmdb.url
+"""
+from __future__ import annotations
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this keep-alive clients
+    # hit the ~40ms Nagle/delayed-ACK stall on every request.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):  # keep benchmark output clean
+        pass
+
+    def _send(self, status: int, body: bytes, ctype: str = "application/json"):
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up (timeouts are part of what the tests exercise)
+
+    def do_GET(self):
+        fake = self.server.fake  # type: ignore[attr-defined]
+        u = urlparse(self.path)
+        status, body, ctype = fake.handle(u.path, {k: v[0] for k, v in parse_qs(u.query).items()})
+        self._send(status, body, ctype)
+
+
+class FakeServer:
+    """Base class: subclasses implement handle(path, params) -> (status, body, content_type)."""
+
+    def __init__(self, latency_ms: float = 0.0, rate_limit: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.rate_limit = rate_limit  # requests/sec; 0 disables
+        self.calls = 0
+        self.throttled = 0
+        self.down = 0  # answer every request with this status (e.g. 503) to simulate an outage
+        self._lock = threading.Lock()
+        self._tokens = float(rate_limit or 0)
+        self._last = time.monotonic()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self  # type: ignore[attr-defined]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _admit(self) -> bool:
+        # Token bucket; a rejected request is answered with 429 like the real APIs
+        with self._lock:
+            self.calls += 1
+            if not self.rate_limit:
+                return True
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._last) * self.rate_limit)
+            self._last = now
+            if self._tokens < 1.0:
+                self.throttled += 1
+                return False
+            self._tokens -= 1.0
+            return True
+
+    def handle(self, path: str, params: dict) -> tuple[int, bytes, str]:
+        if not self._admit():
+            return 429, b'{"status_message":"rate limited"}', "application/json"
+        if self.latency:
+            time.sleep(self.latency)
+        if self.down:
+            return self.down, b'{"status_message":"unavailable"}', "application/json"
+        return self.respond(path, params)
+
+    def respond(self, path: str, params: dict) -> tuple[int, bytes, str]:
+        raise NotImplementedError
+
+
+def _stable_id(s: str) -> int:
+    return zlib.crc32(s.lower().encode("utf-8")) % 10_000_000 + 1
+
+
+class FakeTMDB(FakeServer):
+    """Answers /search/movie and /search/tv with one deterministic hit per query
+    (none for queries containing a `no_match` word), /movie/<id> and /tv/<id> with a
+    generated record, and serves image bytes under /t/p/<size>/<file> (image_bytes
+    per file)."""
+
+    image_bytes = 300_000
+    no_match: tuple[str, ...] = ()
+
+    def respond(self, path, params):
+        if path.startswith("/t/p/"):
+            parts = path.split("/")
+            if len(parts) != 5 or parts[4].startswith("missing"):
+                return 404, b"", "text/plain"
+            seed = f"{parts[3]}/{parts[4]}".encode()
+            return 200, (seed * (self.image_bytes // len(seed) + 1))[: self.image_bytes], "image/jpeg"
+        kind, _, tid = path.strip("/").partition("/")
+        if kind in ("movie", "tv") and tid.isdigit():
+            tid = int(tid)
+            rec = ({"id": tid, "title": f"Movie {tid}", "release_date": "1999-03-31"} if kind == "movie"
+                   else {"id": tid, "name": f"Show {tid}", "first_air_date": "2011-04-17"})
+            return 200, json.dumps({**rec, "poster_path": f"/p{tid}.jpg", "backdrop_path": f"/b{tid}.jpg"}).encode(), "application/json"
+        q = (params.get("query") or "").strip()
+        if not q or any(w in q.lower() for w in self.no_match):
+            return 200, b'{"results": []}', "application/json"
+        tid = _stable_id(q)
+        if path.endswith("/search/movie"):
+            year = params.get("year") or "2000"
+            hit = {"id": tid, "title": q, "release_date": f"{year}-01-01", "popularity": 10.0,
+                   "poster_path": f"/p{tid}.jpg", "backdrop_path": f"/b{tid}.jpg"}
+        elif path.endswith("/search/tv"):
+            hit = {"id": tid, "name": q, "first_air_date": "2010-01-01", "popularity": 10.0,
+                   "poster_path": f"/p{tid}.jpg", "backdrop_path": f"/b{tid}.jpg"}
+        else:
+            return 404, b'{"status_message":"not found"}', "application/json"
+        return 200, json.dumps({"page": 1, "results": [hit], "total_results": 1}).encode(), "application/json"
+
+
+class FakeSab(FakeServer):
+    """SABnzbd API subset: version, queue and paged history (newest first).
+
+    Tests mutate `slots` (index 0 = newest) between calls; `history_pages` counts
+    history requests so callers can assert how much paging a sync needed.
+    """
+
+    def __init__(self, api_key: str = "sabkey", **kw):
+        super().__init__(**kw)
+        self.api_key = api_key
+        self.slots: list[dict] = []
+        self.queue_slots: list[dict] = []
+        self.history_pages = 0
+
+    def add_history(self, nzo_id: str, name: str, category: str = "movies",
+                    status: str = "Completed", storage: str | None = None, completed: int | None = None) -> dict:
+        slot = {"nzo_id": nzo_id, "name": name, "category": category, "status": status,
+                "completed": completed or int(time.time()), "bytes": 1_000_000,
+                "storage": storage, "fail_message": ""}
+        with self._lock:
+            self.slots.insert(0, slot)
+        return slot
+
+    def respond(self, path, params):
+        if params.get("apikey") != self.api_key:
+            return 200, b'{"status": false, "error": "API Key Incorrect"}', "application/json"
+        mode = params.get("mode")
+        if mode == "version":
+            body = {"version": "4.3.2"}
+        elif mode == "queue":
+            body = {"queue": {"status": "Idle", "slots": list(self.queue_slots), "noofslots": len(self.queue_slots)}}
+        elif mode == "history":
+            start, limit = int(params.get("start") or 0), int(params.get("limit") or 50)
+            with self._lock:
+                self.history_pages += 1
+                page = self.slots[start:start + limit]
+                total = len(self.slots)
+            body = {"history": {"slots": page, "noofslots": total}}
+        else:
+            return 200, b'{"status": false, "error": "not implemented"}', "application/json"
+        return 200, json.dumps(body).encode(), "application/json"
+
+
+class FakeNewznab(FakeServer):
+    """Newznab API subset (t=caps/search/movie/tvsearch) returning RSS.
+
+    Results are derived from the query, so two instances return overlapping
+    releases (for dedupe tests); `unique` adds releases only this instance has.
+    `requests` records each request's params.
+    """
+
+    def __init__(self, name: str = "fake", api_key: str = "nzbkey", per_query: int = 5,
+                 unique: int = 0, **kw):
+        super().__init__(**kw)
+        self.name = name
+        self.api_key = api_key
+        self.per_query = per_query
+        self.unique = unique
+        self.requests: list[dict] = []
+        self.rss_items: list[dict] = []  # served for t=search without q (RSS feed), newest first
+
+    @staticmethod
+    def item_xml(title: str, guid: str, size: int, pub: str, cat: str = "2000") -> str:
+        from xml.sax.saxutils import escape
+        return (
+            f"<item><title>{escape(title)}</title><guid isPermaLink=\"false\">{escape(guid)}</guid>"
+            f"<link>http://example.invalid/get/{escape(guid)}</link><pubDate>{pub}</pubDate>"
+            f"<enclosure url=\"http://example.invalid/get/{escape(guid)}.nzb\" length=\"{size}\" type=\"application/x-nzb\"/>"
+            f"<newznab:attr name=\"category\" value=\"{cat}\"/><newznab:attr name=\"size\" value=\"{size}\"/>"
+            f"</item>"
+        )
+
+    def _feed(self, items: list[str]) -> bytes:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<rss version="2.0" xmlns:newznab="http://www.newznab.com/DTD/2010/feeds/attributes/">'
+            f"<channel><title>{self.name}</title>" + "".join(items) + "</channel></rss>"
+        ).encode()
+
+    def respond(self, path, params):
+        with self._lock:
+            self.requests.append(dict(params))
+        if params.get("apikey") != self.api_key:
+            return 200, b'<?xml version="1.0"?><error code="100" description="Incorrect user credentials"/>', "application/xml"
+        t = params.get("t")
+        if t == "caps":
+            return 200, (
+                b'<?xml version="1.0"?><caps><limits max="100" default="50"/><searching>'
+                b'<search available="yes" supportedParams="q"/>'
+                b'<tv-search available="yes" supportedParams="q,season,ep"/>'
+                b'<movie-search available="yes" supportedParams="q,imdbid"/>'
+                b'</searching></caps>'
+            ), "application/xml"
+        q = params.get("q") or ""
+        if t == "search" and not q and not params.get("imdbid"):
+            items = [self.item_xml(i["title"], i["guid"], i["size"], i["pub"], i.get("cat", "2000")) for i in self.rss_items]
+            return 200, self._feed(items), "application/xml"
+        base = q or f"tt{params.get('imdbid')}"
+        if params.get("season"):
+            base += f" S{int(params['season']):02d}" + (f"E{int(params['ep']):02d}" if params.get("ep") else "")
+        dot = ".".join(base.split())
+        pub = "Mon, 01 Jan 2024 00:00:00 +0000"
+        items = [
+            self.item_xml(f"{dot}.1080p.WEB-GRP{i}", f"{dot}-{i}", 1_000_000_000 + i * 1000, pub)
+            for i in range(self.per_query)
+        ]
+        items += [
+            self.item_xml(f"{dot}.2160p.{self.name}-U{i}", f"{self.name}-{dot}-u{i}", 5_000_000_000 + i, pub)
+            for i in range(self.unique)
+        ]
+        return 200, self._feed(items[: int(params.get("limit") or 100)]), "application/xml"
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""HTTP load test for the API against a large seeded SQLite database.
+
+Seeds disks, libraries, series/items and hundreds of thousands of media_files,
+then drives a weighted mix of concurrent requests and reports throughput and
+latency percentiles per endpoint. /tmdb/search is served by scripts/fakes.FakeTMDB.
+
+  python scripts/loadtest_api.py                                  # in-process (ASGI transport)
+  python scripts/loadtest_api.py --mode uvicorn --workers 4       # real uvicorn over TCP
+  python scripts/loadtest_api.py --files 500000 --concurrency 64 --duration 30
+  python scripts/loadtest_api.py --db /tmp/lt.sqlite3 --reuse     # skip seeding on later runs
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+sys.path.insert(0, str(HERE.parent))
+
+# (name, weight, path template)
+MIX = [
+    ("libraries", 15, "/api/v1/libraries?page={page}"),
+    ("items", 45, "/api/v1/libraries/{lib}/items?limit=50&offset={offset}"),
+    ("scans", 20, "/api/v1/libraries/{lib}/scans"),
+    ("config", 10, "/api/v1/system/config"),
+    ("tmdb_search", 10, "/api/v1/tmdb/search?q={q}"),
+]
+
+
+def seed(db_path: str, disks: int, libraries: int, files: int, seed_: int = 7) -> dict:
+    """Bulk-load rows with executemany; going through the ORM would take longer than the test."""
+    from lhmm.db.base import Base
+    from sqlalchemy import create_engine
+
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{db_path}"))
+    rng = random.Random(seed_)
+    now = int(time.time())
+    cx = sqlite3.connect(db_path)
+    cx.execute("PRAGMA journal_mode=WAL")
+    cx.execute("PRAGMA synchronous=OFF")
+    cur = cx.cursor()
+    cur.executemany(
+        "INSERT INTO disks(id, name, mount_path) VALUES (?, ?, ?)",
+        [(d, f"disk{d}", f"/mnt/disk{d}") for d in range(1, disks + 1)],
+    )
+    libs = []
+    for li in range(1, libraries + 1):
+        kind = "movie" if li % 2 else "tv"
+        libs.append((li, f"lib{li:03d}", kind, rng.randint(1, disks), "Movies" if kind == "movie" else "TV", "{}"))
+    cur.executemany(
+        "INSERT INTO libraries(id, name, type, root_disk_id, root_subdir, settings_json) VALUES (?, ?, ?, ?, ?, ?)",
+        libs,
+    )
+    n_series = max(1, files // 200)
+    cur.executemany(
+        "INSERT INTO series(id, tmdb_id, name, year) VALUES (?, ?, ?, ?)",
+        [(s, 900000 + s, f"Show {s}", 1990 + s % 30) for s in range(1, n_series + 1)],
+    )
+    item_rows, file_rows = [], []
+    for f in range(1, files + 1):
+        li = libs[f % libraries]
+        if li[2] == "movie":
+            item_rows.append((f, "movie", 100000 + f, f"Movie {f}", 1970 + f % 50, None, None, None, now))
+            rel = f"Movie {f} ({1970 + f % 50})/Movie.{f}.1080p.mkv"
+        else:
+            s = 1 + f % n_series
+            se, ep = 1 + (f // 20) % 8, 1 + f % 20
+            item_rows.append((f, "episode", 900000 + s, f"Show {s}", None, s, se, ep + f * 100, now))
+            rel = f"Show {s}/Season {se:02d}/Show.{s}.S{se:02d}E{ep:02d}.{f}.mkv"
+        file_rows.append((f, f, li[0], rel, rng.randint(700, 8000) * 1_000_000, now, "{}", now - f))
+        if len(file_rows) >= 50_000:
+            _flush(cur, item_rows, file_rows)
+    _flush(cur, item_rows, file_rows)
+    stats = json.dumps({"files": 1000, "movies": 600, "episodes": 400, "matched": 990, "skipped": 10})
+    cur.executemany(
+        "INSERT INTO library_scans(library_id, started_at, finished_at, status, stats_json) VALUES (?, ?, ?, ?, ?)",
+        [(li[0], now - k * 3600, now - k * 3600 + 60, "succeeded", stats) for li in libs for k in range(20)],
+    )
+    cx.commit()
+    cx.close()
+    return {"disks": disks, "libraries": libraries, "files": files, "series": n_series}
+
+
+def _flush(cur, item_rows, file_rows):
+    cur.executemany(
+        "INSERT INTO media_items(id, kind, tmdb_id, title, year, series_id, season, episode, added_at)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        item_rows,
+    )
+    cur.executemany(
+        "INSERT INTO media_files(id, item_id, library_id, rel_path, size, mtime, quality_json, created_at)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        file_rows,
+    )
+    item_rows.clear()
+    file_rows.clear()
+
+
+def _pct(xs: list[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    return xs[min(len(xs) - 1, int(p * len(xs)))]
+
+
+async def drive(client, libraries: int, files: int, concurrency: int, duration: float) -> dict:
+    names = [m[0] for m in MIX]
+    weights = [m[1] for m in MIX]
+    paths = {m[0]: m[2] for m in MIX}
+    lat: dict[str, list[float]] = {n: [] for n in names}
+    errors: dict[str, int] = {n: 0 for n in names}
+    per_lib = max(1, files // libraries)
+    deadline = time.perf_counter() + duration
+
+    async def worker(wid: int):
+        rng = random.Random(wid)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            url = paths[name].format(
+                page=1 + rng.randint(0, 1),
+                lib=rng.randint(1, libraries),
+                offset=rng.randint(0, max(0, per_lib - 50)),
+                q=rng.choice(["dune", "alien", "office", "lost", "heat", "fargo"]),
+            )
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(url)
+                ok = r.status_code < 400
+            except Exception:
+                ok = False
+            lat[name].append(time.perf_counter() - t0)
+            if not ok:
+                errors[name] += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    wall = time.perf_counter() - t0
+    report = {}
+    for n in names:
+        xs = sorted(lat[n])
+        report[n] = {
+            "requests": len(xs),
+            "errors": errors[n],
+            "rps": round(len(xs) / wall, 1),
+            "p50_ms": round(_pct(xs, 0.50) * 1000, 1),
+            "p95_ms": round(_pct(xs, 0.95) * 1000, 1),
+            "p99_ms": round(_pct(xs, 0.99) * 1000, 1),
+            "max_ms": round((xs[-1] if xs else 0) * 1000, 1),
+        }
+    total = sum(v["requests"] for v in report.values())
+    report["_total"] = {"requests": total, "rps": round(total / wall, 1), "wall_s": round(wall, 1)}
+    return report
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_inproc(args) -> dict:
+    import httpx
+    from lhmm.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        return await drive(client, args.libraries, args.files, args.concurrency, args.duration)
+
+
+async def run_uvicorn(args) -> dict:
+    import httpx
+
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "lhmm.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=str(HERE.parent), env=os.environ.copy(),
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base, timeout=60, limits=limits) as client:
+            for _ in range(200):
+                try:
+                    if (await client.get("/api/v1/healthz")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise SystemExit("uvicorn did not come up")
+            return await drive(client, args.libraries, args.files, args.concurrency, args.duration)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mode", choices=["inproc", "uvicorn", "both"], default="inproc")
+    ap.add_argument("--workers", type=int, default=4, help="uvicorn worker processes")
+    ap.add_argument("--disks", type=int, default=8)
+    ap.add_argument("--libraries", type=int, default=40)
+    ap.add_argument("--files", type=int, default=300_000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds per mode")
+    ap.add_argument("--tmdb-latency-ms", type=float, default=30.0)
+    ap.add_argument("--db", help="sqlite path (default: temp file)")
+    ap.add_argument("--reuse", action="store_true", help="reuse an already seeded --db")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args()
+
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="lhmm-load-"))
+    db_path = args.db or str(tmp / "load.sqlite3")
+
+    from fakes import FakeTMDB
+
+    tmdb = FakeTMDB(latency_ms=args.tmdb_latency_ms).start()
+    os.environ.update({
+        "LHMM_CONFIG_DIR": str(tmp / "config"),
+        "LHMM__DB__URL": f"sqlite:///{db_path}",
+        "LHMM__LOGGING__FILE": str(tmp / "lhmm.log"),
+        "LHMM__LOGGING__LEVEL": "WARNING",
+        "LHMM__TMDB__API_KEY": "load",
+        "LHMM__TMDB__BASE_URL": tmdb.url,
+    })
+
+    if not (args.reuse and os.path.exists(db_path)):
+        t0 = time.perf_counter()
+        info = seed(db_path, args.disks, args.libraries, args.files)
+        print(f"seeded {info} in {time.perf_counter() - t0:.1f}s -> {db_path}", file=sys.stderr)
+
+    results = {}
+    try:
+        if args.mode in ("inproc", "both"):
+            results["inproc"] = asyncio.run(run_inproc(args))
+        if args.mode in ("uvicorn", "both"):
+            results[f"uvicorn-w{args.workers}"] = asyncio.run(run_uvicorn(args))
+    finally:
+        tmdb.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    for mode, rep in results.items():
+        tot = rep.pop("_total")
+        print(f"\n== {mode}: {tot['requests']} requests, {tot['rps']} req/s over {tot['wall_s']}s")
+        print(f"{'endpoint':<12} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+        for name, r in rep.items():
+            print(
+                f"{name:<12} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8} "
+                f"{r['p50_ms']:>7}ms {r['p95_ms']:>7}ms {r['p99_ms']:>7}ms {r['max_ms']:>7}ms"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
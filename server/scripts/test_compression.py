@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""The compression middleware honours Accept-Encoding q-values (q=0 refuses a
+coding, * covers the rest) and marks every compressible response with
+Vary: Accept-Encoding, whether or not it was compressed."""
+import pathlib, sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.responses import JSONResponse, Response  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+from lhmm.api.compression import CompressionMiddleware, brotli, choose_encoding  # noqa: E402
+
+BIG = {"items": ["x" * 40] * 100}
+
+
+def main() -> None:
+    best = "br" if brotli is not None else "gzip"
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("gzip;q=0") is None and choose_encoding("GZIP; Q=0.0") is None
+    assert choose_encoding("gzip;q=0, *;q=0.5") == ("br" if brotli is not None else None)
+    assert choose_encoding("*") == best and choose_encoding("identity") is None and choose_encoding("") is None
+    assert choose_encoding("br;q=0.2, gzip;q=0.8") == "gzip"
+    assert choose_encoding("gzip;q=0.5, br") == best
+    assert choose_encoding("gzip;q=abc") is None
+
+    app = Starlette(routes=[
+        Route("/big", lambda r: JSONResponse(BIG)),
+        Route("/small", lambda r: JSONResponse({"ok": True})),
+        Route("/png", lambda r: Response(b"\0" * 4000, media_type="image/png")),
+    ])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    client = TestClient(app)
+
+    def get(path: str, accept: str):
+        return client.get(path, headers={"Accept-Encoding": accept})
+
+    r = get("/big", "gzip")
+    assert r.headers["content-encoding"] == "gzip" and r.headers["vary"] == "Accept-Encoding", r.headers
+    assert r.json() == BIG
+
+    for path, accept in (("/big", "gzip;q=0"), ("/big", "identity"), ("/small", "gzip")):
+        r = get(path, accept)
+        assert "content-encoding" not in r.headers and r.headers["vary"] == "Accept-Encoding", (path, accept, r.headers)
+    r = get("/png", "gzip")
+    assert "content-encoding" not in r.headers and "vary" not in r.headers, r.headers
+
+
+if __name__ == "__main__":
+    main()
+    print("OK")
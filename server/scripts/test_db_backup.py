@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Online backups: a backup taken while another thread keeps writing is consistent
+and does not stall the writer, gzip backups verify and restore, retention keeps the
+newest N, restore refuses a different schema revision unless forced and leaves a
+pre-restore backup, and the /db/backups endpoints expose all of it."""
+import gzip, os, pathlib, shutil, sys, tempfile, threading, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+db_path = ROOT / "test_db_backup.sqlite3"
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{db_path}"
+backups = pathlib.Path(tempfile.mkdtemp(prefix="lhmm-backups-"))
+os.environ["LHMM__DB__BACKUP__DIR"] = str(backups)
+
+from sqlalchemy import text  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Job  # noqa: E402
+from lhmm.settings import settings  # noqa: E402
+from lhmm.services import db_backup  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+def seed() -> None:
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO alembic_version VALUES ('rev1')"))
+    with SessionLocal() as db:
+        db.add(Disk(name="keep-me", mount_path="/mnt/a"))
+        db.add_all(Job(type="filler", status="done", payload_json="x" * 500) for _ in range(5000))
+        db.commit()
+
+
+def epoch() -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT gen FROM generations WHERE scope = 'epoch'")).scalar()
+
+
+def check_online_backup() -> None:
+    # Small steps with a pause: a writer commits between steps while the backup runs
+    settings.db.backup.pages_per_step = 20
+    settings.db.backup.step_sleep_ms = 5
+    stop = threading.Event()
+    writes = []
+
+    def writer():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            with SessionLocal() as db:
+                db.add(Job(type="writer", status="done", payload_json="w" * 200))
+                db.commit()
+            writes.append((time.perf_counter(), time.perf_counter() - t0))
+            time.sleep(0.002)
+
+    th = threading.Thread(target=writer)
+    th.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    b = db_backup.create_backup("manual", compress=False)
+    ended = time.perf_counter()
+    stop.set()
+    th.join()
+    during = [d for t, d in writes if started <= t <= ended]
+    assert b["steps"] > 10 and during, (b, len(during))
+    assert max(during) < 1.0, max(during)  # writers are never held up for the whole backup
+    v = db_backup.verify_backup(b["name"])
+    assert v["ok"] and v["alembic_version"] == "rev1", v
+    assert not b["compressed"] and (backups / b["name"]).stat().st_size == b["db_bytes"]
+    assert not list(backups.glob(".*")), list(backups.iterdir())  # no partial files left behind
+
+
+def check_gzip_restore() -> None:
+    settings.db.backup.pages_per_step = 1024
+    b = db_backup.create_backup("manual", compress=True)
+    assert b["compressed"] and b["bytes"] < b["db_bytes"] / 3, b
+    with gzip.open(backups / b["name"]) as f:
+        assert f.read(16) == b"SQLite format 3\0"
+    before = epoch()
+
+    with SessionLocal() as db:
+        db.query(Disk).delete()
+        db.commit()
+    r = db_backup.restore_backup(b["name"])
+    assert r["pre_restore_backup"].endswith("-pre-restore.sqlite3.gz"), r
+    with SessionLocal() as db:
+        assert [d.name for d in db.query(Disk)] == ["keep-me"]
+    assert epoch() != before  # ETags issued before the restore are not reused
+    assert db_backup.verify_backup(r["pre_restore_backup"])["ok"]
+
+    # A different schema revision needs force
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE alembic_version SET version_num = 'rev2'"))
+    try:
+        db_backup.restore_backup(b["name"])
+        raise AssertionError("restore across revisions should be refused")
+    except db_backup.BackupError as e:
+        assert "revision" in str(e)
+    db_backup.restore_backup(b["name"], force=True)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == "rev1"
+
+    # A damaged backup fails verification and is never restored
+    bad = backups / b["name"].replace("-manual", "-broken")
+    data = (backups / b["name"]).read_bytes()
+    bad.write_bytes(data[: len(data) // 2])
+    assert not db_backup.verify_backup(bad.name)["ok"]
+    try:
+        db_backup.restore_backup(bad.name)
+        raise AssertionError("a truncated backup must not restore")
+    except (EOFError, OSError, db_backup.BackupError):
+        pass
+    bad.unlink()
+
+
+def check_retention() -> None:
+    settings.db.backup.keep = 3
+    for _ in range(3):
+        db_backup.create_backup("scheduled")
+    names = [b["name"] for b in db_backup.list_backups()]
+    assert len(names) == 3 and all("-scheduled" in n for n in names), names
+
+
+def check_api() -> None:
+    from fastapi.testclient import TestClient
+    from lhmm.main import app
+    with TestClient(app) as client:
+        r = client.post("/api/v1/db/backups", params={"compress": "false"})
+        assert r.status_code == 201, r.text
+        name = r.json()["name"]
+        listed = client.get("/api/v1/db/backups").json()["backups"]
+        assert listed[0]["name"] == name
+        assert client.post(f"/api/v1/db/backups/{name}/verify").json()["ok"]
+        body = client.get(f"/api/v1/db/backups/{name}").content
+        assert body == (backups / name).read_bytes()
+        assert client.get("/api/v1/db/backups/..%2Flhmm.sqlite3").status_code in (400, 404)
+        assert client.get("/api/v1/db/backups/lhmm-20200101-000000-manual.sqlite3").status_code == 404
+        assert client.delete(f"/api/v1/db/backups/{name}").status_code == 204
+        assert not (backups / name).exists()
+
+
+if __name__ == "__main__":
+    try:
+        seed()
+        check_online_backup()
+        check_gzip_restore()
+        check_retention()
+        check_api()
+        print("OK")
+    finally:
+        shutil.rmtree(backups, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
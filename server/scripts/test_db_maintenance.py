@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Scheduled SQLite maintenance: a fragmented database is rewritten into
+auto_vacuum=incremental and shrinks, later free pages are released incrementally,
+the WAL is truncated once it passes the threshold (even while scans run), a finished
+scan triggers an ANALYZE pass, and /db/stats reports it all."""
+import os, pathlib, sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+db_path = ROOT / "test_db_maintenance.sqlite3"
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{db_path}"
+
+from sqlalchemy import delete  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Job  # noqa: E402
+from lhmm.settings import settings  # noqa: E402
+from lhmm.services import db_maintenance as dm  # noqa: E402
+from lhmm.services.scan_scheduler import scan_scheduler  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+def churn(rows: int = 3000) -> None:
+    # Fill then empty the jobs table, leaving its pages on the freelist
+    with SessionLocal() as db:
+        db.add_all(Job(type="filler", status="done", payload_json="x" * 2000) for _ in range(rows))
+        db.commit()
+        db.execute(delete(Job).where(Job.type == "filler"))
+        db.commit()
+    dm.checkpoint("test")
+
+
+def main() -> None:
+    churn()
+    st = dm.stats()
+    assert st["auto_vacuum"] == "none" and st["fragmentation"] > 0.5, st
+    size = st["db_bytes"]
+
+    # Idle pass: fragmented beyond vacuum_free_ratio -> one-off VACUUM into incremental mode
+    r = dm.run_maintenance("idle")
+    assert "vacuum" in r["steps"] and "optimize" in r["steps"], r
+    assert "analyze" in r["steps"]  # never analyzed before
+    st = dm.stats()
+    assert st["auto_vacuum"] == "incremental" and st["freelist_count"] == 0, st
+    assert st["db_bytes"] < size / 4 and r["checkpoint"]["wal_bytes_after"] == 0 and st["analyzed"], (size, st)
+
+    # From now on free pages go back through incremental_vacuum, not a rewrite
+    churn()
+    freed = dm.stats()["freelist_count"]
+    settings.db.maintenance.incremental_vacuum_pages = 100
+    r = dm.run_maintenance("idle", analyze=False)
+    assert "vacuum" not in r["steps"] and "incremental_vacuum" in r["steps"], r
+    assert r["freelist_after"] == freed - 100, (freed, r)
+    settings.db.maintenance.incremental_vacuum_pages = 0
+    r = dm.run_maintenance("idle", analyze=False)
+    assert r["freelist_after"] == 0, r
+
+    # WAL over the threshold is checkpointed even while a scan is running; no full pass then
+    settings.db.maintenance.wal_checkpoint_mb = 1
+    with SessionLocal() as db:
+        db.add_all(Job(type="filler", status="done", payload_json="y" * 2000) for _ in range(1500))
+        db.commit()
+    assert dm.wal_bytes() > 1024 * 1024
+    dm.note_scan_finished()
+    with scan_scheduler._lock:
+        scan_scheduler._queued.add(-1)
+    try:
+        assert dm.maintenance_tick() is None
+    finally:
+        with scan_scheduler._lock:
+            scan_scheduler._queued.discard(-1)
+    assert dm.wal_bytes() == 0
+
+    # Once idle, the finished scan gets its pass (with ANALYZE); then nothing is due
+    r = dm.maintenance_tick()
+    assert r and r["reason"] == "post-scan" and "analyze" in r["steps"], r
+    assert dm.maintenance_tick() is None
+
+    runs = dm.stats()["last_runs"]
+    assert [x["reason"] for x in runs[:2]] == ["post-scan", "idle"], runs
+
+    from fastapi.testclient import TestClient
+    from lhmm.main import app
+    with TestClient(app) as client:
+        body = client.get("/api/v1/db/stats").json()
+        assert body["journal_mode"] == "wal" and "fragmentation" in body and body["last_runs"], body
+        r = client.post("/api/v1/db/maintenance").json()
+        assert r["reason"] == "manual" and "analyze" in r["steps"], r
+
+
+if __name__ == "__main__":
+    try:
+        main()
+        print("OK")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
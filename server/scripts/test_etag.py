@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""List endpoints answer If-None-Match with 304 (one counter lookup, no list query)
+until a write bumps the relevant generation; large JSON bodies are compressed and
+event streams are not."""
+import os, asyncio, pathlib, sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+db_path = ROOT / "test_etag.sqlite3"
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{db_path}"
+
+from sqlalchemy import event  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, MediaItem, MediaFile, LibraryScan  # noqa: E402
+from lhmm.main import app  # noqa: E402
+import httpx  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+statements: list[str] = []
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _log(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+
+async def revalidate(client, url: str) -> tuple[int, str]:
+    r = await client.get(url)
+    assert r.status_code == 200 and r.headers["etag"].startswith('W/"'), (url, r.status_code, r.headers)
+    statements.clear()
+    r2 = await client.get(url, headers={"If-None-Match": r.headers["etag"]})
+    assert r2.status_code == 304 and r2.content == b"", (url, r2.status_code)
+    assert not any("media_files" in s or "library_scans" in s or "FROM disks" in s for s in statements), statements
+    # At most the library's own primary-key existence check, never the list query
+    assert all("libraries.id = ?" in s for s in statements if "FROM libraries" in s), statements
+    return r2.status_code, r.headers["etag"]
+
+
+async def run():
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path="/tmp")
+        db.add(d)
+        db.flush()
+        a = Library(name="a", type="movie", root_disk_id=d.id, root_subdir="a")
+        b = Library(name="b", type="movie", root_disk_id=d.id, root_subdir="b")
+        db.add_all([a, b])
+        db.flush()
+        for i in range(200):
+            mi = MediaItem(kind="movie", tmdb_id=i, title=f"Movie number {i}", year=2000)
+            db.add(mi)
+            db.flush()
+            db.add(MediaFile(item_id=mi.id, library_id=a.id, rel_path=f"Movie number {i}/m{i}.mkv", size=i))
+        db.commit()
+        a_id, b_id = a.id, b.id
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        urls = ["/api/v1/disks", "/api/v1/libraries", f"/api/v1/libraries/{a_id}/items",
+                f"/api/v1/libraries/{b_id}/items", f"/api/v1/libraries/{a_id}/scans"]
+        tags = {u: (await revalidate(client, u))[1] for u in urls}
+
+        # A new file in library b changes b's items ETag only
+        with SessionLocal() as db:
+            mi = db.get(MediaItem, 1)
+            db.add(MediaFile(item_id=mi.id, library_id=b_id, rel_path="x.mkv", size=1))
+            db.add(LibraryScan(library_id=a_id, status="running"))
+            db.commit()
+        changed = {u for u in urls if (await client.get(u, headers={"If-None-Match": tags[u]})).status_code == 200}
+        assert changed == {f"/api/v1/libraries/{b_id}/items", f"/api/v1/libraries/{a_id}/scans"}, changed
+
+        # Renaming an item changes item lists (titles are shown there)
+        with SessionLocal() as db:
+            db.get(MediaItem, 2).title = "Renamed"
+            db.commit()
+        r = await client.get(f"/api/v1/libraries/{a_id}/items", headers={"If-None-Match": tags[f"/api/v1/libraries/{a_id}/items"]})
+        assert r.status_code == 200
+
+        # API writes bump too
+        r = await client.put(f"/api/v1/libraries/{a_id}", json={"name": "a2", "type": "movie", "root_disk_id": 1, "root_subdir": "a"})
+        assert r.status_code == 200, r.text
+        assert (await client.get("/api/v1/libraries", headers={"If-None-Match": tags["/api/v1/libraries"]})).status_code == 200
+
+        # A deleted or unknown library is 404 even with a matching or wildcard ETag
+        c = (await client.post("/api/v1/libraries", json={"name": "c", "type": "movie", "root_disk_id": 1, "root_subdir": "c"})).json()
+        for kind in ("items", "scans"):
+            url = f"/api/v1/libraries/{c['id']}/{kind}"
+            tags[url] = (await revalidate(client, url))[1]
+        assert (await client.delete(f"/api/v1/libraries/{c['id']}")).status_code == 204
+        for kind in ("items", "scans"):
+            url = f"/api/v1/libraries/{c['id']}/{kind}"
+            assert (await client.get(url, headers={"If-None-Match": tags[url]})).status_code == 404, url
+            assert (await client.get(f"/api/v1/libraries/999999/{kind}", headers={"If-None-Match": "*"})).status_code == 404
+
+        # Compression: big JSON is gzipped, small is not
+        r = await client.get(f"/api/v1/libraries/{a_id}/items?limit=200", headers={"Accept-Encoding": "gzip"})
+        assert r.headers.get("content-encoding") in ("gzip", "br") and len(r.json()["items"]) == 200, r.headers
+        assert int(r.headers["content-length"]) < len(r.content) / 3
+        r = await client.get("/api/v1/healthz", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in r.headers
+    print("OK")
+
+
+if __name__ == "main" or __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
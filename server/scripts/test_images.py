@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Image proxy: first request downloads once (concurrent callers share it), later
+ones come from disk with ETag/immutable caching, the cache stays under its size
+cap by LRU, and prewarm fetches every poster/backdrop of a library."""
+import os, asyncio, pathlib, sys, tempfile
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_images.sqlite3"
+cfg_dir = tempfile.mkdtemp(prefix="lhmm-images-")
+
+from fakes import FakeTMDB  # noqa: E402
+
+tmdb = FakeTMDB().start()
+os.environ.update({
+    "LHMM__DB__URL": f"sqlite+pysqlite:///{db_path}",
+    "LHMM_CONFIG_DIR": cfg_dir,
+    "LHMM__TMDB__IMAGE_BASE_URL": f"{tmdb.url}/t/p/",
+    "LHMM__CACHE__IMAGES_MAX_MB": "1",
+})
+
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, MediaItem, MediaFile  # noqa: E402
+from lhmm.services import images  # noqa: E402
+from lhmm.services.images import cache  # noqa: E402
+from lhmm.main import app  # noqa: E402
+import httpx  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+async def run():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        rs = await asyncio.gather(*[client.get("/api/v1/images/w342/abc.jpg") for _ in range(5)])
+        assert all(r.status_code == 200 and len(r.content) == FakeTMDB.image_bytes for r in rs)
+        assert tmdb.calls == 1, tmdb.calls
+        r = rs[0]
+        assert "immutable" in r.headers["cache-control"] and r.headers["etag"]
+        r2 = await client.get("/api/v1/images/w342/abc.jpg", headers={"If-None-Match": r.headers["etag"]})
+        assert r2.status_code == 304 and tmdb.calls == 1
+
+        assert (await client.get("/api/v1/images/w342/missing.jpg")).status_code == 404
+        assert (await client.get("/api/v1/images/w9999/abc.jpg")).status_code == 404
+        assert (await client.get("/api/v1/images/w342/..%2Fsecret.jpg")).status_code == 404
+
+        # Size names come from TMDB's cached image config, parsed once per file version
+        assert images.allowed_sizes() is images.allowed_sizes()
+        images.TMDB_CFG_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        images.TMDB_CFG_CACHE.write_text('{"poster_sizes": ["w9999"]}', "utf-8")
+        assert images.valid("w9999", "abc.jpg") and images.allowed_sizes() is images.allowed_sizes()
+        images.TMDB_CFG_CACHE.write_text('{"poster_sizes": ["w8888", "w7777"]}', "utf-8")
+        assert not images.valid("w9999", "abc.jpg") and images.valid("w7777", "abc.jpg")
+        images.TMDB_CFG_CACHE.unlink()
+        assert not images.valid("w7777", "abc.jpg") and images.valid("w342", "abc.jpg")
+
+        # 1 MiB cap with 300 KB images: at most 3 stay; the most recently used survive
+        for n in ("b1", "b2"):
+            await client.get(f"/api/v1/images/w342/{n}.jpg")
+        await client.get("/api/v1/images/w342/abc.jpg")  # touch: abc is now newest
+        await client.get("/api/v1/images/w342/b3.jpg")
+        st = (await client.get("/api/v1/images/stats")).json()
+        assert st["files"] == 3 and st["bytes"] <= st["max_bytes"], st
+        left = sorted(p.name for p in (pathlib.Path(cfg_dir) / "cache" / "images" / "w342").iterdir())
+        assert left == ["abc.jpg", "b2.jpg", "b3.jpg"], left
+
+        with SessionLocal() as db:
+            d = Disk(name="d", mount_path="/tmp")
+            db.add(d)
+            db.flush()
+            li = Library(name="m", type="movie", root_disk_id=d.id, root_subdir="m")
+            db.add(li)
+            db.flush()
+            for i in range(3):
+                mi = MediaItem(kind="movie", tmdb_id=i, title=f"M{i}", poster_path=f"/p{i}.jpg", backdrop_path=f"/k{i}.jpg")
+                db.add(mi)
+                db.flush()
+                db.add(MediaFile(item_id=mi.id, library_id=li.id, rel_path=f"m{i}.mkv", size=1))
+            db.add(MediaItem(kind="movie", tmdb_id=99, title="no file", poster_path="/orphan.jpg"))
+            db.commit()
+            lib_id = li.id
+        cache.max_bytes = 100 * 1024 * 1024
+        calls = tmdb.calls
+        job = (await client.post("/api/v1/images/prewarm", params={"library_id": lib_id, "sizes": ["w92", "w342"]})).json()
+        for _ in range(100):
+            st = (await client.get(f"/api/v1/images/prewarm/{job['job_id']}")).json()
+            if st["status"] in ("done", "error"):
+                break
+            await asyncio.sleep(0.05)
+        assert st["status"] == "done" and st["total"] == 12 and st["fetched"] == 12, st
+        assert tmdb.calls - calls == 12
+        job = (await client.post("/api/v1/images/prewarm", params={"library_id": lib_id, "sizes": ["w92"]})).json()
+        await asyncio.sleep(0.2)
+        st = (await client.get(f"/api/v1/images/prewarm/{job['job_id']}")).json()
+        assert st["status"] == "done" and st["cached"] == 6 and st["fetched"] == 0, st
+    print("OK")
+
+
+if __name__ == "main" or __name__ == "__main__":
+    import shutil
+    try:
+        asyncio.run(run())
+    finally:
+        tmdb.stop()
+        shutil.rmtree(cfg_dir, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
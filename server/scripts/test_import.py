@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Completed SAB downloads are placed into the mapped library (rename on the same
+filesystem, chunked copy across devices) and only those files are matched/linked."""
+import os, asyncio, pathlib, sys, tempfile
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_import.sqlite3"
+
+from fakes import FakeSab, FakeTMDB  # noqa: E402
+
+tmdb = FakeTMDB().start()
+os.environ.update({
+    "LHMM__DB__URL": f"sqlite+pysqlite:///{db_path}",
+    "LHMM__TMDB__API_KEY": "test",
+    "LHMM__TMDB__BASE_URL": tmdb.url,
+})
+
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, MediaFile, LibraryStats  # noqa: E402
+from lhmm.services.config_service import save_partial  # noqa: E402
+from lhmm.services.importer import place_file  # noqa: E402
+from lhmm.main import app  # noqa: E402
+import httpx  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+def download(base: pathlib.Path, job: str, files: dict[str, int]) -> str:
+    for rel, size in files.items():
+        p = base / job / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        with open(p, "wb") as f:
+            f.write(os.urandom(size))
+    return str(base / job)
+
+
+async def run(tmp: pathlib.Path):
+    media = tmp / "media"
+    (media / "Movies").mkdir(parents=True)
+    (media / "TV").mkdir(parents=True)
+    dl = tmp / "downloads"
+    # A different filesystem when available, to exercise the copy fallback
+    shm = pathlib.Path("/dev/shm")
+    cross = None
+    if shm.is_dir() and os.stat(shm).st_dev != os.stat(tmp).st_dev:
+        cross = pathlib.Path(tempfile.mkdtemp(dir=shm))
+
+    with SessionLocal() as db:
+        d = Disk(name="d1", mount_path=str(media))
+        db.add(d)
+        db.flush()
+        db.add_all([
+            Library(name="Movies", type="movie", root_disk_id=d.id, root_subdir="Movies"),
+            Library(name="TV", type="tv", root_disk_id=d.id, root_subdir="TV"),
+        ])
+        db.commit()
+
+    with FakeSab() as sab:
+        with SessionLocal() as db:
+            save_partial(db, {"sab_url": sab.url, "sab_api_key": sab.api_key})
+            db.commit()
+        # Predates lhmm: the first sync backfills it as skipped and never moves it
+        old = download(dl, "Old.Movie.1999.720p", {"Old.Movie.1999.720p.mkv": 1000})
+        sab.add_history("old", "Old.Movie.1999.720p", storage=old, completed=1_600_000_000)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/api/v1/system/sab/history/sync")
+
+            movie = download(dl, "Shadow.River.2010.1080p.BluRay-GRP", {
+                "Shadow.River.2010.1080p.BluRay-GRP.mkv": 300_000,
+                "Sample/shadow.river.sample.mkv": 1000,
+                "Shadow.River.2010.1080p.BluRay-GRP.nfo": 10,
+            })
+            sab.add_history("m1", "Shadow.River.2010", storage=movie)
+            ep = download(cross or dl, "Iron.Crown.S01E02.720p.WEB-GRP", {"Iron.Crown.S01E02.720p.WEB-GRP.mkv": 9 * 1024 * 1024 + 7})
+            sab.add_history("t1", "Iron.Crown.S01E02", category="tv", storage=ep)
+            sab.add_history("gone", "Missing.2011", storage=str(dl / "nope"))
+            sab.add_history("dl", "Busy.2012", status="Downloading")
+
+            await client.post("/api/v1/system/sab/history/sync")
+            counts = (await client.post("/api/v1/system/sab/imports/run")).json()
+            assert counts == {"imported": 2, "failed": 1, "skipped": 0}, counts
+
+            items = {i["nzo_id"]: i for i in (await client.get("/api/v1/system/sab/history?per_page=50")).json()["items"]}
+            assert items["old"]["import_status"] == "skipped" and os.path.exists(old), items["old"]
+            assert items["gone"]["import_status"] == "failed" and items["gone"]["import_error"], items["gone"]
+            assert items["dl"]["import_status"] is None
+
+            moved = media / "Movies" / "Shadow.River.2010.1080p.BluRay-GRP" / "Shadow.River.2010.1080p.BluRay-GRP.mkv"
+            assert moved.exists() and not os.path.exists(os.path.join(movie, moved.name)), "movie not renamed"
+            assert not (moved.parent / "Sample").exists(), "sample imported"
+            tv_file = media / "TV" / "Iron.Crown.S01E02.720p.WEB-GRP" / "Iron.Crown.S01E02.720p.WEB-GRP.mkv"
+            assert tv_file.stat().st_size == 9 * 1024 * 1024 + 7
+            assert not os.path.exists(os.path.join(ep, tv_file.name))
+
+            # Running again is a no-op
+            counts = (await client.post("/api/v1/system/sab/imports/run")).json()
+            assert counts == {"imported": 0, "failed": 0, "skipped": 0}, counts
+
+        with SessionLocal() as db:
+            paths = sorted(r for (r,) in db.query(MediaFile.rel_path))
+            assert paths == [
+                "Iron.Crown.S01E02.720p.WEB-GRP/Iron.Crown.S01E02.720p.WEB-GRP.mkv",
+                "Shadow.River.2010.1080p.BluRay-GRP/Shadow.River.2010.1080p.BluRay-GRP.mkv",
+            ], paths
+            assert sum(s.files for s in db.query(LibraryStats)) == 2
+
+    # Hardlink mode keeps the source in place; a same-size destination is left alone
+    src = tmp / "hl" / "a.mkv"
+    src.parent.mkdir()
+    src.write_bytes(b"x" * 100)
+    assert place_file(str(src), str(tmp / "hl2" / "a.mkv"), mode="hardlink") == "hardlink"
+    assert src.exists() and os.stat(src).st_nlink == 2
+    assert place_file(str(src), str(tmp / "hl2" / "a.mkv"), mode="hardlink") == "exists"
+
+    # Move mode: a same-size destination (an earlier import) still takes the source away
+    src.write_bytes(b"z" * 100)
+    (tmp / "hl2" / "a.mkv").unlink()
+    assert place_file(str(src), str(tmp / "mv" / "a.mkv")) == "rename"
+    src.write_bytes(b"z" * 100)
+    assert place_file(str(src), str(tmp / "mv" / "a.mkv")) == "exists"
+    assert not src.exists() and (tmp / "mv" / "a.mkv").read_bytes() == b"z" * 100
+    src.write_bytes(b"z" * 99)
+    try:
+        place_file(str(src), str(tmp / "mv" / "a.mkv"))
+        raise AssertionError("replaced a different-size file")
+    except FileExistsError:
+        assert src.exists()
+    if cross:
+        src2 = cross / "b.mkv"
+        src2.write_bytes(b"y" * 5000)
+        assert place_file(str(src2), str(tmp / "hl2" / "b.mkv"), mode="hardlink", chunk_mb=1) == "copy"
+        assert src2.exists() and (tmp / "hl2" / "b.mkv").read_bytes() == b"y" * 5000
+        import shutil
+        shutil.rmtree(cross, ignore_errors=True)
+    print("OK" + ("" if cross else " (no second filesystem; copy path not exercised)"))
+
+
+if __name__ == "main" or __name__ == "__main__":
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(run(pathlib.Path(tmp)))
+    finally:
+        tmdb.stop()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
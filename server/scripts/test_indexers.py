@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Indexer search fans out concurrently, streams per-indexer results as they arrive
+(the slow indexer does not hold back the fast one), dedupes and caches."""
+import os, asyncio, json, pathlib, sys, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_indexers.sqlite3"
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{db_path}"
+
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine  # noqa: E402
+from lhmm.services.indexers import IndexerDef, SearchQuery, build_params, search_stream  # noqa: E402
+from lhmm.main import app  # noqa: E402
+from fakes import FakeNewznab  # noqa: E402
+import httpx  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+CAPS_TV = {"searching": {"search": {"available": "yes", "supportedParams": "q"},
+                         "tv-search": {"available": "yes", "supportedParams": "q,season,ep"}}}
+
+
+def check_params():
+    rich = IndexerDef("a", "http://x", caps={"searching": {
+        **CAPS_TV["searching"], "movie-search": {"available": "yes", "supportedParams": "q,imdbid"}}})
+    plain = IndexerDef("b", "http://x")
+    sq = SearchQuery(q="Iron Crown", type="tv", season=1, ep=2)
+    assert build_params(rich, sq) | {"apikey": ""} == {"apikey": "", "o": "xml", "limit": 100, "t": "tvsearch",
+                                                       "q": "Iron Crown", "season": 1, "ep": 2}
+    assert build_params(plain, sq)["t"] == "search" and build_params(plain, sq)["q"] == "Iron Crown S01E02"
+    p = build_params(rich, SearchQuery(q="Shadow River", type="movie", imdbid="tt0123"))
+    assert p["t"] == "movie" and p["imdbid"] == "0123" and "q" not in p, p
+
+
+async def run():
+    check_params()
+    fast = FakeNewznab("fast", unique=2).start()
+    slow = FakeNewznab("slow", unique=1, latency_ms=600).start()
+    dead = FakeNewznab("dead", latency_ms=3000).start()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            for fk, caps in ((fast, CAPS_TV), (slow, {}), (dead, {"timeout": 1})):
+                r = await client.post("/api/v1/indexers", json={
+                    "name": fk.name, "url": fk.url, "api_key": fk.api_key, "capabilities": caps})
+                assert r.status_code == 201, r.text
+            assert len((await client.get("/api/v1/indexers")).json()["items"]) == 3
+
+            # Service level: the fast indexer's results are yielded before the slow one answers
+            t0 = time.perf_counter()
+            async for ev in search_stream(SearchQuery(q="Timing Check")):
+                assert ev["indexer"] == "fast" and time.perf_counter() - t0 < 0.5, ev
+                break
+
+            # SSE endpoint (ASGITransport buffers the body, so only order/content here)
+            t0 = time.perf_counter()
+            events = []
+            async with client.stream("GET", "/api/v1/indexers/search/stream",
+                                     params={"q": "Iron Crown", "type": "tv", "season": 1, "ep": 2}) as r:
+                ev = None
+                async for line in r.aiter_lines():
+                    if line.startswith("event: "):
+                        ev = line[7:]
+                    elif line.startswith("data: "):
+                        events.append((ev, json.loads(line[6:]), time.perf_counter() - t0))
+            order = [(e, d.get("indexer")) for e, d, _ in events]
+            assert order == [("results", "fast"), ("results", "slow"), ("results", "dead"), ("done", None)], order
+            first, second, third, done = (d for _, d, _ in events)
+            assert first["new"] == 7 and second["count"] == 6 and second["new"] == 1, (first, second)
+            assert "timed out" in third["error"], third
+            assert done["total"] == 8, done
+            assert fast.requests[-1]["t"] == "tvsearch" and slow.requests[-1]["q"] == "Iron Crown S01E02"
+
+            # Blocking variant with just the healthy indexers is cached on the second call
+            params = {"q": "Shadow River", "indexer": ["fast", "slow"]}
+            a = (await client.get("/api/v1/indexers/search", params=params)).json()
+            n = fast.calls + slow.calls
+            b = (await client.get("/api/v1/indexers/search", params=params)).json()
+            assert not a["cached"] and b["cached"] and fast.calls + slow.calls == n
+            assert len(a["results"]) == 8 and a["results"] == b["results"]
+            dup = [r for r in a["results"] if r["title"].endswith("GRP0")][0]
+            assert sorted(dup["indexers"]) == ["fast", "slow"], dup
+
+            assert (await client.get("/api/v1/indexers/search")).status_code == 400
+    finally:
+        for fk in (fast, slow, dead):
+            fk.stop()
+    print("OK")
+
+
+if __name__ == "main" or __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
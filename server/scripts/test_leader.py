@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""The scheduler lease is held by exactly one process at a time, passes to another
+worker when the holder stops or dies, and scan/periodic requests made on a
+non-leader are forwarded to the leader through the jobs table."""
+import os, json, pathlib, subprocess, sys, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+SERVER = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SERVER))
+db_path = ROOT / "test_leader.sqlite3"
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{db_path}"
+
+from sqlalchemy import update  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, Lease, Job  # noqa: E402
+from lhmm.services import leader  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+# One election participant: prints "elected"/"demoted" lines with timestamps
+WORKER = r"""
+import asyncio, sys, time
+from lhmm.services import leader
+
+def say(what):
+    print(f"{time.time():.3f} {what}", flush=True)
+
+async def main():
+    lead = leader.Leadership("test", 3, lambda: say("elected"), lambda: say("demoted"))
+    lead.start()
+    await asyncio.sleep(float(sys.argv[1]))
+    await lead.stop()
+    say("stopped")
+
+asyncio.run(main())
+"""
+
+
+def spawn(seconds: float) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-c", WORKER, str(seconds)],
+        stdout=subprocess.PIPE, text=True, env={**os.environ, "PYTHONPATH": str(SERVER)},
+    )
+
+
+def events(out: str) -> list[tuple[float, str]]:
+    return [(float(t), w) for t, w in (line.split() for line in out.splitlines() if line.strip())]
+
+
+def check_lease_rules() -> None:
+    assert leader.try_acquire("x", 30, owner="a")
+    assert leader.try_acquire("x", 30, owner="a")  # renew
+    assert not leader.try_acquire("x", 30, owner="b")
+    with SessionLocal() as db:
+        db.execute(update(Lease).where(Lease.name == "x").values(expires_at=int(time.time()) - 1))
+        db.commit()
+    assert leader.try_acquire("x", 30, owner="b")
+    assert not leader.try_acquire("x", 30, owner="a")
+    leader.release("x", owner="a")  # not the owner: no-op
+    assert leader.holder("x")["owner"] == "b"
+    leader.release("x", owner="b")
+    assert leader.holder("x") is None
+
+    # A lease left behind by a dead process on this host is reclaimed without waiting
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    import socket
+    assert leader.try_acquire("y", 600, owner=f"{socket.gethostname()}:{dead.pid}:dead")
+    assert leader.try_acquire("y", 600)
+    assert leader.holder("y")["owner"] == leader.OWNER
+
+    with leader.hold("z") as got:
+        assert got
+        with leader.hold("z", ttl=5) as again:
+            assert again  # same owner renews
+    assert leader.holder("z") is None
+
+
+def check_single_leader() -> None:
+    # Three workers: the first one leads; when it stops cleanly another takes over
+    # within one poll (ttl/3), and there is never more than one leader
+    p0 = spawn(3)
+    first = p0.stdout.readline()
+    assert "elected" in first, first
+    procs = [p0, spawn(8), spawn(8)]
+    outs = [events(first + p.communicate(timeout=30)[0]) if p is p0 else events(p.communicate(timeout=30)[0])
+            for p in procs]
+    timeline = sorted((t, i, w) for i, ev in enumerate(outs) for t, w in ev)
+    leading: set[int] = set()
+    elected = []
+    for t, i, w in timeline:
+        if w == "elected":
+            assert not leading, f"two leaders at {t}: {leading} and {i}"
+            leading.add(i)
+            elected.append((t, i))
+        elif w in ("demoted", "stopped"):
+            leading.discard(i)
+    assert len(elected) >= 2 and elected[0][1] == 0, timeline
+    stopped = next(t for t, i, w in timeline if i == 0 and w == "demoted")
+    assert elected[1][0] - stopped < 1.5, (stopped, elected)
+
+    # A killed leader is replaced at the next poll (its pid is gone on this host), and
+    # across hosts at the latest once the 3s lease expires
+    with SessionLocal() as db:
+        db.query(Lease).delete()
+        db.commit()
+    p1 = spawn(30)
+    first = p1.stdout.readline()
+    assert "elected" in first, first
+    p2 = spawn(10)
+    time.sleep(0.5)
+    p1.kill()
+    p1.wait()
+    line = p2.stdout.readline()
+    took = float(line.split()[0]) - float(first.split()[0])
+    assert "elected" in line and took < 6, (line, took)
+    p2.communicate(timeout=30)
+
+
+class _Follower:
+    is_leader = False
+
+
+def check_forwarding() -> None:
+    from lhmm.scheduler import scheduler, process_forwarded
+    from lhmm.services.scan_scheduler import request_scan, scan_status, SCAN_REQUEST
+    from lhmm.services.periodic_scans import request_sync, JOB_PREFIX
+
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path="/nonexistent-lhmm")
+        db.add(d)
+        db.flush()
+        li = Library(name="a", type="movie", root_disk_id=d.id, root_subdir="a",
+                     settings_json=json.dumps({"scan": {"interval_minutes": 60}}))
+        db.add(li)
+        db.commit()
+        lid, did, sj = li.id, d.id, li.settings_json
+
+    leader.set_leadership(_Follower())
+    try:
+        r = request_scan(lid, did)
+        assert r["queued"] and r["forwarded"], r
+        assert request_scan(lid, did)["already_queued"]  # deduped while still queued
+        request_sync(lid, sj)
+        st = scan_status()
+        assert st["leader"] is False and st["forwarded_pending"] == 1 and st["queued"] == [], st
+        assert scheduler.get_job(f"{JOB_PREFIX}{lid}") is None
+    finally:
+        leader.set_leadership(None)
+
+    assert process_forwarded() == 2
+    assert scheduler.get_job(f"{JOB_PREFIX}{lid}") is not None
+    with SessionLocal() as db:
+        jobs = db.query(Job).filter(Job.type.in_((SCAN_REQUEST, "periodic.sync"))).all()
+        assert {j.status for j in jobs} == {"done"}, [(j.type, j.status, j.payload_json) for j in jobs]
+    assert process_forwarded() == 0
+
+
+def check_api_on_follower() -> None:
+    """Library writes on a non-leader forward through the request's own transaction:
+    a second connection would wait out the busy timeout on the request's write lock."""
+    from fastapi.testclient import TestClient
+    from lhmm.main import app
+    from lhmm.scheduler import process_forwarded
+
+    with SessionLocal() as db:
+        did, other = db.query(Library.root_disk_id, Library.id).first()
+    body = {"name": "b", "type": "movie", "root_disk_id": did, "root_subdir": "b",
+            "settings_json": json.dumps({"scan": {"interval_minutes": 30}})}
+    client = TestClient(app)  # no lifespan: leadership stays the stub below
+    leader.set_leadership(_Follower())
+    try:
+        t0 = time.monotonic()
+        r = client.post("/api/v1/libraries", json=body)
+        assert r.status_code == 200, r.text
+        lid = r.json()["id"]
+        r = client.put(f"/api/v1/libraries/{lid}", json={**body, "settings_json": "{}"})
+        assert r.status_code == 200, r.text
+        r = client.post(f"/api/v1/libraries/{other}/scan")
+        assert r.status_code == 200 and r.json()["forwarded"], r.text
+        assert client.delete(f"/api/v1/libraries/{lid}").status_code == 204
+        assert time.monotonic() - t0 < 3, "a forward waited on the request's write lock"
+        with SessionLocal() as db:
+            queued = db.query(Job).filter(Job.status == "queued").count()
+        assert queued == 4, queued
+    finally:
+        leader.set_leadership(None)
+    assert process_forwarded() == 4
+
+
+if __name__ == "__main__":
+    try:
+        check_lease_rules()
+        check_single_leader()
+        check_forwarding()
+        check_api_on_follower()
+        print("OK")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Periodic scans only queue work when the directory fingerprint differs from the
+one stored by the last succeeded scan: a change whose scan is paused or cancelled
+is queued again on the next run, and an unchanged tree queues nothing."""
+import json, os, pathlib, shutil, sys, tempfile, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_periodic_scans.sqlite3"
+
+from fakes import FakeTMDB  # noqa: E402
+
+tmdb = FakeTMDB(latency_ms=15)
+tmdb.start()
+os.environ.update({
+    "LHMM__DB__URL": f"sqlite+pysqlite:///{db_path}",
+    "LHMM__TMDB__API_KEY": "test",
+    "LHMM__TMDB__BASE_URL": tmdb.url,
+})
+
+from sqlalchemy import select  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, LibraryScan  # noqa: E402
+from lhmm.services import scan_control  # noqa: E402
+from lhmm.services.periodic_scans import run_periodic_scan, _state  # noqa: E402
+from lhmm.services.scan_scheduler import scan_scheduler  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+N = 120
+
+
+def scans(lid: int) -> list[tuple[int, str]]:
+    with SessionLocal() as db:
+        return list(db.execute(select(LibraryScan.id, LibraryScan.status)
+                               .where(LibraryScan.library_id == lid).order_by(LibraryScan.id)).all())
+
+
+def wait_for(cond, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def main(tmp: pathlib.Path) -> None:
+    lib_root = tmp / "Movies"
+    for i in range(N):
+        p = lib_root / f"Film {i:03d} (2001)/Film.{i:03d}.2001.mkv"
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"\0" * 1000)
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path=str(tmp))
+        db.add(d)
+        db.flush()
+        li = Library(name="Movies", type="movie", root_disk_id=d.id, root_subdir="Movies",
+                     settings_json=json.dumps({"scan": {"interval_minutes": 60, "min_interval_minutes": 15}}))
+        db.add(li)
+        db.commit()
+        lid = li.id
+
+    # Never scanned: the first run queues a scan, which is paused and then cancelled
+    run_periodic_scan(lid)
+    wait_for(lambda: tmdb.calls >= 10)
+    scan_control.request(lid, "pause")
+    wait_for(lambda: not scan_scheduler.is_busy(lid))
+    assert [s for _, s in scans(lid)] == ["paused"]
+    run_periodic_scan(lid)  # paused: left alone
+    assert not scan_scheduler.is_busy(lid) and len(scans(lid)) == 1
+    assert scan_control.request(lid, "cancel")["status"] == "cancelled"
+
+    # The change was never scanned to completion, so the next run queues it again
+    run_periodic_scan(lid)
+    wait_for(lambda: not scan_scheduler.is_busy(lid))
+    assert [s for _, s in scans(lid)] == ["cancelled", "succeeded"], scans(lid)
+    interval = _state.interval[lid]
+
+    # Unchanged since the succeeded scan: nothing queued, the interval backs off
+    run_periodic_scan(lid)
+    assert not scan_scheduler.is_busy(lid) and len(scans(lid)) == 2
+    assert _state.interval[lid] == interval * 2
+
+    # A new directory is picked up by an incremental scan
+    p = lib_root / "New Film (2002)/New.Film.2002.mkv"
+    p.parent.mkdir()
+    p.write_bytes(b"\0" * 1000)
+    before = tmdb.calls
+    run_periodic_scan(lid)
+    wait_for(lambda: not scan_scheduler.is_busy(lid))
+    assert [s for _, s in scans(lid)][-1] == "succeeded" and len(scans(lid)) == 3
+    assert tmdb.calls == before + 1 and _state.interval[lid] == interval
+
+
+if __name__ == "__main__":
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="lhmm-periodic-"))
+    try:
+        main(tmp)
+        print("OK")
+    finally:
+        tmdb.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
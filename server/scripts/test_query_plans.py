@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Every hot query registered in lhmm.db.query_plans is index-backed on a seeded,
+ANALYZEd database: EXPLAIN QUERY PLAN shows no full table scan (and no sort step
+for queries registered as sorted). Pass -v to print every plan."""
+import os, pathlib, sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+db_path = ROOT / "test_query_plans.sqlite3"
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{db_path}"
+
+from sqlalchemy import text  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, Series, MediaItem, MediaFile, LibraryScan  # noqa: E402
+from lhmm.db.query_plans import check_plans, load_registry  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+def seed(libraries: int = 4, files: int = 2000) -> None:
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path="/mnt/d")
+        db.add(d)
+        db.flush()
+        libs = [Library(name=f"lib{i}", type="movie" if i % 2 else "tv", root_disk_id=d.id, root_subdir=f"l{i}")
+                for i in range(libraries)]
+        db.add_all(libs)
+        db.flush()
+        shows = [Series(tmdb_id=5000 + i, name=f"Show {i}", year=2000 + i % 20) for i in range(50)]
+        db.add_all(shows)
+        db.flush()
+        items = []
+        for i in range(files):
+            if i % 2:
+                items.append(MediaItem(kind="movie", tmdb_id=i, title=f"Movie {i}", year=1990 + i % 30))
+            else:
+                se = shows[i % len(shows)]
+                items.append(MediaItem(kind="episode", tmdb_id=se.tmdb_id, title=f"Ep {i}", series_id=se.id,
+                                       season=i // 200 + 1, episode=i % 200 + 1))
+        db.add_all(items)
+        db.flush()
+        db.add_all(
+            MediaFile(item_id=it.id, library_id=libs[n % libraries].id, rel_path=f"{it.title}/{n}.mkv",
+                      size=1_000_000 + n, created_at=1_700_000_000 + n)
+            for n, it in enumerate(items)
+        )
+        db.add_all(
+            LibraryScan(library_id=libs[n % libraries].id, status="succeeded" if n % 3 else "failed", stats_json="{}")
+            for n in range(400)
+        )
+        db.commit()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def main() -> int:
+    verbose = "-v" in sys.argv
+    seed()
+    assert len(load_registry()) >= 6, sorted(load_registry())
+    with engine.connect() as conn:
+        results = check_plans(conn)
+    failed = {name: r for name, r in results.items() if r["problems"]}
+    for name, r in results.items():
+        if verbose or name in failed:
+            print(f"{'FAIL' if name in failed else 'ok  '} {name}")
+            for line in r["plan"]:
+                print(f"       {line}")
+
+    # The guard itself: without the new index list_items falls back to a sort
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_mediafile_library_created"))
+    engine.dispose()  # pysqlite's statement cache would keep serving the old plan
+    with engine.connect() as conn:
+        regressed = check_plans(conn)["list_items"]["problems"]
+    assert regressed, "dropping ix_mediafile_library_created should be reported"
+
+    if failed:
+        print(f"{len(failed)} hot queries are not index-backed: {', '.join(failed)}")
+        return 1
+    print(f"OK ({len(results)} hot queries index-backed)")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        code = main()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
+    sys.exit(code)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""library_stats stays equal to recompute() as scans add, change and delete files:
+a full scan prunes file rows whose file is gone and subtracts them from the
+rollups, and a walk that finds nothing (an unmounted disk) prunes nothing."""
+import os, pathlib, shutil, sys, tempfile
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_rollups.sqlite3"
+
+from fakes import FakeTMDB  # noqa: E402
+
+tmdb = FakeTMDB()
+tmdb.start()
+os.environ.update({
+    "LHMM__DB__URL": f"sqlite+pysqlite:///{db_path}",
+    "LHMM__TMDB__API_KEY": "test",
+    "LHMM__TMDB__BASE_URL": tmdb.url,
+})
+
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, LibraryStats  # noqa: E402
+from lhmm.services.rollups import recompute  # noqa: E402
+from lhmm.services.scanner import scan_library, scan_paths  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+COLS = ("files", "movies", "episodes", "total_bytes", "series_count")
+
+
+def rollup(lid: int) -> dict:
+    with SessionLocal() as db:
+        st = db.get(LibraryStats, lid)
+        return {c: getattr(st, c) for c in COLS}
+
+
+def check(lid: int) -> dict:
+    """The incremental row equals a rebuild from the base tables."""
+    before = rollup(lid)
+    with SessionLocal() as db:
+        recompute(db, lid)
+        db.commit()
+    assert rollup(lid) == before, (before, rollup(lid))
+    return before
+
+
+def write(p: pathlib.Path, size: int) -> None:
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(b"\0" * size)
+
+
+def main(tmp: pathlib.Path) -> None:
+    lib_root = tmp / "TV"
+    for show in ("Night River", "Iron Crown"):
+        for ep in range(1, 4):
+            write(lib_root / show / "Season 01" / f"{show.replace(' ', '.')}.S01E{ep:02d}.mkv", 1000 * ep)
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path=str(tmp))
+        db.add(d)
+        db.flush()
+        li = Library(name="TV", type="tv", root_disk_id=d.id, root_subdir="TV")
+        db.add(li)
+        db.commit()
+        lid = li.id
+
+    scan_library(lid)
+    assert check(lid) == {"files": 6, "movies": 0, "episodes": 6, "total_bytes": 12000, "series_count": 2}
+
+    # Add
+    write(lib_root / "Paper Echo" / "Season 01" / "Paper.Echo.S01E01.mkv", 500)
+    scan_library(lid, incremental=True)
+    assert check(lid) == {"files": 7, "movies": 0, "episodes": 7, "total_bytes": 12500, "series_count": 3}
+
+    # Files linked outside a full scan (an import) keep the series count current too
+    p = lib_root / "Glass Harbor" / "Season 01" / "Glass.Harbor.S01E01.mkv"
+    write(p, 700)
+    assert scan_paths(lid, [str(p)])["matched"] == 1
+    assert check(lid) == {"files": 8, "movies": 0, "episodes": 8, "total_bytes": 13200, "series_count": 4}
+    p.unlink()
+    scan_library(lid, incremental=True)
+    assert check(lid)["series_count"] == 3
+
+    # Change: a file is rewritten with a new size
+    write(lib_root / "Night River" / "Season 01" / "Night.River.S01E01.mkv", 4000)
+    stats = scan_library(lid, incremental=True)
+    assert stats["updated"] == 1 and stats.get("pruned") == 0, stats
+    assert check(lid)["total_bytes"] == 15500
+
+    # Delete: one episode, then a whole show
+    (lib_root / "Iron Crown" / "Season 01" / "Iron.Crown.S01E02.mkv").unlink()
+    stats = scan_library(lid, incremental=True)
+    assert stats["pruned"] == 1 and stats["changed"] == 1, stats
+    assert check(lid) == {"files": 6, "movies": 0, "episodes": 6, "total_bytes": 13500, "series_count": 3}
+    shutil.rmtree(lib_root / "Paper Echo")
+    stats = scan_library(lid)
+    assert stats["pruned"] == 1, stats
+    assert check(lid) == {"files": 5, "movies": 0, "episodes": 5, "total_bytes": 13000, "series_count": 2}
+
+    # Nothing walked (e.g. the disk is not mounted): rows are kept
+    moved = tmp / "elsewhere"
+    lib_root.rename(moved)
+    lib_root.mkdir()
+    stats = scan_library(lid)
+    assert stats["files"] == 0 and "pruned" not in stats, stats
+    assert check(lid)["files"] == 5
+
+
+if __name__ == "__main__":
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="lhmm-rollups-"))
+    try:
+        main(tmp)
+        print("OK")
+    finally:
+        tmdb.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
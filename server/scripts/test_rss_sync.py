@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""RSS sync reads only items newer than each indexer's watermark, matches them
+against wanted items by normalised title, and keeps up with large feeds."""
+import os, asyncio, pathlib, sys, time
+from email.utils import format_datetime
+from datetime import datetime, timezone
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_rss_sync.sqlite3"
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{db_path}"
+
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine  # noqa: E402
+from lhmm.services.rss_sync import release_keys  # noqa: E402
+from lhmm.main import app  # noqa: E402
+from fakes import FakeNewznab  # noqa: E402
+import httpx  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+T0 = 1_700_000_000
+
+
+def rss_item(i: int, title: str) -> dict:
+    pub = format_datetime(datetime.fromtimestamp(T0 + i, timezone.utc))
+    return {"title": title, "guid": f"g{i}", "size": 2_000_000_000 + i, "pub": pub}
+
+
+def publish(fk: FakeNewznab, start: int, n: int, special: dict[int, str] | None = None) -> None:
+    special = special or {}
+    new = [rss_item(i, special.get(i) or f"Filler.Show.{i}.S01E01.720p.HDTV.x264-GRP") for i in range(start, start + n)]
+    fk.rss_items[:0] = list(reversed(new))  # newest first
+
+
+async def run():
+    assert release_keys("Blade.Runner.2049.2017.1080p.BluRay")[0] == ("m", "blade runner", 2049)
+    assert ("m", "blade runner 2049", 2017) in release_keys("Blade.Runner.2049.2017.1080p.BluRay")
+    assert release_keys("Iron.Crown.S01E02.720p.WEB")[0] == ("e", "iron crown", 1, 2)
+    assert release_keys("Bob's.Burgers.S03E04")[0] == ("e", "bobs burgers", 3, 4)
+
+    a = FakeNewznab("a").start()
+    b = FakeNewznab("b").start()
+    try:
+        publish(a, 0, 3000, {10: "Shadow.River.2010.1080p.BluRay.x264-GRP", 20: "Iron.Crown.S01E02.720p.WEB-DL-GRP"})
+        publish(b, 0, 3000, {30: "Shadow River 2010 2160p WEB-DL", 40: "Iron.Crown.S01E03.720p.WEB-DL-GRP"})
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            for fk in (a, b):
+                await client.post("/api/v1/indexers", json={
+                    "name": fk.name, "url": fk.url, "api_key": fk.api_key, "capabilities": {"limits": {"max": 5000}}})
+            movie = (await client.post("/api/v1/wanted", json={"kind": "movie", "title": "Shadow River", "year": 2010})).json()
+            ep = (await client.post("/api/v1/wanted", json={"kind": "episode", "title": "Iron Crown", "season": 1, "episode": 2})).json()
+            other = (await client.post("/api/v1/wanted", json={"kind": "episode", "title": "Iron Crown", "season": 2, "episode": 1})).json()
+            assert (await client.post("/api/v1/wanted", json={"kind": "episode", "title": "X"})).status_code == 422
+
+            t = time.perf_counter()
+            r = (await client.post("/api/v1/indexers/rss/sync")).json()
+            elapsed = time.perf_counter() - t
+            assert r["new_items"] == 6000 and r["matches"] == 3, r
+            rate = r["new_items"] / elapsed * 60
+            assert rate > 20_000, f"{rate:.0f} items/min"
+
+            rel = (await client.get(f"/api/v1/wanted/{movie['id']}/releases")).json()["items"]
+            assert sorted(x["indexer"] for x in rel) == ["a", "b"], rel
+            assert len((await client.get(f"/api/v1/wanted/{ep['id']}/releases")).json()["items"]) == 1
+            listed = {w["id"]: w for w in (await client.get("/api/v1/wanted")).json()["items"]}
+            assert listed[movie["id"]]["status"] == "found" and listed[other["id"]]["status"] == "wanted"
+
+            # Nothing new: the watermark stops the read at the first item
+            r = (await client.post("/api/v1/indexers/rss/sync")).json()
+            assert r["new_items"] == 0 and r["matches"] == 0, r
+
+            # Five new items on top of a; only those are read
+            publish(a, 3000, 5, {3002: "Iron.Crown.S02E01.1080p.WEB-DL-GRP"})
+            r = (await client.post("/api/v1/indexers/rss/sync", params={"indexer": ["a"]})).json()
+            assert r["new_items"] == 5 and r["matches"] == 1, r
+            state = {s["indexer"]: s for s in (await client.get("/api/v1/indexers/rss")).json()["items"]}
+            assert state["a"]["last_guid"] == "g3004" and state["b"]["last_guid"] == "g2999", state
+
+            assert (await client.delete(f"/api/v1/wanted/{movie['id']}")).status_code == 200
+            assert (await client.get(f"/api/v1/wanted/{movie['id']}/releases")).status_code == 404
+    finally:
+        a.stop()
+        b.stop()
+    print(f"OK ({rate:,.0f} RSS items/min on first sync)")
+
+
+if __name__ == "main" or __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""SAB history is mirrored into sab_history incrementally: a steady-state sync reads
+one page, and /system/sab/history/delta returns only rows changed since a cursor."""
+import os, asyncio, pathlib, sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_sab_history.sqlite3"
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{db_path}"
+
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.services.config_service import save_partial  # noqa: E402
+from lhmm.main import app  # noqa: E402
+from fakes import FakeSab  # noqa: E402
+import httpx  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+async def run():
+    with FakeSab() as sab:
+        with SessionLocal() as db:
+            save_partial(db, {"sab_url": sab.url, "sab_api_key": sab.api_key})
+            db.commit()
+        for i in range(120):
+            sab.add_history(f"nzo{i}", f"Movie.{i}.2001.1080p", completed=1_700_000_000 + i)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            r = await client.post("/api/v1/system/sab/history/sync")
+            first = r.json()
+            assert first["written"] == 120 and first["pages"] == 3, first
+
+            # Nothing new: one page read, nothing written
+            sab.history_pages = 0
+            r = await client.post("/api/v1/system/sab/history/sync")
+            assert r.json()["written"] == 0 and sab.history_pages == 1, (r.json(), sab.history_pages)
+
+            cursor = (await client.get("/api/v1/system/sab/history?per_page=1")).json()["cursor"]
+            sab.add_history("nzo-new", "Show.S01E01.720p", category="tv", completed=1_800_000_000)
+            sab.add_history("nzo-dl", "Show.S01E02.720p", category="tv", status="Extracting", completed=1_800_000_001)
+            await client.post("/api/v1/system/sab/history/sync")
+            delta = (await client.get(f"/api/v1/system/sab/history/delta?since={cursor}")).json()
+            assert {i["nzo_id"] for i in delta["items"]} == {"nzo-new", "nzo-dl"}, delta
+            cursor = delta["cursor"]
+
+            # The in-progress slot finishes: it is rewritten and shows up in the next delta
+            sab.slots[0]["status"] = "Completed"
+            await client.post("/api/v1/system/sab/history/sync")
+            delta = (await client.get(f"/api/v1/system/sab/history/delta?since={cursor}")).json()
+            assert [i["nzo_id"] for i in delta["items"]] == ["nzo-dl"], delta
+
+            page = (await client.get("/api/v1/system/sab/history?category=tv")).json()
+            assert page["total"] == 2 and page["items"][0]["nzo_id"] == "nzo-dl", page
+            page = (await client.get("/api/v1/system/sab/history?q=Movie.11&per_page=5")).json()
+            assert page["total"] == 11 and len(page["items"]) == 5, page
+
+            # Queue: concurrent callers share one upstream request within the TTL
+            calls = sab.calls
+            rs = await asyncio.gather(*[client.get("/api/v1/system/sab/queue") for _ in range(10)])
+            assert all(r.status_code == 200 for r in rs)
+            assert sab.calls - calls == 1, sab.calls - calls
+
+    print("OK")
+
+
+if __name__ == "main" or __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Running scans can be paused, resumed and cancelled: the walk is sorted, a pause
+keeps the last committed path as a checkpoint, a resume continues after it without
+asking TMDB about any file twice, and a request written to the scan row by another
+worker is seen at the next batch commit."""
+import os, pathlib, shutil, sqlite3, sys, tempfile, threading, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_scan_control.sqlite3"
+
+from fakes import FakeTMDB  # noqa: E402
+
+tmdb = FakeTMDB(latency_ms=15)
+tmdb.start()
+os.environ.update({
+    "LHMM__DB__URL": f"sqlite+pysqlite:///{db_path}",
+    "LHMM__TMDB__API_KEY": "test",
+    "LHMM__TMDB__BASE_URL": tmdb.url,
+})
+
+from sqlalchemy import select, func, update  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, LibraryScan, MediaFile  # noqa: E402
+from lhmm.services import scan_control  # noqa: E402
+from lhmm.services.scanner import scan_library, walk_key, _walk_video_files  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+N = 150
+
+
+def scan_row(scan_id: int) -> LibraryScan:
+    with SessionLocal() as db:
+        return db.get(LibraryScan, scan_id)
+
+
+def files_linked() -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(MediaFile))
+
+
+def latest_scan(lid: int) -> LibraryScan:
+    with SessionLocal() as db:
+        return db.scalars(select(LibraryScan).where(LibraryScan.library_id == lid).order_by(LibraryScan.id.desc())).first()
+
+
+def in_thread(fn, *args, **kw) -> tuple[threading.Thread, dict]:
+    out = {}
+    t = threading.Thread(target=lambda: out.update(fn(*args, **kw)))
+    t.start()
+    return t, out
+
+
+def wait_for(cond, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def main(tmp: pathlib.Path) -> None:
+    lib_root = tmp / "Movies"
+    for i in range(N):
+        # Nested and flat layouts, so the walk order crosses directory levels
+        rel = (f"Film {i:03d} ({1950 + i % 70})/Film.{i:03d}.{1950 + i % 70}.mkv" if i % 3
+               else f"Film.{i:03d}.{1950 + i % 70}.mkv" if i % 2 else f"Box/Set {i:03d}/Film.{i:03d}.{1950 + i % 70}.mkv")
+        p = lib_root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"\0" * 1000)
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path=str(tmp))
+        db.add(d)
+        db.flush()
+        li = Library(name="Movies", type="movie", root_disk_id=d.id, root_subdir="Movies")
+        db.add(li)
+        db.commit()
+        lid = li.id
+
+    # Sorted walk; `after` skips everything up to and including the checkpoint
+    walked = [os.path.relpath(p, lib_root) for p, _, _ in _walk_video_files(str(lib_root))]
+    assert len(walked) == N and walked == sorted(walked, key=walk_key)
+    for cut in (0, 1, 49, 77, N - 1):
+        rest = [os.path.relpath(p, lib_root) for p, _, _ in _walk_video_files(str(lib_root), after=walked[cut])]
+        assert rest == walked[cut + 1:], cut
+
+    # Pause in-process: stops at the next file with a checkpoint
+    t, out = in_thread(scan_library, lid)
+    wait_for(lambda: tmdb.calls >= 30)
+    r = scan_control.request(lid, "pause")
+    assert r["status"] in ("pausing", "paused"), r
+    t.join()
+    scan = latest_scan(lid)
+    assert scan.status == "paused" and out["files"] < N, (scan.status, out)
+    ckpt = out["checkpoint"]
+    assert ckpt == walked[out["files"] - 1] and files_linked() == out["files"] == tmdb.calls, (out, tmdb.calls)
+    assert scan_control.request(lid, "pause")["status"] == "paused"
+
+    # Resume: same row, no file asked about twice, counters carried over
+    stats = scan_library(lid, resume=scan.id)
+    assert scan_row(scan.id).status == "succeeded" and latest_scan(lid).id == scan.id
+    assert stats["files"] == stats["matched"] == N and stats["resumed"] == 1, stats
+    assert tmdb.calls == N and files_linked() == N, tmdb.calls
+    try:
+        scan_library(lid, resume=scan.id)
+        raise AssertionError("resumed a finished scan")
+    except ValueError:
+        pass
+
+    # Cancel written to the row by another worker: seen at the next batch commit
+    t, out = in_thread(scan_library, lid)
+    wait_for(lambda: tmdb.calls >= N + 5)
+    sid = latest_scan(lid).id
+    with SessionLocal() as db:
+        db.execute(update(LibraryScan).where(LibraryScan.id == sid).values(status="cancelling"))
+        db.commit()
+    t.join()
+    assert scan_row(sid).status == "cancelled" and out["files"] == 50 and "checkpoint" not in out, out
+
+    from fastapi.testclient import TestClient
+    from lhmm.main import app
+    with TestClient(app) as client:
+        base = f"/api/v1/libraries/{lid}/scan"
+        assert client.post(f"{base}/pause").status_code == 409
+        assert client.post(f"{base}/resume").status_code == 409
+        assert client.post("/api/v1/libraries/999999/scan/pause").status_code == 404
+
+        # Pause through the API, resume on the scheduler
+        before = tmdb.calls
+        assert client.post(base).json()["queued"]
+        wait_for(lambda: tmdb.calls >= before + 20)
+        r = client.post(f"{base}/pause").json()
+        assert r["status"] in ("pausing", "paused"), r
+        wait_for(lambda: scan_row(r["scan_id"]).status == "paused")
+        paused_at = tmdb.calls
+        r2 = client.post(f"{base}/resume").json()
+        assert r2["scan_id"] == r["scan_id"] and r2["queued"], r2
+        wait_for(lambda: scan_row(r["scan_id"]).status == "succeeded")
+        assert tmdb.calls - before == N and paused_at < before + N, (tmdb.calls, before)
+
+        # A paused scan can be cancelled; a new scan supersedes a paused one
+        assert client.post(base).json()["queued"]
+        wait_for(lambda: tmdb.calls >= before + N + 10)
+        r = client.post(f"{base}/pause").json()
+        wait_for(lambda: scan_row(r["scan_id"]).status == "paused")
+        assert client.post(f"{base}/cancel").json() == {"scan_id": r["scan_id"], "status": "cancelled"}
+        assert client.post(f"{base}/resume").status_code == 409
+
+    t, _ = in_thread(scan_library, lid)
+    wait_for(lambda: latest_scan(lid).id > r["scan_id"] and tmdb.calls >= before + 2 * N)
+    scan_control.request(lid, "pause")
+    t.join()
+    paused_id = latest_scan(lid).id
+    assert scan_row(paused_id).status == "paused"
+
+    # The row stays write-locked past the busy timeout (a batch of slow lookups): 503, retry later
+    raw = sqlite3.connect(db_path, isolation_level=None)
+    raw.execute("BEGIN IMMEDIATE")
+    try:
+        r = TestClient(app).post(f"/api/v1/libraries/{lid}/scan/cancel")  # no lifespan: the lease would wait too
+    finally:
+        raw.rollback()
+        raw.close()
+    assert r.status_code == 503 and r.headers["Retry-After"] == str(scan_control.BUSY_RETRY_AFTER), r.text
+    assert scan_row(paused_id).status == "paused"
+    scan_library(lid, incremental=True)
+    assert scan_row(paused_id).status == "cancelled"
+
+
+if __name__ == "__main__":
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="lhmm-scanctl-"))
+    try:
+        main(tmp)
+        print("OK")
+    finally:
+        tmdb.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Scans hold no ORM objects across batches: the session is emptied at every batch
+commit and series are resolved through a bounded tmdb_id -> id map, so each show
+is looked up once per scan rather than once per episode."""
+import gc, os, pathlib, shutil, sys, tempfile
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_scan_memory.sqlite3"
+
+from fakes import FakeTMDB  # noqa: E402
+
+tmdb = FakeTMDB()
+tmdb.start()
+os.environ.update({
+    "LHMM__DB__URL": f"sqlite+pysqlite:///{db_path}",
+    "LHMM__TMDB__API_KEY": "test",
+    "LHMM__TMDB__BASE_URL": tmdb.url,
+})
+
+from sqlalchemy import event, select, func  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, MediaFile, MediaItem, Series  # noqa: E402
+from lhmm.services import scanner  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+SHOWS = ("Night River", "Iron Crown", "Paper Echo")
+EPISODES = 70  # per show: 210 files, five batch commits
+
+
+def live(cls) -> int:
+    return sum(1 for o in gc.get_objects() if type(o) is cls)
+
+
+def main(tmp: pathlib.Path) -> None:
+    lib_root = tmp / "TV"
+    for show in SHOWS:
+        dot = show.replace(" ", ".")
+        for i in range(EPISODES):
+            season, ep = divmod(i, 10)
+            p = lib_root / show / f"Season {season + 1:02d}" / f"{dot}.S{season + 1:02d}E{ep + 1:02d}.1080p.mkv"
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_bytes(b"\0" * 1000)
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path=str(tmp))
+        db.add(d)
+        db.flush()
+        li = Library(name="TV", type="tv", root_disk_id=d.id, root_subdir="TV")
+        db.add(li)
+        db.commit()
+        lid = li.id
+
+    series_selects = {"n": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM series" in statement:
+            series_selects["n"] += 1
+
+    # Sample how many ORM objects are alive while the scan runs
+    peak = {"files": 0, "items": 0}
+    real = scanner._match_and_link
+
+    def sampled(*args, **kw):
+        real(*args, **kw)
+        if args[6]["files"] % 7 == 0:
+            gc.collect()
+            peak["files"] = max(peak["files"], live(MediaFile))
+            peak["items"] = max(peak["items"], live(MediaItem))
+
+    scanner._match_and_link = sampled
+    try:
+        stats = scanner.scan_library(lid)
+    finally:
+        scanner._match_and_link = real
+    n = len(SHOWS) * EPISODES
+    assert stats["files"] == stats["matched"] == stats["episodes"] == n, stats
+    assert series_selects["n"] == len(SHOWS), series_selects
+    assert peak["files"] <= scanner.COMMIT_EVERY and peak["items"] <= scanner.COMMIT_EVERY, peak
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(Series)) == len(SHOWS)
+        per_series = dict(db.execute(
+            select(Series.name, func.count(MediaFile.id))
+            .join(MediaItem, MediaItem.series_id == Series.id)
+            .join(MediaFile, MediaFile.item_id == MediaItem.id)
+            .group_by(Series.name)
+        ).all())
+        assert per_series == {s: EPISODES for s in SHOWS}, per_series
+
+    # The map is an LRU: past maxsize the oldest show is looked up again
+    ids = scanner.SeriesIds(maxsize=2)
+    before = series_selects["n"]
+    with SessionLocal() as db:
+        first = ids.get(db, 9001, "A", 2001)
+        ids.get(db, 9002, "B", 2002)
+        assert ids.get(db, 9001, "A", 2001) == first and series_selects["n"] == before + 2
+        ids.get(db, 9003, "C", 2003)  # evicts 9002, the least recently used
+        ids.get(db, 9001, "A", 2001)
+        assert series_selects["n"] == before + 3
+        ids.get(db, 9002, "B", 2002)
+        assert series_selects["n"] == before + 4
+        db.rollback()
+
+
+if __name__ == "__main__":
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="lhmm-scanmem-"))
+    try:
+        main(tmp)
+        print("OK")
+    finally:
+        tmdb.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Scan progress reaches SSE viewers on every worker: this process holds the
+scheduler lease and runs the scan, a uvicorn worker started beside it stays a
+follower, and a viewer connected to that worker still gets the running snapshots
+and the final event (mirrored from the leader's scan_progress row)."""
+import asyncio, json, os, pathlib, shutil, socket, subprocess, sys, tempfile, threading
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+SERVER = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SERVER))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_scan_progress.sqlite3"
+
+from fakes import FakeTMDB  # noqa: E402
+
+tmdb = FakeTMDB(latency_ms=15)
+tmdb.start()
+os.environ.update({
+    "LHMM__DB__URL": f"sqlite+pysqlite:///{db_path}",
+    "LHMM__TMDB__API_KEY": "test",
+    "LHMM__TMDB__BASE_URL": tmdb.url,
+})
+
+import httpx  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library  # noqa: E402
+from lhmm.services import leader  # noqa: E402
+from lhmm.services.scanner import scan_library  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+N = 150
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def watch(base: str, lid: int, started: threading.Event, out: list[dict]) -> None:
+    async with httpx.AsyncClient(base_url=base, timeout=60) as client:
+        for _ in range(200):
+            try:
+                if (await client.get("/api/v1/healthz")).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+        else:
+            raise AssertionError("uvicorn did not come up")
+        st = (await client.get("/api/v1/libraries/scan-queue")).json()
+        assert st["leader"] is False, st
+        async with client.stream("GET", f"/api/v1/libraries/{lid}/scans/events") as r:
+            assert r.status_code == 200
+            started.set()
+            async for line in r.aiter_lines():
+                if line.startswith("data: "):
+                    out.append(json.loads(line[6:]))
+                    if out[-1]["status"] != "running":
+                        return
+
+
+def main(tmp: pathlib.Path) -> None:
+    lib_root = tmp / "Movies"
+    for i in range(N):
+        p = lib_root / f"Film {i:03d} (2001)/Film.{i:03d}.2001.mkv"
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"\0" * 1000)
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path=str(tmp))
+        db.add(d)
+        db.flush()
+        li = Library(name="Movies", type="movie", root_disk_id=d.id, root_subdir="Movies")
+        db.add(li)
+        db.commit()
+        lid = li.id
+
+    # This process leads; the uvicorn worker cannot take the lease while we are alive
+    assert leader.try_acquire(leader.SCHEDULER_LEASE, 120)
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "lhmm.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=str(SERVER), env={**os.environ, "PYTHONPATH": str(SERVER)},
+    )
+    try:
+        started, events = threading.Event(), []
+        viewer = threading.Thread(
+            target=lambda: asyncio.run(watch(f"http://127.0.0.1:{port}", lid, started, events)), daemon=True
+        )
+        viewer.start()
+        assert started.wait(30), "viewer did not connect"
+        stats = scan_library(lid)
+        viewer.join(30)
+        assert not viewer.is_alive(), events
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        leader.release(leader.SCHEDULER_LEASE)
+
+    assert stats["files"] == N
+    running = [e for e in events if e["status"] == "running"]
+    assert running and events[-1]["status"] == "succeeded" and events[-1]["files"] == N, events
+    assert [e["files"] for e in running] == sorted(e["files"] for e in running)
+    assert len({e["scan_id"] for e in events}) == 1
+
+
+if __name__ == "__main__":
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="lhmm-progress-"))
+    try:
+        main(tmp)
+        print("OK")
+    finally:
+        tmdb.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
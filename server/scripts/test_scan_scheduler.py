@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""The scan scheduler starts at most `per_disk` scans per disk and `max_workers`
+in all, picks the best priority across every disk when a worker frees up, and
+keeps scans that cannot start yet queued (reorderable and discardable) instead
+of parking them in the thread pool."""
+import os, pathlib, sys, threading, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+db_path = ROOT / "test_scan_scheduler.sqlite3"
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{db_path}"
+
+from lhmm.services import scanner  # noqa: E402
+from lhmm.services.scan_scheduler import ScanScheduler  # noqa: E402
+
+started: list[int] = []
+gates: dict[int, threading.Event] = {}
+live = {"now": 0, "max": 0}
+_lock = threading.Lock()
+
+
+def fake_scan(library_id: int, **kwargs) -> dict:
+    with _lock:
+        started.append(library_id)
+        live["now"] += 1
+        live["max"] = max(live["max"], live["now"])
+    try:
+        assert gates.setdefault(library_id, threading.Event()).wait(30), library_id
+    finally:
+        with _lock:
+            live["now"] -= 1
+    return {}
+
+
+def wait_for(cond, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def finish(s: ScanScheduler, library_id: int) -> None:
+    gates.setdefault(library_id, threading.Event()).set()
+    wait_for(lambda: library_id not in s.status()["running"])
+
+
+def main() -> None:
+    scanner.scan_library = fake_scan
+    s = ScanScheduler(per_disk=1, max_workers=2)
+
+    assert s.submit(1, 10, (5,))
+    assert s.submit(2, 10, (0,))  # same disk as 1: waits for it
+    assert s.submit(3, 20, (3,))
+    assert s.submit(4, 30, (2,))  # both workers busy: waits
+    assert s.submit(5, 30, (1,))
+    assert s.submit(6, 40, (4,))
+    assert not s.submit(4, 30, (0,))  # already queued
+    wait_for(lambda: len(started) == 2)
+    st = s.status()
+    assert st["running"] == [1, 3] and st["queued"] == [2, 4, 5, 6] and st["max_workers"] == 2, st
+    assert st["active_per_disk"] == {10: 1, 20: 1}, st
+
+    # Nothing waiting for a worker was handed to the pool, so it can still be dropped
+    assert s.discard(4) and not s.discard(1) and not s.is_busy(4)
+
+    # Disk 10 is still busy: the freed worker takes the best head among the other disks
+    finish(s, 3)
+    wait_for(lambda: len(started) == 3)
+    assert started[-1] == 5, started
+
+    # Disk 10 frees up: its queued scan outranks disk 40's
+    finish(s, 1)
+    wait_for(lambda: len(started) == 4)
+    assert started[-1] == 2, started
+    finish(s, 5)
+    wait_for(lambda: len(started) == 5)
+    assert started[-1] == 6, started
+
+    finish(s, 2)
+    finish(s, 6)
+    wait_for(lambda: not s.is_busy())
+    assert started == [1, 3, 5, 2, 6] and live["max"] == 2, (started, live)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+        print("OK")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
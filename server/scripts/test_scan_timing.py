@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Scans record per-stage timings in stats["timing"] (walk, guessit, tmdb, db,
+commit) that add up to no more than the scan's elapsed time, and profile=True
+writes a loadable cProfile dump under CONFIG_DIR/cache/profiles whose path is
+stored with the scan."""
+import json, os, pathlib, pstats, shutil, sys, tempfile
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_scan_timing.sqlite3"
+tmp = pathlib.Path(tempfile.mkdtemp(prefix="lhmm-timing-"))
+
+from fakes import FakeTMDB  # noqa: E402
+
+tmdb = FakeTMDB(latency_ms=2)
+tmdb.start()
+os.environ.update({
+    "LHMM__DB__URL": f"sqlite+pysqlite:///{db_path}",
+    "LHMM_CONFIG_DIR": str(tmp / "config"),
+    "LHMM__TMDB__API_KEY": "test",
+    "LHMM__TMDB__BASE_URL": tmdb.url,
+})
+
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, LibraryScan  # noqa: E402
+from lhmm.services.scanner import PROFILE_DIR, scan_library  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+N = 60
+STAGES = {"walk", "guessit", "tmdb", "db", "commit"}
+
+
+def check_timing(stats: dict, files: int) -> None:
+    t = stats["timing"]
+    assert STAGES <= set(t["stages"]), t["stages"]
+    assert t["stages"]["guessit"]["count"] == t["stages"]["tmdb"]["count"] == files, t["stages"]
+    spent = sum(s["total_ms"] for s in t["stages"].values())
+    # Stages never overlap; allow the per-stage rounding to 0.1 ms
+    assert 0 < spent <= t["elapsed_ms"] + 0.1 * len(t["stages"]), (spent, t["elapsed_ms"])
+    assert t["files_per_sec"] > 0 and len(t["slowest"]) <= 10, t
+
+
+def main() -> None:
+    lib_root = tmp / "Movies"
+    for i in range(N):
+        p = lib_root / f"Film {i:02d} ({1950 + i})/Film.{i:02d}.{1950 + i}.mkv"
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"\0" * 1000)
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path=str(tmp))
+        db.add(d)
+        db.flush()
+        li = Library(name="Movies", type="movie", root_disk_id=d.id, root_subdir="Movies")
+        db.add(li)
+        db.commit()
+        lid = li.id
+
+    assert PROFILE_DIR == tmp / "config" / "cache" / "profiles", PROFILE_DIR
+    stats = scan_library(lid)
+    assert stats["files"] == stats["matched"] == N and "profile_path" not in stats, stats
+    check_timing(stats, N)
+    assert not PROFILE_DIR.exists() or not list(PROFILE_DIR.iterdir())
+
+    # Profiled rescan: the dump loads, covers the scan and is recorded on the scan row
+    stats = scan_library(lid, profile=True)
+    check_timing(stats, N)
+    prof = pathlib.Path(stats["profile_path"])
+    assert prof.parent == PROFILE_DIR and prof.name.startswith(f"scan-{lid}-"), prof
+    ps = pstats.Stats(str(prof))
+    assert ps.total_calls > 0
+    assert any(fn == "_match_and_link" for _, _, fn in ps.stats), "scanner frames missing from the profile"
+    with SessionLocal() as db:
+        row = db.query(LibraryScan).order_by(LibraryScan.id.desc()).first()
+        stored = json.loads(row.stats_json)
+    assert row.status == "succeeded" and stored["profile_path"] == str(prof), stored
+    assert set(stored["timing"]["stages"]) >= STAGES
+
+
+if __name__ == "__main__":
+    try:
+        main()
+        print("OK")
+    finally:
+        tmdb.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Full-text search: the FTS5 index follows inserts, updates and deletes of files,
+items and series through triggers, results are ordered by bm25 (title before
+series before path), and pages are stable with the match counted only when asked
+(by default on page 1, and never on the last page, where it is known)."""
+import os, pathlib, sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+db_path = ROOT / "test_search.sqlite3"
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{db_path}"
+
+from sqlalchemy import event, delete  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, MediaItem, MediaFile, Series  # noqa: E402
+from lhmm.main import app  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+counts: list[str] = []
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _log(conn, cursor, statement, parameters, context, executemany):
+    if "count(*)" in statement and "media_search" in statement:
+        counts.append(statement)
+
+
+def add_file(db, lib_id: int, title: str, rel_path: str, series_id: int | None = None, tmdb_id: int = 0) -> tuple[int, int]:
+    mi = MediaItem(kind="episode" if series_id else "movie", tmdb_id=tmdb_id, title=title, series_id=series_id,
+                   season=1 if series_id else None, episode=tmdb_id if series_id else None)
+    db.add(mi)
+    db.flush()
+    mf = MediaFile(item_id=mi.id, library_id=lib_id, rel_path=rel_path, size=1)
+    db.add(mf)
+    db.flush()
+    return mi.id, mf.id
+
+
+def main(client: TestClient) -> None:
+    def search(q: str, **params) -> dict:
+        r = client.get("/api/v1/search", params={"q": q, **params})
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    def ids(q: str, **params) -> list[int]:
+        return [i["file_id"] for i in search(q, **params)["items"]]
+
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path="/tmp")
+        db.add(d)
+        db.flush()
+        a = Library(name="a", type="movie", root_disk_id=d.id, root_subdir="a")
+        b = Library(name="b", type="tv", root_disk_id=d.id, root_subdir="b")
+        db.add_all([a, b])
+        db.flush()
+        se = Series(tmdb_id=77, name="Harbor Lights", year=2010)
+        db.add(se)
+        db.flush()
+        # bm25 weights: a title hit outranks a series hit, which outranks a path hit
+        _, f_title = add_file(db, a.id, "Harbor", "Harbor (2001)/Harbor.2001.mkv", tmdb_id=1)
+        _, f_series = add_file(db, b.id, "Pilot", "Harbor Lights/S01E01.mkv", se.id, tmdb_id=1)
+        _, f_path = add_file(db, a.id, "Something Else", "Harbor Extras/Something.Else.mkv", tmdb_id=2)
+        item_id, f_move = add_file(db, a.id, "Quiet Meadow", "Quiet Meadow (1999)/qm.mkv", tmdb_id=3)
+        db.commit()
+        a_id, b_id, se_id = a.id, b.id, se.id
+
+    # Insert trigger + ranking
+    assert ids("harbor") == [f_title, f_series, f_path], search("harbor")
+    assert ids("harb", library_id=a_id) == [f_title, f_path]  # prefix match, library filter
+    assert ids("meadow") == [f_move]
+
+    # Update triggers: item title, series name, file path
+    with SessionLocal() as db:
+        db.get(MediaItem, item_id).title = "Loud Valley"
+        db.get(Series, se_id).name = "Dock Signals"
+        mf = db.get(MediaFile, f_path)
+        mf.rel_path = "Bonus/Something.Else.mkv"
+        db.commit()
+    assert ids("meadow") == [f_move] and ids("valley") == [f_move]  # the path still says Meadow
+    assert ids("quiet meadow") == [f_move] and ids("loud") == [f_move]
+    assert ids("dock signals") == [f_series] and ids("lights") == [f_series]
+    assert ids("harbor") == [f_title, f_series]  # f_series keeps Harbor in its path only now
+    assert ids("bonus") == [f_path]
+
+    # Delete trigger
+    with SessionLocal() as db:
+        db.execute(delete(MediaFile).where(MediaFile.id == f_title))
+        db.commit()
+    assert ids("harbor") == [f_series]
+
+    # Pagination: 23 matches, 10 per page
+    with SessionLocal() as db:
+        for i in range(23):
+            add_file(db, b_id, f"Orbit {i}", f"Orbit/Orbit.{i:02d}.mkv", tmdb_id=100 + i)
+        db.commit()
+    counts.clear()
+    p1 = search("orbit", per_page=10)
+    assert p1["total"] == 23 and p1["has_more"] and len(p1["items"]) == 10 and len(counts) == 1, p1
+    p2 = search("orbit", per_page=10, page=2)
+    p3 = search("orbit", per_page=10, page=3)
+    assert p2["total"] is None and p2["has_more"] and len(counts) == 1, p2
+    assert p3["total"] == 23 and not p3["has_more"] and len(p3["items"]) == 3 and len(counts) == 1, p3
+    seen = [i["file_id"] for p in (p1, p2, p3) for i in p["items"]]
+    assert len(set(seen)) == 23 and seen == ids("orbit", per_page=100)
+    ranks = [i["rank"] for p in (p1, p2, p3) for i in p["items"]]
+    assert ranks == sorted(ranks)
+    assert search("orbit", per_page=10, page=2, with_total=True)["total"] == 23 and len(counts) == 2
+    assert search("orbit", per_page=10, with_total=False)["total"] is None and len(counts) == 2
+    assert ids("orbit", per_page=10, page=2) == [i["file_id"] for i in p2["items"]]  # ties broken by rowid
+    beyond = search("orbit", per_page=10, page=9)
+    assert beyond["items"] == [] and not beyond["has_more"] and beyond["total"] is None
+
+    # A first page holding every match is counted without a second MATCH
+    counts.clear()
+    r = search("harbor")
+    assert r["total"] == 1 and not r["has_more"] and not counts, (r, counts)
+    assert search("")["items"] == [] and search("")["total"] == 0
+
+
+if __name__ == "__main__":
+    try:
+        with TestClient(app) as client:
+            main(client)
+        print("OK")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
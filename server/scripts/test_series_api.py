@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Series browse endpoints must issue a constant number of queries per request,
+no matter how many episodes/files a show has (no N+1 lazy loading)."""
+import os, asyncio, pathlib, sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+db_path = ROOT / "test_series.sqlite3"
+os.environ["LHMM__DB__URL"] = f"sqlite+pysqlite:///{db_path}"
+
+from sqlalchemy import event, select, update  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, Series, MediaItem, MediaFile  # noqa: E402
+from lhmm.main import app  # noqa: E402
+import httpx  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+queries = {"n": 0}
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    queries["n"] += 1
+
+
+def seed_show(db, lib_id: int, tmdb_id: int, seasons: int, eps: int) -> int:
+    s = Series(tmdb_id=tmdb_id, name=f"Show {tmdb_id}", year=2010)
+    db.add(s)
+    db.flush()
+    for se in range(1, seasons + 1):
+        for ep in range(1, eps + 1):
+            mi = MediaItem(kind="episode", tmdb_id=tmdb_id, title=s.name, series_id=s.id, season=se, episode=ep)
+            db.add(mi)
+            db.flush()
+            for copy in range(2):
+                db.add(MediaFile(
+                    item_id=mi.id, library_id=lib_id, size=1000 + copy,
+                    rel_path=f"{s.name}/S{se:02d}/E{ep:02d}.{copy}.mkv",
+                ))
+    db.flush()
+    return s.id
+
+
+async def count_queries(client, url: str) -> int:
+    queries["n"] = 0
+    r = await client.get(url)
+    assert r.status_code == 200, (url, r.status_code, r.text)
+    return queries["n"]
+
+
+async def run():
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path="/tmp/series-test")
+        db.add(d)
+        db.flush()
+        li = Library(name="tv", type="tv", root_disk_id=d.id, root_subdir="TV")
+        db.add(li)
+        db.flush()
+        small = seed_show(db, li.id, 1, seasons=1, eps=2)
+        big = seed_show(db, li.id, 2, seasons=4, eps=25)
+        # Season 4 of the big show lives in a second library
+        li2 = Library(name="tv2", type="tv", root_disk_id=d.id, root_subdir="TV2")
+        db.add(li2)
+        db.flush()
+        s4 = select(MediaItem.id).where(MediaItem.series_id == big, MediaItem.season == 4)
+        db.execute(update(MediaFile).where(MediaFile.item_id.in_(s4)).values(library_id=li2.id))
+        db.commit()
+        lib_ids = (li.id, li2.id)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.get("/api/v1/series")
+        data = r.json()
+        assert data["total"] == 2, data
+        by_id = {s["id"]: s for s in data["items"]}
+        assert by_id[big]["episodes"] == 100 and by_id[big]["files"] == 200, by_id[big]
+        assert by_id[big]["seasons"] == 4 and by_id[big]["total_bytes"] == 100 * 2001, by_id[big]
+
+        # Filtered by library: counts cover only that library's files
+        r = (await client.get("/api/v1/series", params={"library_id": lib_ids[0]})).json()
+        by_id = {s["id"]: s for s in r["items"]}
+        assert r["total"] == 2 and by_id[small]["episodes"] == 2, r
+        assert (by_id[big]["seasons"], by_id[big]["episodes"], by_id[big]["files"]) == (3, 75, 150), by_id[big]
+        r = (await client.get("/api/v1/series", params={"library_id": lib_ids[1]})).json()
+        assert r["total"] == 1 and len(r["items"]) == 1, r
+        assert (r["items"][0]["seasons"], r["items"][0]["episodes"], r["items"][0]["total_bytes"]) == (1, 25, 25 * 2001), r
+
+        r = await client.get(f"/api/v1/series/{big}")
+        assert [s["episodes"] for s in r.json()["seasons"]] == [25, 25, 25, 25], r.text
+
+        r = await client.get(f"/api/v1/series/{big}/seasons/2")
+        season = r.json()
+        assert len(season["episodes"]) == 25 and season["files"] == 50, season
+        assert (await client.get(f"/api/v1/series/{big}/seasons/9")).status_code == 404
+
+        for tmpl in ("/api/v1/series/{id}", "/api/v1/series/{id}/seasons/1"):
+            q_small = await count_queries(client, tmpl.format(id=small))
+            q_big = await count_queries(client, tmpl.format(id=big))
+            assert q_small == q_big, (tmpl, q_small, q_big)
+        q_list = await count_queries(client, "/api/v1/series")
+        assert q_list <= 3, q_list
+
+    print("OK")
+
+
+if __name__ == "main" or __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""The shared tmdb circuit breaker opens after repeated failures; scans then keep
+walking without TMDB requests and queue files as pending matches, which
+resolve_pending() matches in a batch once TMDB answers again."""
+import asyncio, os, pathlib, shutil, sqlite3, sys, tempfile, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_tmdb_circuit.sqlite3"
+
+from fakes import FakeTMDB  # noqa: E402
+
+tmdb = FakeTMDB()
+tmdb.no_match = ("junk",)
+tmdb.start()
+os.environ.update({
+    "LHMM__DB__URL": f"sqlite+pysqlite:///{db_path}",
+    "LHMM__TMDB__API_KEY": "test",
+    "LHMM__TMDB__BASE_URL": tmdb.url,
+    "LHMM__TMDB__TIMEOUT_SECONDS": "0.3",
+    "LHMM__TMDB__BREAKER_FAILURES": "3",
+    "LHMM__TMDB__BREAKER_RESET_SECONDS": "3",
+})
+
+from sqlalchemy import select, func  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, MediaFile, UnmatchedFile  # noqa: E402
+from lhmm.services.circuit import CircuitBreaker, CircuitOpen, breaker  # noqa: E402
+from lhmm.services.scanner import scan_library, scan_paths  # noqa: E402
+from lhmm.services.unmatched import resolve_pending  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+class _Resp:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+def check_breaker() -> None:
+    b = CircuitBreaker("t", threshold=2, reset_seconds=0.1, max_reset_seconds=0.3)
+    calls = []
+
+    def fn(status):
+        calls.append(status)
+        return _Resp(status)
+
+    b.call(fn, 404)                     # a 4xx answer is not a failure
+    b.call(fn, 503)
+    assert b.state == "closed"
+    b.call(fn, 429)
+    assert b.state == "open" and b.opened == 1, b.status()
+    try:
+        b.call(fn, 200)
+        raise AssertionError("open circuit let a call through")
+    except CircuitOpen as e:
+        assert e.retry_in > 0
+    assert len(calls) == 3 and b.rejected == 1
+    time.sleep(0.12)
+    assert b.state == "half-open" and b.allow() and not b.allow()  # one trial at a time
+    b.failure("trial failed")
+    assert b.state == "open" and 0.15 < b.retry_in() <= 0.2, b.status()   # wait doubled
+    time.sleep(0.21)
+    b.call(fn, 200)
+    assert b.state == "closed" and b.status()["failures"] == 0
+
+
+def check_interrupted_trial() -> None:
+    """A half-open trial that is cancelled frees the slot instead of wedging the circuit."""
+    b = CircuitBreaker("t", threshold=1, reset_seconds=0.05)
+    b.failure("down")
+    time.sleep(0.06)
+
+    async def cancelled_trial():
+        task = asyncio.ensure_future(b.acall(asyncio.sleep, 10))
+        await asyncio.sleep(0.01)
+        assert b.is_open()   # the trial is in flight
+        task.cancel()
+        try:
+            await task
+            raise AssertionError("trial was not cancelled")
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancelled_trial())
+    assert b.state == "half-open" and not b.is_open(), b.status()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    try:
+        b.call(interrupted)
+    except KeyboardInterrupt:
+        pass
+    assert b.state == "half-open" and not b.is_open(), b.status()
+    b.call(_Resp, 200)
+    assert b.state == "closed"
+
+
+def pending() -> dict[str, UnmatchedFile]:
+    with SessionLocal() as db:
+        return {u.rel_path: u for u in db.scalars(select(UnmatchedFile).where(UnmatchedFile.reason == "pending"))}
+
+
+def main(tmp: pathlib.Path) -> None:
+    check_breaker()
+    check_interrupted_trial()
+
+    lib_root = tmp / "Movies"
+    names = [f"Film {i} ({2000 + i})/Film.{i}.{2000 + i}.1080p.mkv" for i in range(20)]
+    for rel in names + ["Junk (2001)/Junk.2001.mkv"]:
+        p = lib_root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"\0" * 1000)
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path=str(tmp))
+        db.add(d)
+        db.flush()
+        li = Library(name="Movies", type="movie", root_disk_id=d.id, root_subdir="Movies")
+        db.add(li)
+        db.commit()
+        lid = li.id
+
+    # TMDB hangs: three timeouts open the circuit, the rest of the walk makes no requests
+    tmdb.latency = 2.0
+    t0 = time.perf_counter()
+    stats = scan_library(lid)
+    elapsed = time.perf_counter() - t0
+    assert tmdb.calls == 3 and elapsed < 5, (tmdb.calls, elapsed)
+    assert stats["pending"] == 21 and stats["matched"] == 0, stats
+    rows = pending()
+    assert len(rows) == 21 and all(r.attempts == 0 for r in rows.values())
+    assert breaker("tmdb").state == "open"
+
+    # Still open: nothing is resolved and no request goes out
+    assert resolve_pending()["checked"] == 0 and tmdb.calls == 3
+
+    from fastapi.testclient import TestClient
+    from lhmm.main import app
+    with TestClient(app) as client:
+        st = client.get("/api/v1/tmdb/status").json()
+        assert st["circuit"]["state"] == "open" and st["pending"] == 21, st
+        r = client.get("/api/v1/tmdb/search", params={"q": "Film"}).json()
+        assert r["degraded"] is True and r["results"] == [], r
+        assert client.get("/api/v1/unmatched", params={"reason": "pending"}).json()["total"] == 21
+
+    # TMDB recovers: after the wait one trial closes the circuit and the batch drains
+    tmdb.latency = 0.0
+    time.sleep(max(0.0, breaker("tmdb").retry_in()) + 0.05)
+    # ...without holding the write lock while a lookup is in flight
+    locked, respond = [], tmdb.respond
+
+    def probe(path, params):
+        con = sqlite3.connect(db_path, timeout=0.2, isolation_level=None)
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            con.execute("ROLLBACK")
+        except sqlite3.OperationalError:
+            locked.append(path)
+        finally:
+            con.close()
+        return respond(path, params)
+
+    tmdb.respond = probe
+    try:
+        r1 = resolve_pending(limit=15)
+    finally:
+        tmdb.respond = respond
+    assert not locked, locked
+    assert r1["checked"] == 15 and r1["circuit"] == "closed", r1
+    r2 = resolve_pending()
+    assert r2["checked"] == 6, r2
+    assert (r1["matched"] + r2["matched"], r1["unmatched"] + r2["unmatched"]) == (20, 1), (r1, r2)
+    assert not pending()
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(MediaFile)) == 20
+        junk = db.scalar(select(UnmatchedFile))
+        assert junk.reason == "no_match" and junk.attempts == 1 and junk.next_retry_at > time.time(), junk.__dict__
+
+    # 5xx outage during an import: the circuit opens again, the files wait as pending
+    new = [lib_root / f"New {i} (2020)/New.{i}.2020.mkv" for i in range(5)]
+    for p in new:
+        p.parent.mkdir(parents=True)
+        p.write_bytes(b"\0" * 1000)
+    tmdb.down = 503
+    before = tmdb.calls
+    stats = scan_paths(lid, [str(p) for p in new])
+    assert stats["pending"] == 5 and tmdb.calls - before == 3, (stats, tmdb.calls - before)
+    assert breaker("tmdb").state == "open"
+
+    # A full rescan during the outage keeps existing links and makes no requests
+    before = tmdb.calls
+    stats = scan_library(lid)
+    assert stats["unchanged"] == 20 and stats["pending"] == 5 and tmdb.calls == before, stats
+
+    tmdb.down = 0
+    time.sleep(breaker("tmdb").retry_in() + 0.05)
+    r = resolve_pending()
+    assert r["matched"] == 5 and not pending(), r
+
+
+if __name__ == "__main__":
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="lhmm-circuit-"))
+    try:
+        main(tmp)
+        print("OK")
+    finally:
+        tmdb.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
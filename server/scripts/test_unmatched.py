@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Files TMDB cannot match are queued in unmatched_files with exponential backoff:
+rescans skip them (no TMDB request) until due, a changed file is retried at once,
+files gone from disk drop out, and the API lists, retries, ignores and assigns them."""
+import os, pathlib, shutil, sqlite3, sys, tempfile, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+db_path = ROOT / "test_unmatched.sqlite3"
+
+from fakes import FakeTMDB  # noqa: E402
+
+tmdb = FakeTMDB()
+tmdb.no_match = ("junk", "blorp")
+tmdb.start()
+os.environ.update({
+    "LHMM__DB__URL": f"sqlite+pysqlite:///{db_path}",
+    "LHMM__TMDB__API_KEY": "test",
+    "LHMM__TMDB__BASE_URL": tmdb.url,
+})
+
+from sqlalchemy import select  # noqa: E402
+from lhmm.db.base import Base  # noqa: E402
+from lhmm.db.session import engine, SessionLocal  # noqa: E402
+from lhmm.db.models import Disk, Library, MediaFile, MediaItem, UnmatchedFile  # noqa: E402
+from lhmm.services.scanner import scan_library  # noqa: E402
+from lhmm.services.unmatched import backoff_seconds  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+FILES = {
+    "The Matrix (1999)/The.Matrix.1999.1080p.mkv": 1000,
+    "Junk Sample (2001)/Junk.Sample.2001.mkv": 2000,
+    "Blorp (2005)/Blorp.2005.720p.mkv": 3000,
+}
+
+
+def unmatched() -> dict[str, UnmatchedFile]:
+    with SessionLocal() as db:
+        return {u.rel_path: u for u in db.scalars(select(UnmatchedFile))}
+
+
+def scan(lid: int) -> tuple[dict, int]:
+    before = tmdb.calls
+    stats = scan_library(lid)
+    return stats, tmdb.calls - before
+
+
+def main(tmp: pathlib.Path) -> None:
+    lib_root = tmp / "Movies"
+    for rel, size in FILES.items():
+        p = lib_root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"\0" * size)
+    with SessionLocal() as db:
+        d = Disk(name="d", mount_path=str(tmp))
+        db.add(d)
+        db.flush()
+        li = Library(name="Movies", type="movie", root_disk_id=d.id, root_subdir="Movies")
+        db.add(li)
+        db.commit()
+        lid, d_id = li.id, d.id
+
+    assert backoff_seconds(1) == 6 * 3600 and backoff_seconds(3) == 24 * 3600
+    assert backoff_seconds(50) == 30 * 86400
+
+    # First scan: two misses are recorded with their guess and a 6h retry
+    stats, calls = scan(lid)
+    assert stats["matched"] == 1 and stats["skipped"] == 2 and calls == 3, (stats, calls)
+    um = unmatched()
+    junk = um["Junk Sample (2001)/Junk.Sample.2001.mkv"]
+    assert junk.reason == "no_match" and junk.attempts == 1, junk.__dict__
+    assert 6 * 3600 - 5 <= junk.next_retry_at - int(time.time()) <= 6 * 3600
+    assert '"title": "Junk Sample"' in junk.guess_json and '"year": 2001' in junk.guess_json
+
+    # Rescan: the misses are skipped without asking TMDB
+    stats, calls = scan(lid)
+    assert stats["deferred"] == 2 and calls == 1, (stats, calls)
+
+    from fastapi.testclient import TestClient
+    from lhmm.main import app
+    with TestClient(app) as client:
+        body = client.get("/api/v1/unmatched", params={"library_id": lid}).json()
+        assert body["total"] == 2 and body["items"][0]["guess"]["title"] == "Blorp", body
+        assert client.get("/api/v1/unmatched", params={"status": "due"}).json()["total"] == 0
+
+        # Made due by hand: retried, fails again, waits twice as long
+        r = client.post("/api/v1/unmatched/retry", json={"ids": [junk.id]}).json()
+        assert r["updated"] == 1
+        stats, calls = scan(lid)
+        assert stats["deferred"] == 1 and calls == 2, (stats, calls)
+        junk = unmatched()[junk.rel_path]
+        assert junk.attempts == 2 and junk.next_retry_at - int(time.time()) > 11 * 3600, junk.__dict__
+
+        # A changed file is retried at once and starts over
+        (lib_root / junk.rel_path).write_bytes(b"\0" * 2500)
+        stats, calls = scan(lid)
+        assert stats["deferred"] == 1 and calls == 2, (stats, calls)
+        assert unmatched()[junk.rel_path].attempts == 1
+
+        # Bulk assign: two matches, one ignore, two failures reported per entry
+        blorp = unmatched()["Blorp (2005)/Blorp.2005.720p.mkv"]
+        with SessionLocal() as db:
+            other = Library(name="Other", type="movie", root_disk_id=d_id, root_subdir="Other")
+            db.add(other)
+            db.flush()
+            extra = UnmatchedFile(library_id=other.id, rel_path="Extra/Extra.mkv", size=1, first_seen_at=0,
+                                  attempts=1, reason="no_match", guess_json="{}")
+            db.add(extra)
+            db.commit()
+        # Every lookup runs before the first write: no request finds the write lock taken
+        locked, respond = [], tmdb.respond
+
+        def probe(path, params):
+            con = sqlite3.connect(db_path, timeout=0.2, isolation_level=None)
+            try:
+                con.execute("BEGIN IMMEDIATE")
+                con.execute("ROLLBACK")
+            except sqlite3.OperationalError:
+                locked.append(path)
+            finally:
+                con.close()
+            return respond(path, params)
+
+        tmdb.respond = probe
+        try:
+            before = tmdb.calls
+            r = client.post("/api/v1/unmatched/assign", json={"assignments": [
+                {"id": blorp.id, "kind": "movie", "tmdb_id": 603},
+                {"id": junk.id, "ignore": True},
+                {"id": 999999, "kind": "movie", "tmdb_id": 1},
+                {"id": junk.id, "kind": "episode", "tmdb_id": 1399},
+                {"id": extra.id, "kind": "movie", "tmdb_id": 604, "title": "Extra"},
+                {"id": blorp.id, "kind": "movie", "tmdb_id": 603},
+            ]}).json()
+        finally:
+            tmdb.respond = respond
+        assert not locked and tmdb.calls - before == 2, (locked, tmdb.calls - before)  # 603 asked once
+        assert (r["assigned"], r["ignored"], r["failed"]) == (2, 1, 3), r
+        assert "season and episode" in r["results"][3]["error"] and r["results"][5]["error"] == "not found"
+        assert client.post("/api/v1/unmatched/assign", json={"assignments": [{"id": 1}]}).status_code == 422
+        with SessionLocal() as db:
+            mf = db.scalar(select(MediaFile).where(MediaFile.rel_path == blorp.rel_path))
+            item = db.get(MediaItem, mf.item_id)
+            assert (item.tmdb_id, item.title, item.year) == (603, "Movie 603", 1999), item.__dict__
+        assert list(unmatched()) == [junk.rel_path]
+        assert client.get("/api/v1/unmatched", params={"status": "ignored"}).json()["total"] == 1
+
+    # Ignored files stay skipped; a hand-assigned file keeps its link and stays out of the queue
+    stats, calls = scan(lid)
+    assert stats["deferred"] == 1 and stats["unchanged"] == 2 and calls == 2, (stats, calls)
+    assert list(unmatched()) == [junk.rel_path]
+
+    # Files gone from disk leave the queue
+    shutil.rmtree(lib_root / "Junk Sample (2001)")
+    stats, _ = scan(lid)
+    assert stats["unmatched_pruned"] == 1 and not unmatched(), stats
+
+
+if __name__ == "__main__":
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="lhmm-unmatched-"))
+    try:
+        main(tmp)
+        print("OK")
+    finally:
+        tmdb.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                pathlib.Path(f"{db_path}{suffix}").unlink()
+            except Exception:
+                pass
@@ -16,6 +16,12 @@ async function req<T>(path: string, init?: RequestInit): Promise<T> {
   return r.json();
 }
 
+// Posters/backdrops go through the API's local image cache instead of TMDB's CDN.
+// `path` is a TMDB poster_path/backdrop_path such as "/abc.jpg".
+export function imageUrl(path: string | null | undefined, size = "w342"): string | undefined {
+  return path ? `${API_BASE}/api/v1/images/${size}${path}` : undefined;
+}
+
 export const api = {
   health: () => req<string>("healthz"),
   config: () => req<any>("system/config"),
@@ -25,7 +31,13 @@ export const api = {
   sab: {
     test: () => req<any>("system/sab/test", { method: "POST" }),
     queue: () => req<any>("system/sab/queue"),
-    history: (limit=50) => req<any>(`system/sab/history?limit=${limit}`),
+    history: (limit=50, page=1, filters: { category?: string; status?: string; q?: string } = {}) => {
+      const qs = new URLSearchParams({ per_page: String(limit), page: String(page) });
+      for (const [k, v] of Object.entries(filters)) if (v) qs.set(k, v);
+      return req<any>(`system/sab/history?${qs}`);
+    },
+    historyDelta: (since: number) => req<any>(`system/sab/history/delta?since=${since}`),
+    syncHistory: () => req<any>("system/sab/history/sync", { method: "POST" }),
   },
   disks: { list: () => req<any>("disks") },
   libraries: {
@@ -34,6 +46,30 @@ export const api = {
     create: (payload: any) => req<any>("libraries", { method: "POST", body: JSON.stringify(payload) }),
     update: (id: number, payload: any) => req<any>(`libraries/${id}`, { method: "PUT", body: JSON.stringify(payload) }),
   },
+  indexers: {
+    list: () => req<any>("indexers"),
+    rss: () => req<any>("indexers/rss"),
+    syncRss: () => req<any>("indexers/rss/sync", { method: "POST" }),
+    search: (params: Record<string, string | number>) =>
+      req<any>(`indexers/search?${new URLSearchParams(Object.entries(params).map(([k, v]) => [k, String(v)]))}`),
+    // Server-sent events: one `results` event per indexer as it answers, then `done`
+    searchStream: (params: Record<string, string | number>) =>
+      new EventSource(`${API_BASE}/api/v1/indexers/search/stream?${new URLSearchParams(Object.entries(params).map(([k, v]) => [k, String(v)]))}`),
+  },
+  wanted: {
+    list: (status?: "wanted" | "found") => req<any>(`wanted${status ? `?status=${status}` : ""}`),
+    create: (payload: any) => req<any>("wanted", { method: "POST", body: JSON.stringify(payload) }),
+    remove: (id: number) => req<any>(`wanted/${id}`, { method: "DELETE" }),
+    releases: (id: number) => req<any>(`wanted/${id}/releases`),
+  },
+  images: {
+    prewarm: (library_id?: number, sizes: string[] = ["w342"]) => {
+      const qs = new URLSearchParams(sizes.map((s) => ["sizes", s]));
+      if (library_id != null) qs.set("library_id", String(library_id));
+      return req<any>(`images/prewarm?${qs}`, { method: "POST" });
+    },
+    job: (id: number) => req<any>(`images/prewarm/${id}`),
+  },
   tmdb: {
     search: (q: string, media_type: "multi"|"movie"|"tv" = "multi") =>
       req<any>(`tmdb/search?q=${encodeURIComponent(q)}&media_type=${media_type}`),